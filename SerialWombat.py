@@ -26,15 +26,33 @@ THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
 """! \file SerialWombat.py
 """
 import time
+from array import array
 #from enum import IntEnum
 from ArduinoFunctions import delayMicroseconds
 from ArduinoFunctions import millis
 from ArduinoFunctions import delay
+from ArduinoFunctions import micros
+from SerialWombatCodec import *
+try:
+    from threading import local as _threadLocal
+except ImportError:
+    _threadLocal = object  # Ports without threads need only one buffer
 
 
 
+# Packet buffer used by encodePacket().  One per thread, so threads sharing a chip don't overwrite each other's packets.
+class _PacketBuffer(_threadLocal):
+    def __init__(self):
+        self.tx = bytearray(PACKET_PADDING)
+
+
+# State of one packet's send and retries, shared by SerialWombatChip.sendPacket() and SerialWombatAsync
+class _PacketExchange:
+    __slots__ = ("tx", "echoRetries", "transportAttempts", "attempts", "mismatches", "errorCode", "result", "rx", "startTime")
+
+
 def SW_LE16(i):
-    return (bytearray([i & 0xFF, int(i/256) & 0xFF]))
+    return (bytearray([i & 0xFF, (i >> 8) & 0xFF]))
 def SW_LE32(i):
     return (bytearray([i & 0xFF, int(i>>8) & 0xFF, int(i>>16) & 0xFF, int(i>>24) & 0xFF]))
 
@@ -307,10 +325,21 @@ class SerialWombatChip:
             """
         self._supplyVoltagemV = 3300
         self.deviceRevision = 0
+        self.deviceIdentifier = 0
         #Incremented every time a communication or command error is detected.  
         self.errorCount = 0
         self.inBoot = False
         self.lastErrorCode = 0
+        self.errorHandler = None
+        #! @brief SerialWombatTelemetry collecting per-command statistics, or None.  See enableTelemetry()
+        self.telemetry = None
+        self._txBuffer = _PacketBuffer()
+        self._supportedPinModes = None
+        self._supportedPinModesComplete = False
+        self._publicDataManyPackets = None
+        self._circuitBreaker = None
+        #! @brief The SerialWombatBus this chip shares with other chips, or None
+        self.bus = None
         self.model = [0,0,0,0]
         self.fwVersion = [0,0,0,0]
         #! @brief The I2C address of the SerialWombatChip instance
@@ -341,51 +370,119 @@ class SerialWombatChip:
         self.sendReadyTime = 0
 
     def initialize(self):
-        lastErrorCode = 0
+        self.lastErrorCode = 0
         self.readVersion()
         self.readSupplyVoltage_mV()
-        self.readUniqueIdentifier()
-        self.readDeviceIdentifier()
-        return(lastErrorCode)
+        if (not self._loadIdentity()):
+            self.readUniqueIdentifier()
+            self.readDeviceIdentifier()
+            self._saveIdentity()
+        if (self.probePinModesAtBegin):
+            self._loadSupportedPinModes()
+        return(self.lastErrorCode)
+
+    #! @brief If True, initialize() reads the table of supported pin modes used by isPinModeSupported()
+    probePinModesAtBegin = True
+
+    #! @brief SerialWombatIdentityCache used by all chips to skip identity flash reads in initialize(), or None
+    identityCache = None
+
+    """!
+    @brief Return the key identifying this chip in the identity cache
+
+    Interfaces override this to include the port or bus, so that chips with the same address
+    on different buses get separate entries.  Only SW4 and SW18 series chips are cached, as the
+    others have no unique identifier to confirm an entry with.
+    """
+    def identityKey(self):
+        return "%s:%s" % (type(self).__name__, self.address)
+
+    def _versionString(self):
+        return "".join([chr(self._byteValue(c)) for c in self.version])
+
+    def _identityEntry(self):
+        cache = self.identityCache
+        if (cache is None):
+            return None
+        key = self.identityKey()
+        if (not cache.isConfirmed(key)):
+            return None
+        return cache.entries.get(key)
+
+    # Only chips with a readable unique identifier can have a cached entry confirmed, so only they are cached
+    def _identityCacheable(self):
+        return (self.identityCache is not None and self.lastErrorCode == 0 and (self.isSW18() or self.isSW04()))
+
+    # Re-read the first word of the unique identifier to confirm a cached entry belongs to this chip
+    def _identityMatches(self, uniqueIdentifier):
+        if (self.isSW18()):
+            data = self.readFlashAddress(0x801600)
+            return ((data & 0xFFFFFF) == uniqueIdentifier[0] + (uniqueIdentifier[1] << 8) + (uniqueIdentifier[2] << 16))
+        elif (self.isSW04()):
+            return ((self.readFlashAddress(0x8100) & 0xFF) == uniqueIdentifier[0])
+        return False
+
+    def _loadIdentity(self):
+        if (not self._identityCacheable()):
+            return False
+        cache = self.identityCache
+        key = self.identityKey()
+        entry = cache.get(key, self._versionString())
+        if (entry is None):
+            return False
+        if (not cache.isConfirmed(key)):
+            if (not self._identityMatches(entry["uniqueIdentifier"])):
+                cache.invalidate(key)
+                return False
+            cache.confirm(key)
+        self.uniqueIdentifier = bytearray(entry["uniqueIdentifier"])
+        self.deviceIdentifier = entry["deviceIdentifier"]
+        self.deviceRevision = entry["deviceRevision"]
+        return True
+
+    def _saveIdentity(self):
+        if (not self._identityCacheable()):
+            return
+        cache = self.identityCache
+        cache.put(self.identityKey(), {
+            "version": self._versionString(),
+            "uniqueIdentifier": list(self.uniqueIdentifier),
+            "deviceIdentifier": self.deviceIdentifier,
+            "deviceRevision": self.deviceRevision,
+        })
 
     def readUniqueIdentifier(self):
         uniqueIdentifierLength = 0
-        if (self.version[0] == 'S' and self.version[1] == '0' and self.version[2] == '4'):
+        if (self.isSW04()):
                     #16F15214
-            for address in range(0x8100,0x8109,1):
-        
-                data = self.readFlashAddress(address)
-                self.uniqueIdentifier[uniqueIdentifierLength] = data & 0xFF
+            words = self.readFlashRange(0x8100, 9)
+            for i in range(0, len(words), 4):
+                self.uniqueIdentifier[uniqueIdentifierLength] = words[i]
                 uniqueIdentifierLength += 1
                 """ Always zero... leave out
                 uniqueIdentifier[uniqueIdentifierLength] = (uint8_t)(data>>8);
                 ++uniqueIdentifierLength;
                 """
         elif (self.isSW18()):
-            for address  in range (0x801600, 0x80160A, 2):
-                data = self.readFlashAddress(address)
-                self.uniqueIdentifier[uniqueIdentifierLength] = data & 0xFF
-                uniqueIdentifierLength += 1
-                self.uniqueIdentifier[uniqueIdentifierLength] = (data >> 8) & 0xFF
-                uniqueIdentifierLength += 1
-                self.uniqueIdentifier[uniqueIdentifierLength] = (data >> 16) & 0xFF
-                uniqueIdentifierLength += 1
+            words = self.readFlashRange(0x801600, 5)
+            for i in range(0, len(words), 4):
+                self.uniqueIdentifier[uniqueIdentifierLength:uniqueIdentifierLength + 3] = words[i:i + 3]
+                uniqueIdentifierLength += 3
 
 
 
     def readDeviceIdentifier(self):
-        if (self.version[0] == 'S' and self.version[1] == '0' and self.version[2] == '4'):
+        if (self.isSW04()):
              #16F15214
-                    
-            data = self.readFlashAddress(0x8006)
-            self.deviceIdentifier = data & 0xFFFF
-            data = self.readFlashAddress(0x8005)
-            self.deviceRevision = data & 0xFFFF
+            words = self.readFlashRange(0x8005, 2)
+            if (len(words) == 8):
+                self.deviceRevision = words[0] + (words[1] << 8)
+                self.deviceIdentifier = words[4] + (words[5] << 8)
         elif (self.isSW18()):
-            data = self.readFlashAddress(0xFF0000)
-            self.deviceIdentifier = data & 0xFFFF
-            data = self.readFlashAddress(0xFF0002)
-            self.deviceRevision = data & 0xF
+            words = self.readFlashRange(0xFF0000, 2)
+            if (len(words) == 8):
+                self.deviceIdentifier = words[0] + (words[1] << 8)
+                self.deviceRevision = words[4] & 0xF
 
     def returnErrorCode(self,rx):
         out = rx[1] - ord('0')
@@ -404,60 +501,297 @@ class SerialWombatChip:
 
     def sendPacketToHardware (self,tx):
         return (self.hardwareSend(tx))
-    
-    def sendPacket(self, tx,  retryIfEchoDoesntMatch = False, startBytesToMatch = 1,  endBytesToMatch = 0):
+
+    def _padPacket(self, tx):
         if (len(tx) < 8):
             for i in range(len(tx),8):
                 tx.append(0x55)
-        retry = 4  #TODO self.communicationErrorRetries
+        return tx
+
+    def _prepareToSend(self):
         if (self._asleep):
-            self._asleep = False;    
-            txw = [ 0x21,0x21,0x21,0x21,0x21,0x21,0x21,0x21 ] 
+            self._asleep = False;
+            txw = [ 0x21,0x21,0x21,0x21,0x21,0x21,0x21,0x21 ]
             self.sendPacketToHardware(txw)
             delayMicroseconds(200)
-            txu = [ 0x55,0x55,0x55,0x55,0x55,0x55,0x55,0x55, ] 
+            txu = [ 0x55,0x55,0x55,0x55,0x55,0x55,0x55,0x55, ]
             self.sendPacketToHardware(txu)
         if (self.sendReadyTime != 0):
             currentTime = millis()
             if (currentTime < self.sendReadyTime):
                 delay(self.sendReadyTime - currentTime)
-			
+
             self.sendReadyTime = 0
             self.initialize()
-           
 
-        if (not retryIfEchoDoesntMatch):
-            retry = 1
-        
-        result = 0
-        while (retry > 0):
+    def _echoMatches(self, tx, rx, startBytesToMatch, endBytesToMatch):
+        for i in range(0,startBytesToMatch):
+            if ( tx[i] != rx[i]):
+                return False
+        for i in range(8- endBytesToMatch, 8):
+            if (tx[i] != rx[i]):
+                return False
+        return True
+
+    def sendPacket(self, tx,  retryIfEchoDoesntMatch = False, startBytesToMatch = 1,  endBytesToMatch = 0):
+        tx = self._padPacket(tx)
+        if (self._asleep or self.sendReadyTime != 0):
+            tx = bytearray(tx)  # _prepareToSend may send packets of its own through the encodePacket buffer
+            self._prepareToSend()
+
+        exchange = self._startExchange(tx, retryIfEchoDoesntMatch)
+        if (exchange is None):
+            return (-48, bytes("E00048UU",'utf-8'))
+        while (True):
             result,rx = self.sendReceivePacketHardware(tx)
+            wait = self._checkResponse(exchange, result, rx, startBytesToMatch, endBytesToMatch)
+            if (wait < 0):
+                return self._finishExchange(exchange)
+            delayMicroseconds(wait)
+
+    """!
+    @brief Encode a packet into this chip's reusable packet buffer
+
+    The values are packed according to layout and the rest of the packet is filled with 0x55.
+    The returned buffer is reused by the next call from the same thread, so send it before encoding
+    another packet.  Each thread has its own buffer, so a background SerialWombatPoller or
+    SerialWombatInputMonitor can't corrupt packets being encoded by application code.  Threads
+    sharing a chip must still have their transactions serialized by attaching it to a SerialWombatBus.
+
+    @param layout One of the PKT_ layouts in SerialWombatCodec
+    @param values The values for the layout, starting with the command byte
+    @return The chip's 8 byte packet buffer
+    """
+    def encodePacket(self, layout, *values):
+        tx = self._txBuffer.tx
+        layout.pack_into(tx, 0, *values, PACKET_PADDING)
+        return tx
+
+    """!
+    @brief Count an error response and pass it to the registered error handler
+    @param errorCode The positive error code returned by the chip or transport
+    """
+    def _recordError(self, errorCode):
+        self.errorCount += 1
+        self.lastErrorCode = errorCode
+        if (self.errorHandler is not None):
+            self.errorHandler(errorCode, self)
+
+    # Response validation, retries and error recording, shared by sendPacket(), sendPackets() and SerialWombatAsync.
+    # The callers only do the I/O and the waiting, so the blocking and asyncio paths behave identically.
+
+    # Start sending tx.  Returns None if the circuit breaker is open; the error is then already recorded.
+    def _startExchange(self, tx, retryIfEchoDoesntMatch):
+        exchange = _PacketExchange()
+        exchange.transportAttempts = self._transportAttempts(tx)
+        if (exchange.transportAttempts == 0):
+            return None
+        exchange.tx = tx
+        exchange.echoRetries = self.communicationErrorRetries if retryIfEchoDoesntMatch else 1
+        exchange.attempts = 0
+        exchange.mismatches = 0
+        exchange.errorCode = 0
+        exchange.result = 0
+        exchange.rx = None
+        if (self.telemetry is not None):
+            exchange.startTime = micros()
+        return exchange
+
+    # Check one response to an exchange's packet.
+    # Returns -1 if the exchange is finished, otherwise the microseconds to wait before sending the packet again.
+    def _checkResponse(self, exchange, result, rx, startBytesToMatch, endBytesToMatch):
+        exchange.attempts += 1
+        exchange.errorCode = 0
+        exchange.result = result
+        exchange.rx = rx
+        if (rx[0] == ord('E')):
+            errorCode = self.returnErrorCode(rx)
+            exchange.errorCode = errorCode
+            exchange.result = -1 * errorCode
+            if (exchange.transportAttempts > 1 and self.retryPolicy.isRetryable(errorCode)):
+                exchange.transportAttempts -= 1
+                return self.retryPolicy.backoff_uS(exchange.attempts)
+            self._recordError(errorCode)
+            return -1
+        if (self._echoMatches(exchange.tx, rx, startBytesToMatch, endBytesToMatch)):
+            exchange.result = 8
+            return -1
+        exchange.mismatches += 1
+        exchange.echoRetries -= 1
+        if (exchange.echoRetries > 0):
+            return 100
+        return -1
+
+    # Record a finished exchange's outcome and return its (result, rx)
+    def _finishExchange(self, exchange):
+        self._recordOutcome(exchange.errorCode)
+        if (self.telemetry is not None):
+            self.telemetry.record(exchange.tx[0], micros() - exchange.startTime, exchange.errorCode,
+                    exchange.attempts - 1, exchange.mismatches)
+        return (exchange.result, exchange.rx)
+
+    """!
+    @brief Check the responses to a batch of packets sent in elapsed_uS microseconds
+    @return (results, resends) where results holds a (result, rx) tuple per packet, and resends lists
+    (index, wait_uS) for packets that must be sent again on their own with sendPacket() after waiting wait_uS
+    """
+    def _checkResponses(self, packets, responses, elapsed_uS, retryIfEchoDoesntMatch, startBytesToMatch, endBytesToMatch, countErrors):
+        policy = self.retryPolicy
+        telemetry = self.telemetry
+        elapsed_uS //= len(packets)  # The transaction's time is shared evenly between its packets
+        results = []
+        resends = []
+        for i in range(len(packets)):
+            result,rx = responses[i]
+            errorCode = 0
+            mismatch = 0
             if (rx[0] == ord('E')):
-                return (-1 * self.returnErrorCode(rx),rx)
-
-            success = True
-            for i in range(0,startBytesToMatch):
-                if ( tx[i] != rx[i]):
-                    success = False
-
-            for i in range(8- endBytesToMatch, 8):
-                if (tx[i] != rx[i]):
-                    success = False
-            if (success):
-                return (8,rx)
-            retry -= 1
-            delayMicroseconds(100)
-            
-        return(result, rx)
+                errorCode = self.returnErrorCode(rx)
+                if (self._shouldResend(packets[i], errorCode)):
+                    # Resent on its own, with the policy's backoff and retries
+                    results.append(None)
+                    resends.append((i, policy.backoff_uS(1)))
+                    continue
+                if (countErrors):
+                    self._recordError(errorCode)
+                results.append((-1 * errorCode,rx))
+            elif (self._echoMatches(packets[i], rx, startBytesToMatch, endBytesToMatch)):
+                if (policy is not None):
+                    self._recordOutcome(0)
+                results.append((8,rx))
+            else:
+                mismatch = 1
+                results.append((result,rx))
+                if (retryIfEchoDoesntMatch):
+                    resends.append((i, 100))
+            if (telemetry is not None):
+                telemetry.record(packets[i][0], elapsed_uS, errorCode, 0, mismatch)
+        return (results, resends)
+
+    # retryPolicy decisions
+
+    """!
+    @brief Return how many times tx may be sent if the transport fails, under retryPolicy
+    @return 1 without a policy, or 0 if the circuit breaker is open.  The error is then already recorded.
+    """
+    def _transportAttempts(self, tx):
+        policy = self.retryPolicy
+        if (policy is None):
+            return 1
+        if (policy.isOpen(self)):
+            self._recordError(48)
+            return 0
+        if (policy.isIdempotent(tx)):
+            return policy.maxAttempts
+        return 1
 
+    # Failed results for a batch refused by an open circuit breaker
+    def _breakerOpenResults(self, count, countErrors = True):
+        results = []
+        for i in range(count):
+            if (countErrors):
+                self._recordError(48)
+            results.append((-48, bytes("E00048UU",'utf-8')))
+        return results
+
+    # True if a batched packet that failed with errorCode should be resent on its own
+    def _shouldResend(self, tx, errorCode):
+        policy = self.retryPolicy
+        if (policy is None or not policy.isRetryable(errorCode)):
+            return False
+        if (policy.isIdempotent(tx)):
+            return True
+        policy.recordOutcome(self, True)
+        return False
+
+    # Record a packet's final outcome in the circuit breaker
+    def _recordOutcome(self, errorCode):
+        policy = self.retryPolicy
+        if (policy is not None):
+            policy.recordOutcome(self, errorCode != 0 and policy.isRetryable(errorCode))
 
+    """!
+    @brief Start collecting per-command packet statistics
+    @param telemetry A SerialWombatTelemetry instance to record into, for instance one shared by several chips.  If None, a new one is created.
+    @return The SerialWombatTelemetry instance
+    """
+    def enableTelemetry(self, telemetry = None):
+        if (telemetry is None):
+            import SerialWombatTelemetry
+            telemetry = SerialWombatTelemetry.SerialWombatTelemetry()
+        self.telemetry = telemetry
+        return telemetry
+
+    def disableTelemetry(self):
+        self.telemetry = None
 
+    """!
+    @brief Send several packets to the Serial Wombat chip in as few transport transactions as possible
+
+    Each packet is padded to 8 bytes with 0x55 as in sendPacket.  The packets are handed to
+    sendReceivePacketsHardware() together, which transports override to put all of them on the
+    bus in one go (a single i2c_rdwr call, a single serial write, etc.).  Responses are checked
+    the same way sendPacket checks them.  If retryIfEchoDoesntMatch is True, packets whose
+    echo doesn't match are resent individually through sendPacket.
+
+    @param txList A list of packets (lists, bytes or bytearrays) to send, in order
+    @param countErrors If False, error responses are expected (e.g. capability queries) and are not counted in errorCount or passed to the error handler
+    @return A list with one (result, rx) tuple per packet, in the same order as txList
+    """
+    def sendPackets(self, txList, retryIfEchoDoesntMatch = False, startBytesToMatch = 1, endBytesToMatch = 0, countErrors = True):
+        packets = []
+        for tx in txList:
+            packets.append(self._padPacket(bytearray(tx)))
+        if (len(packets) == 0):
+            return []
+        self._prepareToSend()
+
+        policy = self.retryPolicy
+        if (policy is not None and policy.isOpen(self)):
+            return self._breakerOpenResults(len(packets), countErrors)
+
+        startTime = micros()
+        responses = self.sendReceivePacketsHardware(packets)
+        results, resends = self._checkResponses(packets, responses, micros() - startTime,
+                retryIfEchoDoesntMatch, startBytesToMatch, endBytesToMatch, countErrors)
+        for i, wait in resends:
+            delayMicroseconds(wait)
+            results[i] = self.sendPacket(packets[i], retryIfEchoDoesntMatch, startBytesToMatch, endBytesToMatch)
+        return results
+
+    """!
+    @brief Create a batch that collects packets and sends them together with sendPackets()
+
+    Use as a context manager.  Packets added with the batch's sendPacket() are sent when
+    the with block exits, and the responses are then available in the batch's results member:
+
+        with sw.batch() as b:
+            b.sendPacket(tx1)
+            b.sendPacket(tx2)
+        result, rx = b.results[1]
+
+    @return A SerialWombatPacketBatch bound to this chip
+    """
+    def batch(self):
+        return SerialWombatPacketBatch(self)
 
 
-    
     def sendReceivePacketHardware(self,tx):
                 return 8,[0x55,0x55,0x55,0x55,0x55,0x55,0x55]
 
+    """!
+    @brief Send a list of 8 byte packets and receive a response for each
+
+    The default implementation calls sendReceivePacketHardware once per packet.  Interfaces
+    that can put several packets on the wire in one transaction override this.
+    @return A list of (count, rx) tuples, one per packet, in order
+    """
+    def sendReceivePacketsHardware(self, txList):
+        responses = []
+        for tx in txList:
+            responses.append(self.sendReceivePacketHardware(tx))
+        return responses
+
 
 
     """!
@@ -477,6 +811,7 @@ class SerialWombatChip:
             self.hardwareReset();
             self.sendReadyTime = millis() + 1000
             delay(1000)
+            self.sendReadyTime = 0  # Otherwise _prepareToSend() would run initialize() a second time
             self.initialize()
             return 1
         else:
@@ -495,9 +830,19 @@ class SerialWombatChip:
     def readVersion(self):
         count,rx=self.sendPacket( (bytearray("VUUUUUUU",'utf8')))
         if (count >= 0):
-            self.version = rx[1:8]
-            self.model = rx[1:4]
-            self.fwVersion = rx[5:8]
+            self._setVersion(rx)
+
+    # Store a version response.  Also used by SerialWombatAsync.
+    def _setVersion(self, rx):
+        if (rx[1:8] != self.version):
+            # Firmware changed, capabilities may have too
+            self._supportedPinModes = None
+            self._supportedPinModesComplete = False
+            if (self.identityCache is not None and self._modelChar(0) != 0):
+                self.identityCache.invalidate(self.identityKey())
+        self.version = rx[1:8]
+        self.model = rx[1:4]
+        self.fwVersion = rx[5:8]
 
         """!
 	@brief Request version as a uint32
@@ -519,7 +864,8 @@ class SerialWombatChip:
 	\param pin The pin (or special meaning value) for which to retreive data
     """
     def readPublicData(self,pin):
-        tx = [0x81,pin,255,255,0x55,0x55,0x55,0x55]
+        tx = self._txBuffer.tx
+        PKT_READ_PUBLIC.pack_into(tx, 0, 0x81, pin, 255, 255, PACKET_PADDING)
         count,rx = self.sendPacket(tx)
         return (rx[2]+ rx[3] * 256)
 
@@ -531,13 +877,109 @@ class SerialWombatChip:
     def writePublicData(self,pin, value, secondPin = None, secondValue = None):
         value = value & 0xFFFF #simulate Arduino behavior of truncating to 16 bits
         if (secondPin is None):
-            tx = [0x82, pin, value & 0xFF, value // 256, 255, 0x55,0x55,0x55]
+            tx = self._txBuffer.tx
+            PKT_WRITE_PUBLIC.pack_into(tx, 0, 0x82, pin, value, 255, 0x5555, PACKET_PADDING)
         else:
             secondValue = secondValue & 0xFFFF #simulate Arduino behavior of truncating to 16 bits
-            tx = [0x82, pin, value & 0xFF, value // 256, secondPin, secondValue & 0xFF, secondValue // 256, 0x55]
+            tx = self.encodePacket(PKT_WRITE_PUBLIC, 0x82, pin, value, secondPin, secondValue)
         count,rx = self.sendPacket(tx)
         return (rx[2] + rx[3] * 256)
 
+    """!
+    @brief Write 16 bit public data to several pins
+
+    Updates are packed two per COMMAND_BINARY_SET_PIN_BUFFFER packet using the second pin slot,
+    and the packets are pipelined through sendPackets() in groups of rangePacketsPerBatch.
+    Updating 8 servos takes 4 packets and a single transaction on interfaces that support it.
+
+    @param values A dictionary of {pin: value}, or a list of (pin, value) pairs written in order
+    @return 0 on success, or the first negative error code
+    """
+    def writePublicDataMany(self, values):
+        if (isinstance(values, dict)):
+            values = values.items()
+        txList = []
+        tx = None
+        for pin, value in values:
+            value = value & 0xFFFF #simulate Arduino behavior of truncating to 16 bits
+            if (tx is None):
+                tx = self._newPacket(PKT_WRITE_PUBLIC, SerialWombatCommands.COMMAND_BINARY_SET_PIN_BUFFFER, pin, value, 255, 0x5555)
+                txList.append(tx)
+            else:
+                tx[4] = pin
+                tx[5] = value & 0xFF
+                tx[6] = value >> 8
+                tx = None
+        batch = self.rangePacketsPerBatch
+        for start in range(0, len(txList), batch):
+            for result, rx in self.sendPackets(txList[start:start + batch]):
+                if (result < 0):
+                    return result
+        return 0
+
+    """!
+    @brief Read the 16 bit public data of several pins or special sources
+
+    Each COMMAND_BINARY_READ_PIN_BUFFFER packet carries two sources, and the packets are pipelined
+    through sendPackets() in groups of rangePacketsPerBatch, so the 20 pins of an SW18AB take
+    10 packets and a single transaction on interfaces that support it.  The packets for the last
+    list of pins are kept and reused.
+
+    @param pins A list or tuple of pins (or special meaning values) to read
+    @param into Optional array('H'), NumPy array or other indexable of at least len(pins) entries to fill.
+    If None, an array('H') is allocated.
+    @param timestamps Optional indexable of at least len(pins) entries.  Each entry is set to the micros()
+    time at which the response carrying that sample was received.
+    @param errors Optional indexable of at least len(pins) entries.  Each entry is set to the error code of
+    the packet that carried that sample, or 0 if it succeeded.
+    @return into, with entry i holding the public data of pins[i].  Entries whose packet failed are set to 0
+    and the error is recorded as for any other packet.
+    """
+    def readPublicDataMany(self, pins, into = None, timestamps = None, errors = None):
+        count = len(pins)
+        if (into is None):
+            into = array('H', bytes(2 * count))
+        key = tuple(pins)
+        cached = self._publicDataManyPackets  # Read once; another thread may replace it
+        if (cached is not None and cached[0] == key):
+            txList = cached[1]
+        else:
+            txList = []
+            for i in range(0, count, 2):
+                second = 255
+                if (i + 1 < count):
+                    second = key[i + 1]
+                txList.append(self._newPacket(PKT_READ_PUBLIC, SerialWombatCommands.COMMAND_BINARY_READ_PIN_BUFFFER, key[i], second, 255))
+            self._publicDataManyPackets = (key, txList)
+        batch = self.rangePacketsPerBatch
+        for start in range(0, len(txList), batch):
+            results = self.sendPackets(txList[start:start + batch])
+            if (timestamps is not None):
+                now = micros()
+            i = 2 * start
+            for result, rx in results:
+                errorCode = 0
+                if (result < 0):
+                    errorCode = -result
+                    first = 0
+                    second = 0
+                else:
+                    first = rx[2] + (rx[3] << 8)
+                    second = rx[4] + (rx[5] << 8)
+                into[i] = first
+                if (timestamps is not None):
+                    timestamps[i] = now
+                if (errors is not None):
+                    errors[i] = errorCode
+                if (i + 1 < count):
+                    into[i + 1] = second
+                    if (timestamps is not None):
+                        timestamps[i + 1] = now
+                    if (errors is not None):
+                        errors[i + 1] = errorCode
+                i += 2
+        return into
+
     """!
 	\brief Measure the Serial Wombat chip's Supply voltage
 	
@@ -593,6 +1035,8 @@ class SerialWombatChip:
     """
     def hardwareReset(self):
        self.sendPacketToHardware((bytearray("ReSeT!#*",'utf8')))#, encoding = 'utf8')))
+       if (self.identityCache is not None):
+           self.identityCache.unconfirm(self.identityKey())
 
     """!
 	\brief Set a pin to INPUT or OUTPUT, with options for pull Ups and open Drain settings
@@ -734,6 +1178,8 @@ class SerialWombatChip:
     def jumpToBoot(self):
         tx = bytes("BoOtLoAd",'utf-8')
         self.sendPacket(tx)
+        if (self.identityCache is not None):
+            self.identityCache.invalidate(self.identityKey())
 
     """!
     @brief Read Address from RAM based on 16 bit address
@@ -756,8 +1202,7 @@ class SerialWombatChip:
     @return An 8 bit value returned from the Serial Wombat chip.
     """
     def readRamAddress(self,address):
-        tx = bytearray([ 0xA0]) + SW_LE16(address) + bytearray([0x55,0x55,0x55,0x55,0x55])
-        result,rx = self.sendPacket(tx)
+        result,rx = self.sendPacket(self.encodePacket(PKT_CMD_U16, 0xA0, address))
         return(rx[3])
 
     """!
@@ -781,8 +1226,9 @@ class SerialWombatChip:
     """
 
     def writeRamAddress(self, address, value):
-        tx = bytearray([ 0xA3]) + SW_LE16(address) + bytearray([0,0,value,0x55,0x55])
-        result,rx = self.sendPacket(tx);
+        tx = self.encodePacket(PKT_CMD_U16_U16, 0xA3, address, 0)
+        tx[5] = value
+        result,rx = self.sendPacket(tx)
         return result
 
     """!
@@ -801,11 +1247,107 @@ class SerialWombatChip:
     """
 
     def readFlashAddress(self,address):
-        tx = bytearray([ 0xA1]) + SW_LE32(address) + bytearray([0x55,0x55,0x55])
-        result,rx = self.sendPacket(tx)
+        result,rx = self.sendPacket(self.encodePacket(PKT_CMD_U32, 0xA1, address))
         if (result <= 0):
             return (0)
-        return((rx[4]) + ((rx[5]) <<8) + ((rx[6]) <<16) + ((rx[7]) <<24))
+        return(unpackResponse(RSP_U32, rx, 4)[0])
+
+    #! @brief Number of packets readFlashRange(), readRamRange() and writeRamRange() pass to sendPackets() at a time
+    rangePacketsPerBatch = 32
+
+    def _newPacket(self, layout, *values):
+        tx = bytearray(8)
+        layout.pack_into(tx, 0, *values, PACKET_PADDING)
+        return tx
+
+    """!
+    @brief Read consecutive flash words
+
+    The reads are pipelined through sendPackets().  Each word is stored as 4 little endian bytes,
+    the same 32 bit value readFlashAddress() returns.  Flash word addresses advance by 2 on the SW18 series
+    and by 1 on the SW4 and SW8 series.
+
+    @param address The address of the first word
+    @param count The number of words to read
+    @param into Optional buffer of at least 4 * count bytes to read into.  If None, a bytearray is allocated.
+    @return A memoryview of the bytes read.  Shorter than 4 * count if a read failed.
+    """
+    def readFlashRange(self, address, count, into = None):
+        step = 1
+        if (self.isSW18()):
+            step = 2
+        if (into is None):
+            into = bytearray(4 * count)
+        view = memoryview(into)
+        done = 0
+        while (done < count):
+            n = min(self.rangePacketsPerBatch, count - done)
+            txList = []
+            for i in range(n):
+                txList.append(self._newPacket(PKT_CMD_U32, SerialWombatCommands.COMMAND_BINARY_READ_FLASH, address + (done + i) * step))
+            results = self.sendPackets(txList)
+            for i in range(n):
+                result, rx = results[i]
+                if (result < 0):
+                    return view[:4 * done]
+                view[4 * done:4 * done + 4] = bytes(rx[4:8])
+                done += 1
+        return view[:4 * done]
+
+    """!
+    @brief Read consecutive bytes of RAM
+
+    The reads are pipelined through sendPackets().  See readRamAddress() for cautions.
+
+    @param address The address of the first byte
+    @param count The number of bytes to read
+    @param into Optional buffer of at least count bytes to read into.  If None, a bytearray is allocated.
+    @return A memoryview of the bytes read.  Shorter than count if a read failed.
+    """
+    def readRamRange(self, address, count, into = None):
+        if (into is None):
+            into = bytearray(count)
+        view = memoryview(into)
+        done = 0
+        while (done < count):
+            n = min(self.rangePacketsPerBatch, count - done)
+            txList = []
+            for i in range(n):
+                txList.append(self._newPacket(PKT_CMD_U16, SerialWombatCommands.COMMAND_BINARY_READ_RAM, (address + done + i) & 0xFFFF))
+            results = self.sendPackets(txList)
+            for i in range(n):
+                result, rx = results[i]
+                if (result < 0):
+                    return view[:done]
+                view[done] = rx[3]
+                done += 1
+        return view[:done]
+
+    """!
+    @brief Write consecutive bytes of RAM
+
+    The writes are pipelined through sendPackets().  See writeRamAddress() for cautions.
+
+    @param address The address of the first byte
+    @param data The bytes to write
+    @return The number of bytes written.  Less than len(data) if a write failed.
+    """
+    def writeRamRange(self, address, data):
+        count = len(data)
+        done = 0
+        while (done < count):
+            n = min(self.rangePacketsPerBatch, count - done)
+            txList = []
+            for i in range(n):
+                tx = self._newPacket(PKT_CMD_U16_U16, SerialWombatCommands.COMMAND_BINARY_WRITE_RAM, (address + done + i) & 0xFFFF, 0)
+                tx[5] = data[done + i]
+                txList.append(tx)
+            results = self.sendPackets(txList)
+            for i in range(n):
+                if (results[i][0] < 0):
+                    return done
+                done += 1
+        return done
 
     """!
     @brief Shuts down most functions of the Serial Wombat chip reducing power consumption
@@ -860,7 +1402,9 @@ class SerialWombatChip:
         return ( self._modelChar(1) == ord('1') and self._modelChar(2) == ord('8'))
 
     def isLatestFirmware(self):
-        v = self.readVersion_uint32()
+        if (self._modelChar(0) == 0):
+            self.readVersion()
+        v = self._firmwareVersionNumber()
         if (self.isSW18()):
             return (v == SW18AB_LATEST_FIRMWARE)
         elif (self.isSW08()):
@@ -868,30 +1412,80 @@ class SerialWombatChip:
         else:
             return (v == SW4B_LATEST_FIRMWARE)
 
-    def isPinModeSupported(self, pinMode):
+    _SW04_PIN_MODES = (SerialWombatPinMode_t.PIN_MODE_DIGITALIO,
+                       SerialWombatPinMode_t.PIN_MODE_ANALOGINPUT,
+                       SerialWombatPinMode_t.PIN_MODE_CONTROLLED,
+                       SerialWombatPinMode_t.PIN_MODE_SERVO,
+                       SerialWombatPinMode_t.PIN_MODE_PWM,
+                       SerialWombatPinMode_t.PIN_MODE_DEBOUNCE,
+                       SerialWombatPinMode_t.PIN_MODE_QUADRATUREENCODER,
+                       SerialWombatPinMode_t.PIN_MODE_WATCHDOG,
+                       SerialWombatPinMode_t.PIN_MODE_PULSETIMER,
+                       SerialWombatPinMode_t.PIN_MODE_PROTECTED_OUTPUT)
+
+    #! @brief Highest pin mode number checked by readSupportedPinModes()
+    PIN_MODE_PROBE_LAST = SerialWombatPinMode_t.PIN_MODE_RANDOMBLINK
+
+    """!
+    @brief Query the chip for every pin mode it supports
+
+    All pin modes from 0 to PIN_MODE_PROBE_LAST are checked in one sendPackets() batch.  The
+    result is kept and used by isPinModeSupported() until the firmware version read from the chip changes.
+    @return A set of supported pin mode numbers
+    """
+    def readSupportedPinModes(self):
         if (self.isSW04()):
-            return pinMode in (SerialWombatPinMode_t.PIN_MODE_DIGITALIO,
-                               SerialWombatPinMode_t.PIN_MODE_ANALOGINPUT,
-                               SerialWombatPinMode_t.PIN_MODE_CONTROLLED,
-                               SerialWombatPinMode_t.PIN_MODE_SERVO,
-                               SerialWombatPinMode_t.PIN_MODE_PWM,
-                               SerialWombatPinMode_t.PIN_MODE_DEBOUNCE,
-                               SerialWombatPinMode_t.PIN_MODE_QUADRATUREENCODER,
-                               SerialWombatPinMode_t.PIN_MODE_WATCHDOG,
-                               SerialWombatPinMode_t.PIN_MODE_PULSETIMER,
-                               SerialWombatPinMode_t.PIN_MODE_PROTECTED_OUTPUT)
-        tx = [SerialWombatCommands.CONFIGURE_CHANNEL_MODE_CHECK_MODE_SUPPORTED, 1, pinMode, 0x55, 0x55, 0x55, 0x55, 0x55]
-        result, rx = self.sendPacket(tx)
-        return (-result != 3)
+            self._supportedPinModes = set(self._SW04_PIN_MODES)
+            return self._supportedPinModes
+        txList = []
+        for pinMode in range(self.PIN_MODE_PROBE_LAST + 1):
+            txList.append([SerialWombatCommands.CONFIGURE_CHANNEL_MODE_CHECK_MODE_SUPPORTED, 1, pinMode])
+        results = self.sendPackets(txList, countErrors = False)
+        supported = set()
+        complete = True
+        for pinMode in range(len(results)):
+            result = results[pinMode][0]
+            if (-result != 3):  # Error 3, unknown pin mode
+                supported.add(pinMode)
+                if (result < 0):
+                    complete = False
+        self._supportedPinModes = supported
+        self._supportedPinModesComplete = complete
+        return supported
+
+    def _loadSupportedPinModes(self):
+        if (self._supportedPinModes is not None and self._supportedPinModesComplete):
+            return  # Already read, and readVersion() discards it if the firmware changes
+        entry = self._identityEntry()
+        if (entry is not None and "pinModes" in entry):
+            self._supportedPinModes = set(entry["pinModes"])
+            self._supportedPinModesComplete = True  # Only complete tables are cached
+            return
+        self.readSupportedPinModes()
+        if (entry is not None and self._supportedPinModesComplete):
+            self.identityCache.update(self.identityKey(), pinModes = sorted(self._supportedPinModes))
+
+    """!
+    @brief Returns True if the chip's firmware supports a pin mode
+
+    Answered from the table read by readSupportedPinModes(), which is read at begin() or on the first call.
+    """
+    def isPinModeSupported(self, pinMode):
+        if (pinMode > self.PIN_MODE_PROBE_LAST and not self.isSW04()):
+            tx = [SerialWombatCommands.CONFIGURE_CHANNEL_MODE_CHECK_MODE_SUPPORTED, 1, pinMode, 0x55, 0x55, 0x55, 0x55, 0x55]
+            result, rx = self.sendPackets([tx], countErrors = False)[0]  # Error 3 is the expected answer for unsupported modes
+            return (-result != 3)
+        if (self._supportedPinModes is None):
+            self.readSupportedPinModes()
+        return (pinMode in self._supportedPinModes)
 
     def sendPacketNoResponse(self, tx):
         result, rx = self.sendPacketToHardware(tx)
         return result
 
     def comparePublicDataToThreshold(self, threshold = 0):
-        tx = bytearray([SerialWombatCommands.COMMAND_BINARY_PIN_POLL_THRESHOLD]) + SW_LE16(threshold) + bytearray([0x55,0x55,0x55,0x55,0x55])
-        result, rx = self.sendPacket(tx)
-        return (rx[1] + (rx[2] << 8) + (rx[3] << 16) + (rx[4] << 24))
+        result, rx = self.sendPacket(self.encodePacket(PKT_CMD_U16, SerialWombatCommands.COMMAND_BINARY_PIN_POLL_THRESHOLD, threshold))
+        return (unpackResponse(RSP_U32, rx, 1)[0])
 
     def sleep4B(self):
         self.sleep()
@@ -902,8 +1496,7 @@ class SerialWombatChip:
         self._asleep = True
 
     def setAddress(self, address):
-        tx = bytearray([SerialWombatCommands.COMMAND_BINARY_SET_ADDRESS]) + SW_LE32(address) + bytearray([0x55,0x55,0x55])
-        result, rx = self.sendPacket(tx)
+        result, rx = self.sendPacket(self.encodePacket(PKT_CMD_U32, SerialWombatCommands.COMMAND_BINARY_SET_ADDRESS, address))
         return result
 
 
@@ -954,18 +1547,16 @@ class SerialWombatChip:
             bytesToSend = 4
             count -= 4
 
-        tx = [0x84,address & 0xFF, int(address / 256), bytesToSend, 0x55,0x55,0x55,0x55]
-        for i in range (bytesToSend):
-            tx[4+i] = buf[i]
+        tx = self.encodePacket(PKT_CMD_U16_U8, 0x84, address, bytesToSend)
+        tx[4:4 + bytesToSend] = buf[0:bytesToSend]
         result,rx = self.sendPacket(tx)
         if (result < 0):
             return (count)
         bytesSent = bytesToSend
 
         while (count >= 7):
-            tx = [0x85,0x55,0x55,0x55,0x55,0x55,0x55,0x55]
-            for i in range(7):
-                tx[i+1] = buf[bytesSent + i]
+            tx = self.encodePacket(PKT_CMD, 0x85)
+            tx[1:8] = buf[bytesSent:bytesSent + 7]
             result,rx = self.sendPacket(tx)           
             if (result < 0):
                 return count
@@ -979,10 +1570,8 @@ class SerialWombatChip:
                 count = 0
             else:
                 count -=4
-            a = address + bytesSent
-            tx = [0x84,a & 0xFF, a//256,bytesToSend,0x55,0x55,0x55,0x55]
-            for i in range(bytesToSend):
-                tx[4+i] = buf[i + bytesSent]
+            tx = self.encodePacket(PKT_CMD_U16_U8, 0x84, address + bytesSent, bytesToSend)
+            tx[4:4 + bytesToSend] = buf[bytesSent:bytesSent + bytesToSend]
             result,rx = self.sendPacket(tx)
             if (result < 0):
                 return(count)
@@ -997,20 +1586,45 @@ class SerialWombatChip:
     @return A bytearray containing the read bytes
     """
     def readUserBuffer(self, index, count):
-            buffer = bytearray()
-            while (len(buffer) < count):
-            
-                    tx = bytearray([ SerialWombatCommands.COMMAND_BINARY_READ_USER_BUFFER])+ SW_LE16(index)+ bytearray([0x55,0x55,0x55,0x55,0x55])
-                    result, rx = self.sendPacket(tx)
-                    if (result >= 0):
-                        for i in range(1,8):
-                                    buffer+= bytearray(rx[i])
-                                    if (len(buffer) >= count):
-                                            break
-                    else:
-                            return (buffer)
-            
+            buffer = bytearray(count)
+            bytesRead = self.readUserBufferInto(index, buffer)
+            if (bytesRead < count):
+                    return buffer[:bytesRead]
             return (buffer)
+
+    """!
+    @brief Read bytes from the User Memory Buffer into a caller supplied buffer
+
+    Each read packet returns 7 bytes.  The packets are pipelined through sendPackets() in groups
+    of rangePacketsPerBatch, and the data is copied straight into buffer.
+
+    @param index The index into the User Buffer array of bytes from which data should be read
+    @param buffer A bytearray or writable memoryview to fill
+    @param count Number of bytes to read.  If None, len(buffer) bytes are read.
+    @return The number of bytes read into buffer.  Less than count if a read failed.
+    """
+    def readUserBufferInto(self, index, buffer, count = None):
+            if (count is None):
+                    count = len(buffer)
+            view = memoryview(buffer)
+            bytesRead = 0
+            while (bytesRead < count):
+                    txList = []
+                    position = bytesRead
+                    while (position < count and len(txList) < self.rangePacketsPerBatch):
+                            txList.append(self._newPacket(PKT_CMD_U16, SerialWombatCommands.COMMAND_BINARY_READ_USER_BUFFER, index + position))
+                            position += 7
+                    results = self.sendPackets(txList)
+                    for result, rx in results:
+                            if (result < 0):
+                                    return bytesRead
+                            if (isinstance(rx, list)):
+                                    rx = bytes(rx)
+                            n = min(7, count - bytesRead)
+                            view[bytesRead:bytesRead + n] = rx[1:1 + n]
+                            bytesRead += n
+            return bytesRead
+
     """!
     @brief Enable UART command interface in addition to I2C (SW18AB Only)
     @param 2nd communication interface is enabled
@@ -1151,6 +1765,10 @@ class SerialWombatChip:
         return(self.lastErrorCode.cmd)
 
 
+    """!
+    @brief Register a function to be called whenever a packet returns an error
+    @param handler A function taking (errorCode, serialWombatChip), or None to remove the handler
+    """
     def registerErrorHandler(self, handler):
         self.errorHandler = handler
 	
@@ -1159,6 +1777,9 @@ class SerialWombatChip:
 	#  @brief How many times to retry a packet if communcation bus (such as I2C) error
     communicationErrorRetries = 5
 
+    #! @brief SerialWombatRetryPolicy used for transport failures, or None to fail on the first one.  Set on the class to apply to all chips.
+    retryPolicy = None
+
     def echo(self, data,  count = 7):
         tx = bytes("!UUUUUUU",'utf-8')
         for i in range(count):
@@ -1172,26 +1793,85 @@ class SerialWombatChip:
 
     def readBirthday(self):
         if (self.isSW18()):
-            birthday = (self.readFlashAddress(0x2A00C) >> 8) & 0xFF
+            entry = self._identityEntry()
+            if (entry is not None and "birthday" in entry):
+                return entry["birthday"]
+            words = self.readFlashRange(0x2A00C, 3)
+            if (len(words) < 12):
+                return 0
+            birthday = words[1]
             birthday *= 100
-            birthday += (self.readFlashAddress(0x2A00C)) & 0xFF
+            birthday += words[0]
             birthday *= 100
-            birthday += self.readFlashAddress(0x2A00E) & 0xFF
+            birthday += words[4]
             birthday *= 100
-            birthday += self.readFlashAddress(0x2A010) & 0xFF
+            birthday += words[8]
+            if (entry is not None):
+                self.identityCache.update(self.identityKey(), birthday = birthday)
             return (birthday)
         return 0
 
     def readBrand(self):
         data = bytearray()
         if (self.isSW18()):
-            for i in range(32):
-                val = self.readFlashAddress(0x2A020 + i * 2) ;
-                if ((val & 0xFF) != 0xFF):
-                    data.add(val & 0xFF)
-                else:
-                    return (data)
-        return data 
+            entry = self._identityEntry()
+            if (entry is not None and "brand" in entry):
+                return bytearray(entry["brand"])
+            # Read 8 words per batch; the brand ends at the first 0xFF
+            for first in range(0, 32, 8):
+                words = self.readFlashRange(0x2A020 + first * 2, 8)
+                for i in range(0, len(words), 4):
+                    if (words[i] == 0xFF):
+                        break
+                    data.append(words[i])
+                if (len(words) < 32 or words[i] == 0xFF):
+                    break
+            if (entry is not None):
+                self.identityCache.update(self.identityKey(), brand = list(data))
+        return data
+
+
+"""!
+    @brief A group of packets that are sent to a Serial Wombat chip together
+
+    Created by SerialWombatChip.batch().  Packets are collected with sendPacket() and sent
+    through SerialWombatChip.sendPackets() by send(), or automatically at the end of a with block.
+    The responses are stored in results as (result, rx) tuples in the order the packets were added.
+"""
+class SerialWombatPacketBatch:
+    def __init__(self, serial_wombat):
+        self._sw = serial_wombat
+        self.packets = []
+        self.results = []
+
+    """!
+    @brief Add a packet to the batch
+    @param tx The packet to send.  It is copied, so the caller may reuse it.
+    @return The index of this packet's response in results after the batch is sent
+    """
+    def sendPacket(self, tx):
+        self.packets.append(bytearray(tx))
+        return len(self.packets) - 1
+
+    """!
+    @brief Send all collected packets
+    @return The list of (result, rx) tuples, also stored in results
+    """
+    def send(self):
+        self.results = self._sw.sendPackets(self.packets)
+        self.packets = []
+        return self.results
+
+    def __len__(self):
+        return len(self.packets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if (excType is None):
+            self.send()
+        return False
 
 
 """!
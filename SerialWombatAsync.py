@@ -0,0 +1,318 @@
+"""
+Copyright 2020-2023 Broadwell Consulting Inc.
+
+"Serial Wombat" is a registered trademark of Broadwell Consulting Inc. in
+the United States.  See SerialWombat.com for usage guidance.
+
+Permission is hereby granted, free of charge, to any person obtaining a
+ * copy of this software and associated documentation files (the "Software"),
+ * to deal in the Software without restriction, including without limitation
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,
+ * and/or sell copies of the Software, and to permit persons to whom the
+ * Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+ * THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+ * OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+ * ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+ * OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""! @file SerialWombatAsync.py
+
+asyncio interface to Serial Wombat chips.  CPython only.
+
+An AsyncSerialWombatChip wraps an instance of any of the synchronous interface classes
+(SerialWombatChip_smbus2_i2c, SerialWombatChip_cpy_serial, etc.) and provides coroutine versions
+of sendPacket and the most frequently used chip and driver calls.  Blocking transport calls are run
+on a worker thread owned by the chip (pyserial and smbus2 release the GIL while they wait on the
+hardware), so one event loop can drive many chips on separate serial ports and buses concurrently:
+
+    chips = [AsyncSerialWombatChip(sw) for sw in syncChips]
+    values = await asyncio.gather(*[c.readPublicData(0) for c in chips])
+
+Chips that share a physical bus should share an executor so that their transactions are serialized.
+Interfaces that can do non-blocking I/O natively can subclass AsyncSerialWombatChip and override
+the sendReceivePacketHardware and sendPacketToHardware coroutines.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import SerialWombat
+from SerialWombat import SW_LE16
+from ArduinoFunctions import millis, micros
+
+
+class AsyncSerialWombatChip:
+    """!
+    @brief Constructor for AsyncSerialWombatChip
+    @param serial_wombat A synchronous SerialWombatChip interface instance that performs the I/O
+    @param executor The executor used for blocking transport calls.  If None, a single thread executor is created for this chip.
+    """
+    def __init__(self, serial_wombat, executor = None):
+        self._sw = serial_wombat
+        if (executor is None):
+            executor = ThreadPoolExecutor(max_workers = 1)
+        self._executor = executor
+
+    """!
+    @brief The synchronous SerialWombatChip that performs the I/O for this instance
+    """
+    def chip(self):
+        return self._sw
+
+    """!
+    @brief Run a blocking call on this chip's worker thread
+    
+    Any synchronous chip or driver method can be awaited this way, for instance
+    await asw.call(servo.writePublicData, 0x8000)
+    """
+    async def call(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: function(*args))
+
+    async def sendReceivePacketHardware(self, tx):
+        return await self.call(self._sw.sendReceivePacketHardware, tx)
+
+    async def sendReceivePacketsHardware(self, txList):
+        return await self.call(self._sw.sendReceivePacketsHardware, txList)
+
+    async def sendPacketToHardware(self, tx):
+        return await self.call(self._sw.sendPacketToHardware, tx)
+
+    async def _prepareToSend(self):
+        sw = self._sw
+        if (sw.sendReadyTime != 0):
+            wait = sw.sendReadyTime - millis()
+            if (wait > 0):
+                await asyncio.sleep(wait / 1000)
+        if (sw._asleep or sw.sendReadyTime != 0):
+            await self.call(sw._prepareToSend)
+
+    """!
+    @brief Coroutine version of SerialWombatChip.sendPacket
+    @return (result, rx) as returned by SerialWombatChip.sendPacket
+    """
+    async def sendPacket(self, tx, retryIfEchoDoesntMatch = False, startBytesToMatch = 1, endBytesToMatch = 0):
+        sw = self._sw
+        tx = sw._padPacket(tx)
+        await self._prepareToSend()
+        exchange = sw._startExchange(tx, retryIfEchoDoesntMatch)
+        if (exchange is None):
+            return (-48, bytes("E00048UU",'utf-8'))
+        while (True):
+            result,rx = await self.sendReceivePacketHardware(tx)
+            wait = sw._checkResponse(exchange, result, rx, startBytesToMatch, endBytesToMatch)
+            if (wait < 0):
+                return sw._finishExchange(exchange)
+            await asyncio.sleep(wait / 1000000)
+
+    """!
+    @brief Coroutine version of SerialWombatChip.sendPackets
+    @return A list of (result, rx) tuples, one per packet
+    """
+    async def sendPackets(self, txList, retryIfEchoDoesntMatch = False, startBytesToMatch = 1, endBytesToMatch = 0, countErrors = True):
+        sw = self._sw
+        packets = []
+        for tx in txList:
+            packets.append(sw._padPacket(bytearray(tx)))
+        if (len(packets) == 0):
+            return []
+        await self._prepareToSend()
+        policy = sw.retryPolicy
+        if (policy is not None and policy.isOpen(sw)):
+            return sw._breakerOpenResults(len(packets), countErrors)
+        startTime = micros()
+        responses = await self.sendReceivePacketsHardware(packets)
+        results, resends = sw._checkResponses(packets, responses, micros() - startTime,
+                retryIfEchoDoesntMatch, startBytesToMatch, endBytesToMatch, countErrors)
+        for i, wait in resends:
+            await asyncio.sleep(wait / 1000000)
+            results[i] = await self.sendPacket(packets[i], retryIfEchoDoesntMatch, startBytesToMatch, endBytesToMatch)
+        return results
+
+    """!
+    @brief Coroutine version of SerialWombatChip.begin
+
+    The one second wait after reset is an asyncio.sleep, so other chips keep running meanwhile.
+    """
+    async def begin(self, reset = True):
+        sw = self._sw
+        if (reset):
+            await self.call(sw.hardwareReset)
+            await asyncio.sleep(1.0)
+            sw.sendReadyTime = 0
+            await self.call(sw.initialize)
+            return 1
+        sw.sendReadyTime = 0
+        return await self.call(sw.initialize)
+
+    async def readVersion(self):
+        sw = self._sw
+        count,rx = await self.sendPacket(bytearray("VUUUUUUU",'utf8'))
+        if (count >= 0):
+            sw._setVersion(rx)
+        return sw.version
+
+    """!
+    @brief Coroutine version of SerialWombatChip.readPublicData
+    @param pin The pin (or special meaning value) for which to retreive data
+    @return 16 bit public data for pin specified
+    """
+    async def readPublicData(self, pin):
+        tx = [0x81,pin,255,255,0x55,0x55,0x55,0x55]
+        count,rx = await self.sendPacket(tx)
+        return (rx[2]+ rx[3] * 256)
+
+    """!
+    @brief Coroutine version of SerialWombatChip.writePublicData
+    """
+    async def writePublicData(self, pin, value, secondPin = None, secondValue = None):
+        value = value & 0xFFFF
+        if (secondPin is None):
+            tx = [0x82, pin, value & 0xFF, value // 256, 255, 0x55,0x55,0x55]
+        else:
+            secondValue = secondValue & 0xFFFF
+            tx = [0x82, pin, value & 0xFF, value // 256, secondPin, secondValue & 0xFF, secondValue // 256, 0x55]
+        count,rx = await self.sendPacket(tx)
+        return (rx[2] + rx[3] * 256)
+
+    async def readPublicDataMany(self, pins, into = None, timestamps = None, errors = None):
+        return await self.call(self._sw.readPublicDataMany, pins, into, timestamps, errors)
+
+    async def readSupplyVoltage_mV(self):
+        return await self.call(self._sw.readSupplyVoltage_mV)
+
+    async def readUserBuffer(self, index, count):
+        return await self.call(self._sw.readUserBuffer, index, count)
+
+    async def readUserBufferInto(self, index, buffer, count = None):
+        return await self.call(self._sw.readUserBufferInto, index, buffer, count)
+
+    async def writeUserBuffer(self, index, buf, count):
+        return await self.call(self._sw.writeUserBuffer, index, buf, count)
+
+
+"""!
+@brief asyncio version of the SerialWombatQueue read calls
+
+Wraps a SerialWombatQueue that has already been begun (or whose startIndex has been set)
+and the AsyncSerialWombatChip for the same chip.
+"""
+class AsyncSerialWombatQueue:
+    def __init__(self, async_serial_wombat, queue):
+        self._asw = async_serial_wombat
+        self._queue = queue
+        self.pollInterval_mS = 1
+
+    async def available(self):
+        tx = bytearray([0x94])+ SW_LE16(self._queue.startIndex) + bytearray([0x55,0x55,0x55,0x55,0x55])
+        sendResult,rx = await self._asw.sendPacket(tx)
+        if (sendResult >= 0):
+            return (rx[4] + 256 * rx[5])
+        return (0)
+
+    async def read(self):
+        tx = bytearray([0x93]) +  SW_LE16(self._queue.startIndex) + bytearray([1,0x55,0x55,0x55,0x55])
+        sendResult,rx = await self._asw.sendPacket(tx)
+        if (sendResult >= 0):
+            if (rx[1] == 1):
+                return (rx[2])
+        return (-1)
+
+    """!
+    @brief Reads up to length bytes from the Serial Wombat Queue
+    @return A bytearray of the bytes read.  May be shorter than length if fewer bytes were available.
+    """
+    async def readBytes(self, length):
+        startTime = millis()
+        buffer = bytearray()
+        bytesAvailable = await self.available()
+        if (bytesAvailable < length):
+            length = bytesAvailable
+        while (len(buffer) < length):
+            bytesToRead = length - len(buffer)
+            if (bytesToRead > 6):
+                bytesToRead = 6
+            tx = bytearray([0x93]) + SW_LE16(self._queue.startIndex) + bytearray([bytesToRead,0x55,0x55,0x55,0x55])
+            sendResult,rx = await self._asw.sendPacket(tx)
+            if (sendResult < 0):
+                return buffer
+            for i in range(min(rx[1], length - len(buffer))):
+                buffer.append(rx[2 + i])
+            if (rx[1] == 0):
+                if (millis() > startTime + self._queue._timeout):
+                    return buffer
+                await asyncio.sleep(self.pollInterval_mS / 1000)
+        return buffer
+
+
+"""!
+@brief asyncio version of the SerialWombatUART read calls
+
+Wraps a SerialWombatUART (hardware UART) that has already been begun and the
+AsyncSerialWombatChip for the same chip.  Waiting for data yields to the event loop.
+"""
+class AsyncSerialWombatUART:
+    def __init__(self, async_serial_wombat, uart):
+        self._asw = async_serial_wombat
+        self._uart = uart
+        self.pollInterval_mS = 1
+
+    async def available(self):
+        u = self._uart
+        tx = [ 201, u._pin,u._pinMode, 0,0x55,0x55,0x55,0x55 ]
+        result,rx = await self._asw.sendPacket(tx)
+        return (rx[4])
+
+    async def read(self):
+        u = self._uart
+        tx = [ 202, u._pin,u._pinMode, 1,0x55,0x55,0x55,0x55 ]
+        result,rx = await self._asw.sendPacket(tx)
+        if (result < 0):
+            return -1
+        if (rx[3] != 0):
+            return (rx[4])
+        return (-1)
+
+    """!
+    @brief Reads up to length bytes from the UART receive queue
+    @return A bytearray of received bytes.  Returns early if no data arrives within the UART's timeout.
+    """
+    async def readBytes(self, length):
+        u = self._uart
+        buf = bytearray()
+        timeoutMillis = millis() + u.timeout
+        while (length > 0 and timeoutMillis > millis()):
+            bytecount = 4
+            if (length < 4):
+                bytecount = length
+            tx = [ 202, u._pin,u._pinMode, bytecount,0x55,0x55,0x55,0x55 ]
+            result,rx = await self._asw.sendPacket(tx)
+            if (result < 0):
+                return buf
+            bytesAvailable = rx[3]
+            if (bytesAvailable == 0):
+                await asyncio.sleep(self.pollInterval_mS / 1000)
+                continue
+            timeoutMillis = millis() + u.timeout
+            bytesReturned = min(bytecount, bytesAvailable)
+            for i in range(bytesReturned):
+                buf.append(rx[i + 4])
+            bytesAvailable -= bytesReturned
+            length -= bytesReturned
+
+            while (bytesAvailable >= 7 and length >= 7):
+                tx = [ u._rx7Command, 0x55,0x55,0x55,0x55,0x55,0x55,0x55 ]
+                result,rx = await self._asw.sendPacket(tx)
+                if (result < 0):
+                    return buf
+                buf += bytearray(rx[1:8])
+                bytesAvailable -= 7
+                length -= 7
+        return buf
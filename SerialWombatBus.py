@@ -0,0 +1,257 @@
+"""
+Copyright 2020-2023 Broadwell Consulting Inc.
+
+"Serial Wombat" is a registered trademark of Broadwell Consulting Inc. in
+the United States.  See SerialWombat.com for usage guidance.
+
+Permission is hereby granted, free of charge, to any person obtaining a
+ * copy of this software and associated documentation files (the "Software"),
+ * to deal in the Software without restriction, including without limitation
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,
+ * and/or sell copies of the Software, and to permit persons to whom the
+ * Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+ * THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+ * OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+ * ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+ * OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""! @file SerialWombatBus.py
+
+Thread safe sharing of one I2C bus or serial port by several SerialWombatChip instances.
+"""
+
+import heapq
+import threading
+from ArduinoFunctions import micros
+
+
+#! @brief Priority class for real time control traffic such as servo, PWM and PID updates
+PRIORITY_CONTROL = 0
+#! @brief Priority class for periodic sampling
+PRIORITY_TELEMETRY = 1
+#! @brief Priority class for large transfers such as framebuffer uploads, queue fills and firmware updates
+PRIORITY_BULK = 2
+
+PRIORITY_NAMES = {PRIORITY_CONTROL: "control", PRIORITY_TELEMETRY: "telemetry", PRIORITY_BULK: "bulk"}
+
+_context = threading.local()
+
+"""!
+@brief Return the priority class set by SerialWombatPriority for the calling thread, or default if none is set
+"""
+def currentPriority(default = None):
+    priority = getattr(_context, "priority", None)
+    if (priority is None):
+        return default
+    return priority
+
+"""!
+@brief Context manager that sets the priority class of the calling thread's bus transactions
+
+    with SerialWombatPriority(PRIORITY_BULK):
+        vga.fillRect(0, 0, 160, 120, 1)
+
+Transactions made inside the with block use this class instead of the chip's attached priority.
+Blocks may be nested.
+"""
+class SerialWombatPriority:
+    def __init__(self, priority):
+        self.priority = priority
+        self._previous = None
+
+    def __enter__(self):
+        self._previous = currentPriority()
+        _context.priority = self.priority
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        _context.priority = self._previous
+        return False
+
+
+"""!
+@brief Per chip and per priority class counters kept by SerialWombatBus
+"""
+class SerialWombatBusStats:
+    def __init__(self):
+        #! @brief Number of times the chip was given the bus
+        self.transactions = 0
+        #! @brief Number of packets sent in those transactions
+        self.packets = 0
+        #! @brief Total and largest time in uS spent waiting for the bus
+        self.waitTime_uS = 0
+        self.maxWaitTime_uS = 0
+        #! @brief Total time in uS the chip held the bus
+        self.busyTime_uS = 0
+
+    def snapshot(self):
+        return {
+            "transactions": self.transactions,
+            "packets": self.packets,
+            "waitTime_uS": self.waitTime_uS,
+            "maxWaitTime_uS": self.maxWaitTime_uS,
+            "busyTime_uS": self.busyTime_uS,
+        }
+
+
+"""!
+@brief Owns a bus shared by several chips and gives it to one transaction at a time
+
+Every hardware transaction of an attached chip waits for the bus.  Waiting transactions are
+queued and granted in arrival order (fairness "fifo"), or lowest priority number first with
+arrival order breaking ties (fairness "priority").  A transaction's priority is the class set by
+SerialWombatPriority in the calling thread, or else the priority the chip was attached with.
+A transaction started while the same thread already holds the bus, for instance
+sendReceivePacketsHardware() calling sendReceivePacketHardware(), runs without waiting.
+
+Pipelined transactions of PRIORITY_BULK or lower priority are split into transactions of
+bulkChunkPackets packets, and the bus is released between them.  With "priority" fairness a
+control packet therefore waits for at most one chunk of a bulk transfer, however long the
+transfer is.  Queueing delay is reported per priority class by classSnapshot().
+
+    bus = SerialWombatBus()
+    for sw in SerialWombatChipInstance([0x6B, 0x6C, 0x6D]):
+        bus.attach(sw)
+
+The chips may then be used from different threads, including one chip from several threads,
+as each thread encodes packets into its own buffer.  Operations that span several packets on
+one driver object, such as a queue or UART read, should still be kept to one thread.
+"""
+class SerialWombatBus:
+    """!
+    @param fairness "fifo" or "priority"
+    """
+    def __init__(self, fairness = "fifo"):
+        if (fairness not in ("fifo", "priority")):
+            raise ValueError("fairness must be 'fifo' or 'priority'")
+        self.fairness = fairness
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._sequence = 0
+        self._owner = None
+        self._depth = 0
+        self._chips = []
+        self._stats = {}
+        self._classStats = {}
+        #! @brief Largest number of packets a bulk transaction holds the bus for
+        self.bulkChunkPackets = 4
+
+    """!
+    @brief Route chip's hardware transactions through this bus
+    @param chip A SerialWombatChip on this bus
+    @param priority Used when fairness is "priority".  Lower numbers are served first.
+    @return chip
+    """
+    def attach(self, chip, priority = 0):
+        stats = SerialWombatBusStats()
+        self._chips.append(chip)
+        self._stats[id(chip)] = stats
+        chip.bus = self
+        sendReceive = chip.sendReceivePacketHardware
+        sendReceiveMany = chip.sendReceivePacketsHardware
+        sendOnly = chip.sendPacketToHardware
+
+        def busSendReceivePacketHardware(tx):
+            return self.transact(stats, currentPriority(priority), 1, sendReceive, tx)
+
+        def busSendReceivePacketsHardware(txList):
+            packetPriority = currentPriority(priority)
+            chunk = self.bulkChunkPackets
+            if (packetPriority < PRIORITY_BULK or len(txList) <= chunk or self._owner == threading.get_ident()):
+                return self.transact(stats, packetPriority, len(txList), sendReceiveMany, txList)
+            responses = []
+            for start in range(0, len(txList), chunk):
+                part = txList[start:start + chunk]
+                responses += self.transact(stats, packetPriority, len(part), sendReceiveMany, part)
+            return responses
+
+        def busSendPacketToHardware(tx):
+            return self.transact(stats, currentPriority(priority), 1, sendOnly, tx)
+
+        chip.sendReceivePacketHardware = busSendReceivePacketHardware
+        chip.sendReceivePacketsHardware = busSendReceivePacketsHardware
+        chip.sendPacketToHardware = busSendPacketToHardware
+        return chip
+
+    def _acquire(self, priority):
+        me = threading.get_ident()
+        with self._condition:
+            if (self._owner == me):
+                self._depth += 1
+                return False
+            if (self._owner is not None or len(self._waiting) > 0):
+                if (self.fairness == "fifo"):
+                    priority = 0
+                entry = (priority, self._sequence)
+                self._sequence += 1
+                heapq.heappush(self._waiting, entry)
+                while (self._owner is not None or self._waiting[0] != entry):
+                    self._condition.wait()
+                heapq.heappop(self._waiting)
+            self._owner = me
+            self._depth = 1
+            return True
+
+    def _release(self):
+        with self._condition:
+            self._depth -= 1
+            if (self._depth == 0):
+                self._owner = None
+                self._condition.notify_all()
+
+    """!
+    @brief Call function(*args) while holding the bus, and count it in stats
+    """
+    def transact(self, stats, priority, packets, function, *args):
+        requested = micros()
+        outermost = self._acquire(priority)
+        try:
+            if (not outermost):
+                return function(*args)
+            start = micros()
+            classStats = self._classStats.get(priority)
+            if (classStats is None):
+                classStats = SerialWombatBusStats()
+                self._classStats[priority] = classStats
+            wait = start - requested
+            for counters in (stats, classStats):
+                counters.transactions += 1
+                counters.packets += packets
+                counters.waitTime_uS += wait
+                if (wait > counters.maxWaitTime_uS):
+                    counters.maxWaitTime_uS = wait
+            result = function(*args)
+            busy = micros() - start
+            stats.busyTime_uS += busy
+            classStats.busyTime_uS += busy
+            return result
+        finally:
+            self._release()
+
+    """!
+    @brief Return the statistics of an attached chip
+    @return A SerialWombatBusStats
+    """
+    def stats(self, chip):
+        return self._stats[id(chip)]
+
+    """!
+    @brief Return every attached chip's statistics as a dictionary keyed by the chip's identityKey()
+    """
+    def snapshot(self):
+        return dict([(chip.identityKey(), self._stats[id(chip)].snapshot()) for chip in self._chips])
+
+    """!
+    @brief Return the statistics of each priority class that has used the bus
+    @return A dictionary keyed by class name ("control", "telemetry", "bulk", or the number of other classes)
+    """
+    def classSnapshot(self):
+        return dict([(PRIORITY_NAMES.get(priority, str(priority)), stats.snapshot()) for priority, stats in self._classStats.items()])
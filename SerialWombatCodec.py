@@ -0,0 +1,125 @@
+"""
+Copyright 2020-2023 Broadwell Consulting Inc.
+
+"Serial Wombat" is a registered trademark of Broadwell Consulting Inc. in
+the United States.  See SerialWombat.com for usage guidance.
+
+Permission is hereby granted, free of charge, to any person obtaining a
+ * copy of this software and associated documentation files (the "Software"),
+ * to deal in the Software without restriction, including without limitation
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,
+ * and/or sell copies of the Software, and to permit persons to whom the
+ * Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+ * THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+ * OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+ * ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+ * OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""! @file SerialWombatCodec.py
+
+Precompiled packet layouts for encoding Serial Wombat commands and decoding their responses.
+
+Packets are encoded into a reusable 8 byte buffer that each SerialWombatChip keeps per thread:
+
+    tx = sw.encodePacket(PKT_CMD_U16, 0x94, queueIndex)
+    result, rx = sw.sendPacket(tx)
+    available, free = unpackResponse(RSP_U16_U16, rx, 4)
+
+Every PKT_ layout covers all 8 bytes of a packet.  Its last field is the 0x55 padding, which
+encodePacket() supplies, so a packet is encoded with a single pack_into and no lists or intermediate
+bytearrays are created.  The buffer is overwritten by the next encodePacket() call on the same
+chip from the same thread, so it must be sent before that thread encodes another packet.  Threads
+sharing a chip each have their own buffer and don't overwrite each other's packets.
+
+MicroPython's struct module has no Struct class.  A small compatible shim is used there.
+"""
+
+try:
+    import struct
+except ImportError:
+    import ustruct as struct
+
+
+class _Struct():
+    def __init__(self, format):
+        self.format = format
+        self.size = struct.calcsize(format)
+
+    def pack_into(self, buffer, offset, *values):
+        struct.pack_into(self.format, buffer, offset, *values)
+
+    def unpack_from(self, buffer, offset = 0):
+        return struct.unpack_from(self.format, buffer, offset)
+
+
+def Struct(format):
+    if (hasattr(struct, "Struct")):
+        return struct.Struct(format)
+    return _Struct(format)
+
+
+## Eight 0x55 bytes, the padding for unused packet bytes
+PACKET_PADDING = b"\x55\x55\x55\x55\x55\x55\x55\x55"
+
+"""!
+@brief Make an 8 byte packet layout from the format of its leading fields
+@param format struct format, without byte order, of the fields starting with the command byte
+"""
+def PacketLayout(format):
+    return Struct("<%s%ds" % (format, 8 - struct.calcsize("<" + format)))
+
+# Packet layouts.  All start with the command byte.
+
+## Command only, for commands followed by 7 data bytes (0x85, 0x92, 0xB1, 0xB3)
+PKT_CMD = PacketLayout("B")
+## Command, 16 bit index or address (0x83, 0x8F, 0x94, 0xA0 ...)
+PKT_CMD_U16 = PacketLayout("BH")
+## Command, 16 bit index, count byte (0x91 and 0x93 queue add and read)
+PKT_CMD_U16_U8 = PacketLayout("BHB")
+## Command, 16 bit index, 16 bit value (0x90 queue initialize, 0xA3 RAM write)
+PKT_CMD_U16_U16 = PacketLayout("BHH")
+## Command, 32 bit address (0xA1 flash read, 0xB9 set address)
+PKT_CMD_U32 = PacketLayout("BI")
+## 0x81 read public data: command, source, second source, third source (255 for none)
+PKT_READ_PUBLIC = PacketLayout("BBBB")
+## 0x82 write public data: command, pin, value, second pin (255 for none), second value
+PKT_WRITE_PUBLIC = PacketLayout("BBHBH")
+## Pin mode configuration: command (200-219), pin, pin mode
+PKT_PIN = PacketLayout("BBB")
+## Pin mode configuration with a byte parameter
+PKT_PIN_U8 = PacketLayout("BBBB")
+## Pin mode configuration with two byte parameters
+PKT_PIN_U8_U8 = PacketLayout("BBBBB")
+## Pin mode configuration with a 16 bit parameter
+PKT_PIN_U16 = PacketLayout("BBBH")
+## Pin mode configuration with a byte and a 32 bit parameter (WS2812 LED color)
+PKT_PIN_U8_U32 = PacketLayout("BBBBI")
+
+# Response layouts.  Pass the offset of the first field to unpackResponse().
+
+RSP_U16 = Struct("<H")
+RSP_U16_U16 = Struct("<HH")
+RSP_U32 = Struct("<I")
+
+
+"""!
+@brief Unpack fields from a response
+@param layout One of the RSP_ layouts
+@param rx The response returned by sendPacket
+@param offset Index of the first byte of the first field
+@return A tuple of the unpacked values
+"""
+def unpackResponse(layout, rx, offset):
+    try:
+        return layout.unpack_from(rx, offset)
+    except TypeError:
+        # Some transports return responses as lists of ints
+        return layout.unpack_from(bytes(rx), offset)
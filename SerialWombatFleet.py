@@ -0,0 +1,216 @@
+"""
+Copyright 2020-2023 Broadwell Consulting Inc.
+
+"Serial Wombat" is a registered trademark of Broadwell Consulting Inc. in
+the United States.  See SerialWombat.com for usage guidance.
+
+Permission is hereby granted, free of charge, to any person obtaining a
+ * copy of this software and associated documentation files (the "Software"),
+ * to deal in the Software without restriction, including without limitation
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,
+ * and/or sell copies of the Software, and to permit persons to whom the
+ * Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+ * THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+ * OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+ * ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+ * OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""! @file SerialWombatFleet.py
+
+Runs the traffic of chips on independent buses in parallel, one worker thread per bus.
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+from SerialWombatBus import SerialWombatPriority, currentPriority, PRIORITY_CONTROL
+from ArduinoFunctions import delay
+
+
+"""!
+@brief Return an object identifying the physical bus a chip is on
+
+Chips attached to a SerialWombatBus are grouped by it.  Otherwise chips are grouped by their
+interface's SMBus (i2c member) or serial port (ser member).  A chip with none of these is
+its own bus.
+"""
+def busOf(chip):
+    if (getattr(chip, "bus", None) is not None):
+        return chip.bus
+    for name in ("i2c", "ser"):
+        transport = getattr(chip, name, None)
+        if (transport is not None and transport != 0):
+            return transport
+    return chip
+
+
+# Sorts after every priority class, so shutdown happens once queued calls are done
+_SHUTDOWN_PRIORITY = 1 << 30
+
+class _BusWorker:
+    def __init__(self, name):
+        self.requests = queue.PriorityQueue()
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self.thread = threading.Thread(target = self._run, name = name, daemon = True)
+        self.thread.start()
+
+    def put(self, priority, request):
+        with self._lock:
+            self._sequence += 1
+            self.requests.put((priority, self._sequence, request))
+
+    def _run(self):
+        while (True):
+            priority, sequence, request = self.requests.get()
+            if (request is None):
+                return
+            future, function, args, kwargs = request
+            if (not future.set_running_or_notify_cancel()):
+                continue
+            try:
+                with SerialWombatPriority(priority):
+                    future.set_result(function(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+
+"""!
+@brief Executes calls on chips in one worker thread per bus
+
+Chips are grouped by busOf().  Calls on chips on the same bus run one after another in that
+bus's worker, in the order submitted.  Calls on different buses run at the same time: smbus2
+ioctls and pyserial reads release the GIL while they wait for the bus.
+
+    fleet = SerialWombatFleet(chips)
+    futures = [fleet.submit(sw, "readPublicDataMany", range(20)) for sw in chips]
+    samples = [f.result() for f in futures]
+    fleet.shutdown()
+
+Each chip should only be used through the fleet once it has been added, so its calls are not
+interleaved with calls from other threads.
+
+A call takes the priority class the submitting thread has set with SerialWombatPriority, or
+PRIORITY_CONTROL.  Queued calls are run lowest class number first, and each call's bus
+transactions carry its class.  A call that is already running is not interrupted, so run long
+bulk transfers in their own thread on a SerialWombatBus with "priority" fairness if control
+calls must interleave with them packet by packet.
+"""
+class SerialWombatFleet:
+    def __init__(self, chips = ()):
+        self._workers = {}
+        self._workerOfChip = {}
+        self._chips = []
+        self._lock = threading.Lock()
+        for chip in chips:
+            self.add(chip)
+
+    """!
+    @brief Add a chip, starting a worker for its bus if it is the first chip on that bus
+    @param chip The SerialWombatChip to add
+    @param bus Optional object identifying the chip's bus.  If None, busOf(chip) is used.
+    """
+    def add(self, chip, bus = None):
+        if (bus is None):
+            bus = busOf(chip)
+        with self._lock:
+            worker = self._workers.get(id(bus))
+            if (worker is None):
+                worker = _BusWorker("SerialWombatFleet-%d" % len(self._workers))
+                self._workers[id(bus)] = worker
+            self._workerOfChip[id(chip)] = worker
+            self._chips.append(chip)
+        return chip
+
+    """!
+    @brief Queue a call on chip's bus worker
+    @param chip A chip that has been added to the fleet
+    @param function A method name of chip, e.g. "readPublicData", or any callable
+    @return A concurrent.futures.Future for the call's result
+    """
+    def submit(self, chip, function, *args, **kwargs):
+        worker = self._workerOfChip[id(chip)]
+        if (isinstance(function, str)):
+            function = getattr(chip, function)
+        future = Future()
+        worker.put(currentPriority(PRIORITY_CONTROL), (future, function, args, kwargs))
+        return future
+
+    """!
+    @brief Call function(chip, *args) for every chip, each on its own bus worker
+    @return A list of futures in the order the chips were added
+    """
+    def submitAll(self, function, *args, **kwargs):
+        futures = []
+        for chip in self.chips():
+            futures.append(self.submit(chip, function, chip, *args, **kwargs))
+        return futures
+
+    def chips(self):
+        return list(self._chips)
+
+    """!
+    @brief Return the number of bus workers
+    """
+    def busCount(self):
+        return len(self._workers)
+
+    """!
+    @brief Stop the workers after the calls already queued
+    @param wait If True, wait for the workers to finish
+    """
+    def shutdown(self, wait = True):
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers = {}
+            self._workerOfChip = {}
+            self._chips = []
+        for worker in workers:
+            worker.put(_SHUTDOWN_PRIORITY, None)
+        if (wait):
+            for worker in workers:
+                worker.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.shutdown()
+        return False
+
+
+"""!
+@brief Begin several chips at once
+
+Does what begin() does for each chip, but resets every chip first, waits the one second the chips need
+after a reset once rather than once per chip, and then runs initialize() for the chips on different
+buses at the same time.  Chips on the same bus are initialized one after another in that bus's worker,
+and each initialize() pipelines its own reads.
+
+@param chips A list of SerialWombatChip instances
+@param reset Whether to reset the chips first, as for begin()
+@param fleet Optional SerialWombatFleet the chips have been added to.  If None, a temporary fleet is used.
+@return A list of the initialize() results, in the order of chips
+"""
+def beginAll(chips, reset = True, fleet = None):
+    if (reset):
+        for chip in chips:
+            chip.hardwareReset()
+        # Timed from the last reset, so every chip gets at least the full second
+        delay(1000)
+    for chip in chips:
+        chip.sendReadyTime = 0
+    if (fleet is None):
+        with SerialWombatFleet(chips) as temporary:
+            futures = [temporary.submit(chip, "initialize") for chip in chips]
+            return [f.result() for f in futures]
+    futures = [fleet.submit(chip, "initialize") for chip in chips]
+    return [f.result() for f in futures]
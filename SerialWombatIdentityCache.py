@@ -0,0 +1,147 @@
+"""
+Copyright 2020-2023 Broadwell Consulting Inc.
+
+"Serial Wombat" is a registered trademark of Broadwell Consulting Inc. in
+the United States.  See SerialWombat.com for usage guidance.
+
+Permission is hereby granted, free of charge, to any person obtaining a
+ * copy of this software and associated documentation files (the "Software"),
+ * to deal in the Software without restriction, including without limitation
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,
+ * and/or sell copies of the Software, and to permit persons to whom the
+ * Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+ * THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+ * OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+ * ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+ * OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""! @file SerialWombatIdentityCache.py
+
+Cache of the identity information SerialWombatChip.initialize() reads from each chip's flash.
+
+A chip's unique identifier, device identifier and revision, birthday and brand never change, but
+reading them takes up to dozens of flash read packets.  With a cache set on SerialWombatChip:
+
+    SerialWombatChip.identityCache = SerialWombatIdentityCache("wombats.json")
+
+initialize() looks up the chip by its identityKey() (transport and address).  If the firmware version
+it reads matches the cached entry the flash reads are skipped.  The first time an entry is used in a
+process, and after hardwareReset(), one flash word of the unique identifier is read back to confirm
+that the same chip is still at that address.  A different firmware version, a failed confirmation
+or jumpToBoot() discards the entry.
+
+If a path is given the cache is loaded from and saved to that JSON file, so identity survives
+process restarts.
+"""
+
+import json
+try:
+    import os
+except ImportError:
+    import uos as os
+
+
+class SerialWombatIdentityCache():
+    """!
+    @brief Constructor for SerialWombatIdentityCache
+    @param path Name of a JSON file to load and save the cache, or None to keep it in memory only
+    """
+    def __init__(self, path = None):
+        self.path = path
+        ## Cached entries, dictionaries keyed by SerialWombatChip.identityKey()
+        self.entries = {}
+        self._confirmed = set()
+        if (path is not None):
+            try:
+                with open(path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    """!
+    @brief Return the entry for a chip
+    @param key The chip's identityKey()
+    @param version The version string just read from the chip
+    @return The entry dictionary, or None if there is none for this firmware version
+    """
+    def get(self, key, version):
+        entry = self.entries.get(key)
+        if (entry is None):
+            return None
+        if (entry.get("version") != version):
+            self.invalidate(key)
+            return None
+        return entry
+
+    def isConfirmed(self, key):
+        return key in self._confirmed
+
+    """!
+    @brief Record that the chip at key has been checked against its entry since the last reset
+    """
+    def confirm(self, key):
+        self._confirmed.add(key)
+
+    """!
+    @brief Require the entry to be confirmed again before it is next used, e.g. after a reset
+    """
+    def unconfirm(self, key):
+        self._confirmed.discard(key)
+
+    """!
+    @brief Store or update an entry
+    @param key The chip's identityKey()
+    @param entry A dictionary of JSON serializable values.  Must include "version".
+    """
+    def put(self, key, entry):
+        self.entries[key] = entry
+        self._confirmed.add(key)
+        self.save()
+
+    """!
+    @brief Add values to an existing entry, for instance a birthday read on demand
+    """
+    def update(self, key, **values):
+        entry = self.entries.get(key)
+        if (entry is not None):
+            entry.update(values)
+            self.save()
+
+    """!
+    @brief Discard the entry for a chip
+    """
+    def invalidate(self, key):
+        self._confirmed.discard(key)
+        if (self.entries.pop(key, None) is not None):
+            self.save()
+
+    def clear(self):
+        self.entries = {}
+        self._confirmed = set()
+        self.save()
+
+    """!
+    @brief Write the cache to its file, if it has one
+    """
+    def save(self):
+        if (self.path is None):
+            return
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.entries, f)
+        if (hasattr(os, "replace")):
+            os.replace(temporary, self.path)
+        else:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            os.rename(temporary, self.path)
@@ -0,0 +1,176 @@
+"""
+Copyright 2020-2023 Broadwell Consulting Inc.
+
+"Serial Wombat" is a registered trademark of Broadwell Consulting Inc. in
+the United States.  See SerialWombat.com for usage guidance.
+
+Permission is hereby granted, free of charge, to any person obtaining a
+ * copy of this software and associated documentation files (the "Software"),
+ * to deal in the Software without restriction, including without limitation
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,
+ * and/or sell copies of the Software, and to permit persons to whom the
+ * Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+ * THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+ * OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+ * ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+ * OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""! @file SerialWombatInputMonitor.py
+
+Change driven input monitoring built on the COMMAND_BINARY_PIN_POLL_THRESHOLD bitmap.
+"""
+
+from ArduinoFunctions import micros, delayMicroseconds
+
+
+"""!
+@brief Reports pins whose public data crosses a threshold, reading only the pins that changed
+
+Each poll() sends one COMMAND_BINARY_PIN_POLL_THRESHOLD packet, which returns a bitmap of the
+pins whose public data is above threshold.  Only pins whose bit differs from the previous poll
+are then read, with readPublicDataMany().  For digital and debounced inputs, threshold 0 makes
+each bit the input's state, so an idle set of inputs costs one packet per poll.  Analog inputs
+only raise events when they cross the threshold.
+
+Each change produces an event tuple (pin, value, above, timestamp) where timestamp is the micros()
+time the value was received.  Events are passed to callback(monitor, event), if set, and queued
+for readEvent(), up to maxEvents; the oldest are dropped when it is full.
+
+    monitor = SerialWombatInputMonitor(sw, [9, 10, 11, 12])
+    while True:
+        monitor.poll()
+        event = monitor.readEvent()
+"""
+class SerialWombatInputMonitor:
+    """!
+    @param chip The SerialWombatChip to monitor
+    @param pins List of pins to monitor.  Pins 0 to 31.
+    @param threshold Public data above this value sets the pin's bit
+    @param callback Optional function called as callback(monitor, event) for each change
+    @param maxEvents Number of events kept for readEvent().  0 keeps none.
+    """
+    def __init__(self, chip, pins, threshold = 0, callback = None, maxEvents = 64):
+        self.chip = chip
+        self.pins = list(pins)
+        self.threshold = threshold
+        self.callback = callback
+        self.maxEvents = maxEvents
+        #! @brief The last public data read for each monitored pin, keyed by pin
+        self.values = {}
+        #! @brief The last bitmap received
+        self.bitmap = 0
+        #! @brief Number of events dropped because the event queue was full
+        self.droppedEvents = 0
+        self._mask = 0
+        for pin in self.pins:
+            self._mask |= (1 << pin)
+        self._events = []
+        self._started = False
+        self._running = False
+        self._thread = None
+
+    """!
+    @brief Read the bitmap and all monitored pins without raising events
+    @return 0 on success, or a negative error code
+    """
+    def begin(self):
+        errorCount = self.chip.errorCount
+        bitmap = self.chip.comparePublicDataToThreshold(self.threshold)
+        values = self.chip.readPublicDataMany(self.pins)
+        if (self.chip.errorCount != errorCount):
+            return -self.chip.lastErrorCode
+        self.bitmap = bitmap & self._mask
+        for i in range(len(self.pins)):
+            self.values[self.pins[i]] = values[i]
+        self._started = True
+        return 0
+
+    """!
+    @brief Check for changes and read the pins that changed
+    @return The number of events raised, or a negative error code
+    """
+    def poll(self):
+        if (not self._started):
+            return self.begin()
+        chip = self.chip
+        errorCount = chip.errorCount
+        bitmap = chip.comparePublicDataToThreshold(self.threshold) & self._mask
+        if (chip.errorCount != errorCount):
+            return -chip.lastErrorCode
+        changed = bitmap ^ self.bitmap
+        if (changed == 0):
+            return 0
+        pins = [pin for pin in self.pins if (changed >> pin) & 1]
+        timestamps = [0] * len(pins)
+        values = chip.readPublicDataMany(pins, timestamps = timestamps)
+        if (chip.errorCount != errorCount):
+            # Leave the bitmap alone so the changes are picked up by the next poll
+            return -chip.lastErrorCode
+        self.bitmap = bitmap
+        for i in range(len(pins)):
+            pin = pins[i]
+            self.values[pin] = values[i]
+            self._raise((pin, values[i], (bitmap >> pin) & 1 == 1, timestamps[i]))
+        return len(pins)
+
+    def _raise(self, event):
+        if (self.maxEvents > 0):
+            if (len(self._events) >= self.maxEvents):
+                self._events.pop(0)
+                self.droppedEvents += 1
+            self._events.append(event)
+        if (self.callback is not None):
+            self.callback(self, event)
+
+    def available(self):
+        return len(self._events)
+
+    """!
+    @brief Remove and return the oldest event
+    @return A (pin, value, above, timestamp) tuple, or None if there are no events
+    """
+    def readEvent(self):
+        if (len(self._events) == 0):
+            return None
+        return self._events.pop(0)
+
+    """!
+    @brief Poll every period_uS until stop() is called
+    """
+    def run(self, period_uS = 1000):
+        self._running = True
+        while (self._running):
+            start = micros()
+            self.poll()
+            delayMicroseconds(period_uS - (micros() - start))
+
+    """!
+    @brief Run the monitor in a background thread, polling every period_uS
+
+    If the application also uses the chip from other threads, attach the chip to a
+    SerialWombatBus first so the monitor's transactions don't interleave with the application's.
+    """
+    def start(self, period_uS = 1000):
+        import threading
+        if (self._thread is not None):
+            return
+        self._running = True
+        self._thread = threading.Thread(target = self.run, args = (period_uS,), daemon = True)
+        self._thread.start()
+
+    """!
+    @brief Stop run() or the background thread, waiting for the thread to finish
+    """
+    def stop(self):
+        self._running = False
+        if (self._thread is not None):
+            self._thread.join()
+            self._thread = None
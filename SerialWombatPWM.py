@@ -30,6 +30,7 @@ THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
 """
 import SerialWombat
 from SerialWombatPin import SerialWombatPin
+from SerialWombatPin import writePublicDataMany
 from SerialWombat import SW_LE32
 #from enum import IntEnum
 from SerialWombatAbstractScaledOutput import SerialWombatAbstractScaledOutput
@@ -202,3 +203,14 @@ class SerialWombatPWM_18AB(SerialWombatPWM, SerialWombatAbstractScaledOutput):
     def swPinModeNumber(self):
         return self._pinMode
 
+
+"""!
+@brief Set the duty cycles of several PWM outputs in one control tick
+
+The duty cycles are sent two per packet through SerialWombatPin.writePublicDataMany().
+@param pwms A list of begun SerialWombatPWM instances
+@param dutyCycles A list of values from 0 to 65535, one per output
+@return 0 on success, or the first negative error code
+"""
+def writeDutyCycleMany(pwms, dutyCycles):
+    return writePublicDataMany(pwms, dutyCycles)
@@ -0,0 +1,262 @@
+"""
+Copyright 2020-2023 Broadwell Consulting Inc.
+
+"Serial Wombat" is a registered trademark of Broadwell Consulting Inc. in
+the United States.  See SerialWombat.com for usage guidance.
+
+Permission is hereby granted, free of charge, to any person obtaining a
+ * copy of this software and associated documentation files (the "Software"),
+ * to deal in the Software without restriction, including without limitation
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,
+ * and/or sell copies of the Software, and to permit persons to whom the
+ * Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+ * THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+ * OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+ * ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+ * OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""! @file SerialWombatPacketTrace.py
+
+Record the packets exchanged with Serial Wombat chips to a binary file, and replay them later
+without hardware.  CPython only.
+
+    recorder = SerialWombatTraceRecorder("session.swtrace")
+    recorder.attach(sw)         # every packet sw sends from now on is recorded
+    ...
+    recorder.close()
+
+    sw = SerialWombatReplayChip("session.swtrace")
+    sw.begin(False)             # answered from the trace
+
+The file is a 32 byte header followed by fixed 32 byte records, so it can be memory-mapped and
+indexed directly (SerialWombatTraceReader does this).  Each record holds:
+
+    offset size
+    0      8    monotonic timestamp in nS when the response was received (little endian)
+    8      4    chip address
+    12     2    result code returned by the transport (signed)
+    14     1    record type: TRACE_SEND_RECEIVE or TRACE_SEND_ONLY
+    15     1    reserved, 0
+    16     8    packet sent
+    24     8    response received (0x55 filled for TRACE_SEND_ONLY)
+
+Records are packed into a memory buffer and written to the file in blocks, so recording adds
+a few microseconds per packet.
+"""
+
+import mmap
+import struct
+import time
+import SerialWombat
+from ArduinoFunctions import getTimingBackend
+
+TRACE_MAGIC = b"SWTRACE1"
+TRACE_HEADER = struct.Struct("<8sHHQ12s")
+TRACE_RECORD = struct.Struct("<QIhBx8s8s")
+TRACE_RECORD_SIZE = 32
+
+TRACE_SEND_RECEIVE = 0
+TRACE_SEND_ONLY = 1
+
+_NO_RESPONSE = b"\x55" * 8
+
+
+"""!
+@brief Records every packet sent through one or more SerialWombatChips to a trace file
+"""
+class SerialWombatTraceRecorder():
+    """!
+    @brief Constructor for SerialWombatTraceRecorder
+    @param path Name of the trace file to create
+    @param recordsPerWrite Number of records buffered in memory before they are written to the file
+    """
+    def __init__(self, path, recordsPerWrite = 256):
+        self._file = open(path, "wb")
+        self._file.write(TRACE_HEADER.pack(TRACE_MAGIC, 1, TRACE_RECORD_SIZE, time.monotonic_ns(), bytes(12)))
+        self._buffer = bytearray(TRACE_RECORD_SIZE * recordsPerWrite)
+        self._bufferRecords = recordsPerWrite
+        self._count = 0
+        ## Number of records written so far
+        self.records = 0
+
+    def _record(self, address, result, recordType, tx, rx):
+        TRACE_RECORD.pack_into(self._buffer, self._count * TRACE_RECORD_SIZE, time.monotonic_ns(),
+                               address, result, recordType, bytes(tx), bytes(rx))
+        self._count += 1
+        self.records += 1
+        if (self._count == self._bufferRecords):
+            self.flush()
+
+    """!
+    @brief Write buffered records to the file
+    """
+    def flush(self):
+        if (self._count > 0):
+            self._file.write(memoryview(self._buffer)[:self._count * TRACE_RECORD_SIZE])
+            self._count = 0
+        self._file.flush()
+
+    def close(self):
+        if (not self._file.closed):
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+        return False
+
+    """!
+    @brief Record the packets of a SerialWombatChip
+
+    Replaces the chip's hardware methods with recording wrappers on the instance.  Several
+    chips may be attached to one recorder; records carry the chip's address.
+    @return The chip
+    """
+    def attach(self, sw):
+        sendReceive = sw.sendReceivePacketHardware
+        sendReceiveMany = sw.sendReceivePacketsHardware
+        sendOnly = sw.sendPacketToHardware
+
+        def recordedSendReceivePacketHardware(tx):
+            result, rx = sendReceive(tx)
+            self._record(sw.address, result, TRACE_SEND_RECEIVE, tx, rx)
+            return result, rx
+
+        def recordedSendReceivePacketsHardware(txList):
+            responses = sendReceiveMany(txList)
+            for i in range(len(txList)):
+                result, rx = responses[i]
+                self._record(sw.address, result, TRACE_SEND_RECEIVE, txList[i], rx)
+            return responses
+
+        def recordedSendPacketToHardware(tx):
+            result, rx = sendOnly(tx)
+            self._record(sw.address, result, TRACE_SEND_ONLY, tx, _NO_RESPONSE)
+            return result, rx
+
+        sw.sendReceivePacketHardware = recordedSendReceivePacketHardware
+        sw.sendReceivePacketsHardware = recordedSendReceivePacketsHardware
+        sw.sendPacketToHardware = recordedSendPacketToHardware
+        return sw
+
+
+"""!
+@brief Read access to a trace file through a memory map
+
+reader[i] returns the record as a tuple (timestamp_ns, address, result, recordType, tx, rx).
+"""
+class SerialWombatTraceReader():
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, version, recordSize, startTime_ns, reserved = TRACE_HEADER.unpack_from(self._map, 0)
+        if (magic != TRACE_MAGIC or recordSize != TRACE_RECORD_SIZE):
+            self.close()
+            raise ValueError("%s is not a Serial Wombat packet trace" % path)
+        ## monotonic timestamp in nS when the recording started
+        self.startTime_ns = startTime_ns
+        self._count = (len(self._map) - TRACE_HEADER.size) // TRACE_RECORD_SIZE
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if (i < 0):
+            i += self._count
+        if (i < 0 or i >= self._count):
+            raise IndexError("trace record index out of range")
+        return TRACE_RECORD.unpack_from(self._map, TRACE_HEADER.size + i * TRACE_RECORD_SIZE)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+"""!
+@brief A SerialWombatChip whose responses come from a recorded trace
+
+Each packet sent is answered with the next recorded response for this chip's address.  If the
+packet differs from the one recorded, the difference is noted in divergences (or a ValueError is
+raised if strict is set) and the recorded response is still returned, so a replay of a changed
+program shows where it first deviated from the recorded session.  After the end of the trace
+packets fail with a communication error, as a transport does when the chip doesn't respond.
+"""
+class SerialWombatReplayChip(SerialWombat.SerialWombatChip):
+    """!
+    @brief Constructor for SerialWombatReplayChip
+    @param trace A trace file name or a SerialWombatTraceReader
+    @param address Only records with this chip address are replayed.  If None, the address of the first record is used.
+    @param realTime If True, responses are delayed to match the recorded timing.  If False, they are returned immediately.
+    @param strict If True, raise ValueError when a packet differs from the recorded one
+    """
+    def __init__(self, trace, address = None, realTime = False, strict = False):
+        SerialWombat.SerialWombatChip.__init__(self)
+        if (isinstance(trace, str)):
+            trace = SerialWombatTraceReader(trace)
+        self.trace = trace
+        if (address is None and len(trace) > 0):
+            address = trace[0][1]
+        self.address = address
+        self.realTime = realTime
+        self.strict = strict
+        ## List of (record index, recorded tx, tx sent) for packets that didn't match the recording
+        self.divergences = []
+        self._next = 0
+        self._replayStart_ns = None
+
+    def _nextRecord(self, recordType):
+        trace = self.trace
+        while (self._next < len(trace)):
+            record = trace[self._next]
+            self._next += 1
+            if (record[1] == self.address and record[3] == recordType):
+                return self._next - 1, record
+        return -1, None
+
+    def _wait(self, timestamp_ns):
+        now = time.monotonic_ns()
+        if (self._replayStart_ns is None):
+            self._replayStart_ns = now - (timestamp_ns - self.trace.startTime_ns)
+        getTimingBackend().sleepUntil_ns(self._replayStart_ns + timestamp_ns - self.trace.startTime_ns)
+
+    def _replay(self, tx, recordType):
+        index, record = self._nextRecord(recordType)
+        if (record is None):
+            return -48, bytes("E00048UU", 'utf-8')
+        timestamp_ns, address, result, recordType, recordedTx, rx = record
+        if (bytes(tx) != recordedTx):
+            if (self.strict):
+                raise ValueError("packet %d differs from trace: sent %s, recorded %s" % (index, bytes(tx).hex(), recordedTx.hex()))
+            self.divergences.append((index, recordedTx, bytes(tx)))
+        if (self.realTime):
+            self._wait(timestamp_ns)
+        return result, bytearray(rx)
+
+    """!
+    @brief True when all records for this chip have been replayed
+    """
+    def finished(self):
+        while (self._next < len(self.trace) and self.trace[self._next][1] != self.address):
+            self._next += 1
+        return self._next >= len(self.trace)
+
+    def sendReceivePacketHardware(self, tx):
+        return self._replay(tx, TRACE_SEND_RECEIVE)
+
+    def sendPacketToHardware(self, tx):
+        return self._replay(tx, TRACE_SEND_ONLY)
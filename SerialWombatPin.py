@@ -1,4 +1,5 @@
 import SerialWombat
+from SerialWombatCodec import PKT_PIN, PKT_PIN_U8
 
 class SerialWombatPin:
     _sw = 0 # will be serial wombat
@@ -48,30 +49,54 @@ class SerialWombatPin:
         return self._sw.sendPacketNoResponse(tx)
 
     def disable(self):
-        tx = bytearray([219, self._pin, self._pinMode, 0x55, 0x55, 0x55, 0x55, 0x55])
-        result, rx = self._sw.sendPacket(tx)
+        result, rx = self._sw.sendPacket(self._sw.encodePacket(PKT_PIN, 219, self._pin, self._pinMode))
         return result
 
     def enablePullup(self, enabled = True):
-        tx = bytearray([SerialWombat.SerialWombatCommands.COMMAND_SET_PIN_HW, self._pin, 0, 1 if enabled else 0, 0x55, 0x55, 0x55, 0x55])
-        result, rx = self._sw.sendPacket(tx)
+        result, rx = self._sw.sendPacket(self._sw.encodePacket(PKT_PIN_U8, SerialWombat.SerialWombatCommands.COMMAND_SET_PIN_HW, self._pin, 0, 1 if enabled else 0))
         return result
 
     def enablePulldown(self, enabled = True):
-        tx = bytearray([SerialWombat.SerialWombatCommands.COMMAND_SET_PIN_HW, self._pin, 1, 1 if enabled else 0, 0x55, 0x55, 0x55, 0x55])
-        result, rx = self._sw.sendPacket(tx)
+        result, rx = self._sw.sendPacket(self._sw.encodePacket(PKT_PIN_U8, SerialWombat.SerialWombatCommands.COMMAND_SET_PIN_HW, self._pin, 1, 1 if enabled else 0))
         return result
 
     def enableOpenDrain(self, enabled = True):
-        tx = bytearray([SerialWombat.SerialWombatCommands.COMMAND_SET_PIN_HW, self._pin, 2, 1 if enabled else 0, 0x55, 0x55, 0x55, 0x55])
-        result, rx = self._sw.sendPacket(tx)
+        result, rx = self._sw.sendPacket(self._sw.encodePacket(PKT_PIN_U8, SerialWombat.SerialWombatCommands.COMMAND_SET_PIN_HW, self._pin, 2, 1 if enabled else 0))
         return result
 
     def forceDMA(self, enabled = True):
-        tx = bytearray([SerialWombat.SerialWombatCommands.COMMAND_SET_PIN_HW, self._pin, 3, 1 if enabled else 0, 0x55, 0x55, 0x55, 0x55])
-        result, rx = self._sw.sendPacket(tx)
+        result, rx = self._sw.sendPacket(self._sw.encodePacket(PKT_PIN_U8, SerialWombat.SerialWombatCommands.COMMAND_SET_PIN_HW, self._pin, 3, 1 if enabled else 0))
         return result
 
     def setPinNumberForTesting(self, pin):
         self._pin = pin
 
+
+"""!
+@brief Write public data to several pins, two per packet
+
+The pins may be any SerialWombatPin based drivers, e.g. servos, PWMs, H-Bridges or scaled
+outputs, and may be on different chips.  The writes to each chip are sent with that chip's
+writePublicDataMany().
+@param pins A list of SerialWombatPin based objects
+@param values A list of 16 bit values, one per pin
+@return 0 on success, or the first negative error code
+"""
+def writePublicDataMany(pins, values):
+    chips = []
+    updates = []
+    for i in range(len(pins)):
+        sw = pins[i]._sw
+        for c in range(len(chips)):
+            if (chips[c] is sw):
+                updates[c].append((pins[i]._pin, values[i]))
+                break
+        else:
+            chips.append(sw)
+            updates.append([(pins[i]._pin, values[i])])
+    returnval = 0
+    for c in range(len(chips)):
+        result = chips[c].writePublicDataMany(updates[c])
+        if (result < 0 and returnval == 0):
+            returnval = result
+    return returnval
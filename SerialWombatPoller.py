@@ -0,0 +1,289 @@
+"""
+Copyright 2020-2023 Broadwell Consulting Inc.
+
+"Serial Wombat" is a registered trademark of Broadwell Consulting Inc. in
+the United States.  See SerialWombat.com for usage guidance.
+
+Permission is hereby granted, free of charge, to any person obtaining a
+ * copy of this software and associated documentation files (the "Software"),
+ * to deal in the Software without restriction, including without limitation
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,
+ * and/or sell copies of the Software, and to permit persons to whom the
+ * Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+ * THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+ * OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+ * ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+ * OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""! @file SerialWombatPoller.py
+
+Background sampling of pin public data and special data sources, scheduled earliest deadline first.
+"""
+
+from array import array
+from ArduinoFunctions import micros, delayMicroseconds
+try:
+    from threading import Lock as _Lock
+except ImportError:
+    # Ports without threads need no locking
+    class _Lock:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, excType, excValue, traceback):
+            return False
+
+
+"""!
+@brief A source on a chip sampled at a fixed period by SerialWombatPoller
+
+Created by SerialWombatPoller.subscribe().  Samples are passed to the callback, if any, and
+kept in a ring buffer of bufferSize entries, if bufferSize is not 0.  The buffer may be read
+from another thread than the one running the poller.
+"""
+class SerialWombatSubscription:
+    def __init__(self, chip, source, period_uS, callback, bufferSize, now):
+        self.chip = chip
+        self.source = source
+        self.period_uS = period_uS
+        self.callback = callback
+        #! @brief micros() time by which the next sample is due
+        self.deadline = now
+        #! @brief The last sample value and the micros() time it was received
+        self.value = 0
+        self.timestamp = 0
+        #! @brief Number of samples delivered
+        self.samples = 0
+        #! @brief Number of sample periods that passed without a sample
+        self.missedDeadlines = 0
+        #! @brief Largest time in uS between a deadline and its sample
+        self.maxLateness_uS = 0
+        #! @brief Number of samples lost to communication errors
+        self.errors = 0
+        self._values = array('H', bytes(2 * bufferSize))
+        self._timestamps = [0] * bufferSize
+        self._head = 0
+        self._count = 0
+        self._lock = _Lock()
+
+    def _deliver(self, value, timestamp):
+        size = len(self._values)
+        with self._lock:
+            self.value = value
+            self.timestamp = timestamp
+            self.samples += 1
+            if (size > 0):
+                self._values[self._head] = value
+                self._timestamps[self._head] = timestamp
+                self._head = (self._head + 1) % size
+                if (self._count < size):
+                    self._count += 1
+        if (self.callback is not None):
+            self.callback(self, value, timestamp)
+
+    """!
+    @brief Return the number of buffered samples
+    """
+    def available(self):
+        return self._count
+
+    """!
+    @brief Remove and return the oldest buffered sample
+    @return A (value, timestamp) tuple, or None if the buffer is empty
+    """
+    def read(self):
+        with self._lock:
+            if (self._count == 0):
+                return None
+            tail = (self._head - self._count) % len(self._values)
+            self._count -= 1
+            return (self._values[tail], self._timestamps[tail])
+
+
+"""!
+@brief Samples subscribed sources at their own rates while sharing each bus fairly
+
+Each poll() takes the subscriptions whose deadlines have passed, earliest deadline first,
+and reads as many as the packet budget allows.  Sources on the same chip are read together
+with readPublicDataMany(), two per packet.  The budget is a token bucket of packetsPerSecond
+tokens a second holding at most burstPackets, so fast signals can't starve the bus for
+slow ones or for other traffic.  A subscription not read before its next deadline has
+missed a deadline.  Those are counted, and reported to onMissedDeadline if it is set.
+
+    poller = SerialWombatPoller(packetsPerSecond = 2000)
+    pot = poller.subscribe(sw, 0, 100, bufferSize = 64)
+    poller.subscribe(sw, SerialWombatDataSource.SW_DATA_SOURCE_VCC_mVOLTS, 1, callback = showVoltage)
+    poller.start()
+
+Call poll() from an existing loop instead of start() to sample without a thread, or
+await run_async() to run as an asyncio task.
+"""
+class SerialWombatPoller:
+    """!
+    @param packetsPerSecond The bus bandwidth the poller may use, in packets per second.  None for no limit.
+    @param burstPackets The most packets one poll() may send
+    """
+    def __init__(self, packetsPerSecond = None, burstPackets = 32):
+        self.packetsPerSecond = packetsPerSecond
+        self.burstPackets = burstPackets
+        #! @brief Called as onMissedDeadline(subscription, missed) when a subscription misses deadlines
+        self.onMissedDeadline = None
+        #! @brief Total deadlines missed by all subscriptions
+        self.missedDeadlines = 0
+        self._subscriptions = []
+        self._tokens = burstPackets
+        self._lastRefill = micros()
+        self._running = False
+        self._thread = None
+
+    """!
+    @brief Sample a pin or special data source periodically
+    @param chip The SerialWombatChip to read
+    @param source The pin or special data source number passed to readPublicData
+    @param rate_Hz Samples per second
+    @param callback Optional function called as callback(subscription, value, timestamp) with each sample
+    @param bufferSize Number of samples kept for read().  0 keeps none.
+    @return The SerialWombatSubscription
+    """
+    def subscribe(self, chip, source, rate_Hz, callback = None, bufferSize = 0):
+        subscription = SerialWombatSubscription(chip, source, int(1000000 / rate_Hz), callback, bufferSize, micros())
+        # Replace rather than modify the list so a running poll() is unaffected
+        self._subscriptions = self._subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+
+    def subscriptions(self):
+        return list(self._subscriptions)
+
+    def _refill(self, now):
+        if (self.packetsPerSecond is None):
+            self._tokens = self.burstPackets
+            return
+        self._tokens = min(self.burstPackets, self._tokens + (now - self._lastRefill) * self.packetsPerSecond / 1000000)
+        self._lastRefill = now
+
+    """!
+    @brief Read the subscriptions that are due, as far as the packet budget allows
+    @return The number of samples delivered
+    """
+    def poll(self):
+        now = micros()
+        self._refill(now)
+        due = [s for s in self._subscriptions if s.deadline <= now]
+        if (len(due) == 0):
+            return 0
+        due.sort(key = lambda s: s.deadline)
+
+        # Plan, earliest deadline first: sources on one chip share packets, two to a packet
+        chips = []
+        groups = []
+        packets = 0
+        for subscription in due:
+            for c in range(len(chips)):
+                if (chips[c] is subscription.chip):
+                    group = groups[c]
+                    break
+            else:
+                group = []
+                chips.append(subscription.chip)
+                groups.append(group)
+            cost = 1 - (len(group) % 2)
+            if (packets + cost > self._tokens):
+                break
+            group.append(subscription)
+            packets += cost
+        self._tokens -= packets
+
+        delivered = 0
+        for c in range(len(chips)):
+            group = groups[c]
+            if (len(group) == 0):
+                continue
+            timestamps = [0] * len(group)
+            errors = [0] * len(group)
+            values = chips[c].readPublicDataMany([s.source for s in group], timestamps = timestamps, errors = errors)
+            for i in range(len(group)):
+                subscription = group[i]
+                self._advance(subscription, timestamps[i])
+                if (errors[i] != 0):
+                    subscription.errors += 1
+                else:
+                    subscription._deliver(values[i], timestamps[i])
+                    delivered += 1
+        return delivered
+
+    def _advance(self, subscription, now):
+        lateness = now - subscription.deadline
+        if (lateness > subscription.maxLateness_uS):
+            subscription.maxLateness_uS = lateness
+        missed = lateness // subscription.period_uS
+        subscription.deadline += (missed + 1) * subscription.period_uS
+        if (missed > 0):
+            subscription.missedDeadlines += missed
+            self.missedDeadlines += missed
+            if (self.onMissedDeadline is not None):
+                self.onMissedDeadline(subscription, missed)
+
+    """!
+    @brief Return the number of uS until the next subscription is due, or until the budget allows a packet
+    """
+    def timeUntilDue_uS(self):
+        subscriptions = self._subscriptions
+        if (len(subscriptions) == 0):
+            return 1000
+        wait = min([s.deadline for s in subscriptions]) - micros()
+        if (self.packetsPerSecond is not None and self._tokens < 1):
+            wait = max(wait, int((1 - self._tokens) * 1000000 / self.packetsPerSecond))
+        return max(0, wait)
+
+    """!
+    @brief Poll until stop() is called
+    """
+    def run(self):
+        self._running = True
+        while (self._running):
+            self.poll()
+            delayMicroseconds(min(self.timeUntilDue_uS(), 10000))
+
+    """!
+    @brief Coroutine that polls until stop() is called.  Chip reads block the event loop while they run.
+    """
+    async def run_async(self):
+        import asyncio
+        self._running = True
+        while (self._running):
+            self.poll()
+            await asyncio.sleep(min(self.timeUntilDue_uS(), 10000) / 1000000)
+
+    """!
+    @brief Run the poller in a background thread
+
+    If the application also uses the subscribed chips from other threads, attach the chips to a
+    SerialWombatBus first so the poller's transactions don't interleave with the application's.
+    """
+    def start(self):
+        import threading
+        if (self._thread is not None):
+            return
+        self._running = True
+        self._thread = threading.Thread(target = self.run, daemon = True)
+        self._thread.start()
+
+    """!
+    @brief Stop run(), run_async() or the background thread, waiting for the thread to finish
+    """
+    def stop(self):
+        self._running = False
+        if (self._thread is not None):
+            self._thread.join()
+            self._thread = None
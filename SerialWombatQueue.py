@@ -30,6 +30,7 @@ THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
 import SerialWombat
 from SerialWombatPin import SerialWombatPin
 from SerialWombat import SW_LE16
+from SerialWombatCodec import PKT_CMD, PKT_CMD_U16, PKT_CMD_U16_U8, PKT_CMD_U16_U16
 from ArduinoFunctions import millis
 from ArduinoFunctions import delay
 
@@ -66,7 +67,8 @@ class SerialWombatQueue:
     def begin(self, index,  length, qtype = 0 ): 
         self.startIndex = index
         self.length = length
-        tx = bytearray([0x90]) + SW_LE16(index) + SW_LE16(length)+ bytearray([qtype, 0x55,0x55] )
+        tx = self._sw.encodePacket(PKT_CMD_U16_U16, 0x90, index, length)
+        tx[5] = qtype
         result,rx =  self._sw.sendPacket(tx)
         if (result < 0):
             return result
@@ -78,8 +80,7 @@ class SerialWombatQueue:
     @return Number of bytes available to read.
         """
     def available(self):
-        tx = bytearray([0x94])+ SW_LE16(self.startIndex) + bytearray([0x55,0x55,0x55,0x55,0x55])
-        sendResult,rx =  self._sw.sendPacket(tx)
+        sendResult,rx =  self._sw.sendPacket(self._sw.encodePacket(PKT_CMD_U16, 0x94, self.startIndex))
         if (sendResult >= 0):
             return (rx[4] + 256 * rx[5])
         return (0)
@@ -88,8 +89,7 @@ class SerialWombatQueue:
     @return A byte from 0-255, or -1 if no bytes were avaialble
     """
     def read(self):
-        tx = bytearray([0x93]) +  SW_LE16(self.startIndex) + bytearray([1,0x55,0x55,0x55,0x55]) 
-        sendResult,rx = self._sw.sendPacket(tx)
+        sendResult,rx = self._sw.sendPacket(self._sw.encodePacket(PKT_CMD_U16_U8, 0x93, self.startIndex, 1))
         if (sendResult >= 0):
             if (rx[1] == 1):
                 return (rx[2])
@@ -104,8 +104,7 @@ class SerialWombatQueue:
     @return A byte from 0-255, or -1 if no bytes were avaialble
     """
     def peek(self):
-        tx = bytearray([ 0x94 ])+SW_LE16(self.startIndex) + bytearray([0x55,0x55,0x55,0x55,0x55 ])
-        sendResult,rx = self._sw.sendPacket(tx)
+        sendResult,rx = self._sw.sendPacket(self._sw.encodePacket(PKT_CMD_U16, 0x94, self.startIndex))
         if (sendResult >= 0):
             if ((rx[4] + 256 * rx[5]) > 0):
                 return(rx[3])
@@ -152,7 +151,8 @@ class SerialWombatQueue:
     """
    
     def write(self, data):
-        tx = bytearray( [0x91] ) + SW_LE16(self.startIndex) + bytearray([1,data,0x55,0x55,0x55 ])
+        tx = self._sw.encodePacket(PKT_CMD_U16_U8, 0x91, self.startIndex, 1)
+        tx[4] = data
         sendResult,rx = self._sw.sendPacket(tx)
         if (sendResult >= 0):
                 return(rx[3])
@@ -179,7 +179,7 @@ class SerialWombatQueue:
             nextWriteSize = 4
         else:
             nextWriteSize = size
-        tx = bytearray([ 0x91])+ SW_LE16(self.startIndex) + bytearray([0,0x55,0x55,0x55,0x55 ])
+        tx = self._sw.encodePacket(PKT_CMD_U16_U8, 0x91, self.startIndex, 0)
         for i in range(nextWriteSize):
                 tx[4 + i] = buffer[i]
         tx[3] = nextWriteSize
@@ -189,14 +189,8 @@ class SerialWombatQueue:
         bytesWritten += rx[3]
 
         while ((size - bytesWritten) >= 7):
-            tx = [0x92 ,
-                buffer[bytesWritten],
-                buffer[bytesWritten + 1],
-                buffer[bytesWritten + 2],
-                buffer[bytesWritten + 3],
-                buffer[bytesWritten + 4],
-                buffer[bytesWritten + 5],
-                buffer[bytesWritten + 6]]
+            tx = self._sw.encodePacket(PKT_CMD, 0x92)
+            tx[1:8] = buffer[bytesWritten:bytesWritten + 7]
 
             sendResult,rx = self._sw.sendPacket(tx)
             if (sendResult < 0):
@@ -211,7 +205,7 @@ class SerialWombatQueue:
                     nextWriteSize = 4
             else:
                     nextWriteSize = (size - bytesWritten)
-            tx = bytearray([0x91]) + SW_LE16(self.startIndex) + bytearray([0,0x55,0x55,0x55,0x55 ])
+            tx = self._sw.encodePacket(PKT_CMD_U16_U8, 0x91, self.startIndex, 0)
             for i in range( nextWriteSize):
                     tx[4 + i] = buffer[i + bytesWritten]
             tx[3] = nextWriteSize
@@ -228,8 +222,7 @@ class SerialWombatQueue:
     @return Number of bytes avaialable
     """
     def availableForWrite(self,):
-        tx = bytearray([0x94]) +  SW_LE16(self.startIndex) + bytearray([0x55,0x55,0x55,0x55,0x55 ])
-        sendResult,rx = self._sw.sendPacket(tx)
+        sendResult,rx = self._sw.sendPacket(self._sw.encodePacket(PKT_CMD_U16, 0x94, self.startIndex))
         if (sendResult >= 0):
             return (rx[6] + 256 * rx[7])
         return (0)
@@ -247,8 +240,7 @@ class SerialWombatQueue:
         bytesAvailable = 0
         startTime = millis()
         buffer = bytearray()
-        tx = bytearray([0x94]) + SW_LE16(self.startIndex) + bytearray([0x55,0x55,0x55,0x55,0x55])
-        sendResult,rx = self._sw.sendPacket(tx)
+        sendResult,rx = self._sw.sendPacket(self._sw.encodePacket(PKT_CMD_U16, 0x94, self.startIndex))
         if (sendResult >= 0):
             bytesAvailable = (rx[4] + 256 * rx[5])
 
@@ -259,8 +251,7 @@ class SerialWombatQueue:
             bytesToRead = length - bytesRead
             if (bytesToRead > 6):
                 bytesToRead = 6
-            tx = bytearray([0x93]) + SW_LE16(self.startIndex) + bytearray([bytesToRead,0x55,0x55,0x55,0x55])
-            sendResult,rx = self._sw.sendPacket(tx)
+            sendResult,rx = self._sw.sendPacket(self._sw.encodePacket(PKT_CMD_U16_U8, 0x93, self.startIndex, bytesToRead))
             if (sendResult >= 0):
                 for i in range(rx[1]):
                     if (bytesRead < length):
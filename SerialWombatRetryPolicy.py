@@ -0,0 +1,152 @@
+"""
+Copyright 2020-2023 Broadwell Consulting Inc.
+
+"Serial Wombat" is a registered trademark of Broadwell Consulting Inc. in
+the United States.  See SerialWombat.com for usage guidance.
+
+Permission is hereby granted, free of charge, to any person obtaining a
+ * copy of this software and associated documentation files (the "Software"),
+ * to deal in the Software without restriction, including without limitation
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,
+ * and/or sell copies of the Software, and to permit persons to whom the
+ * Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+ * THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+ * OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+ * ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+ * OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""! @file SerialWombatRetryPolicy.py
+
+Retry, backoff and circuit breaker rules for SerialWombatChip.sendPacket() and sendPackets().
+"""
+
+import random
+from ArduinoFunctions import millis, delayMicroseconds
+from SerialWombat import SerialWombatCommands
+
+
+"""!
+@brief Decides which failed packets are retried, how long to wait between attempts, and when to stop talking to a chip
+
+Assign an instance to SerialWombatChip.retryPolicy to use it for every chip, or to a chip's
+retryPolicy member to use it for that chip only:
+
+    SerialWombatChip.retryPolicy = SerialWombatRetryPolicy(maxAttempts = 4)
+
+Only transport failures (error codes in retryableErrors, by default 48, a communication failure)
+are retried.  An error response from the chip means the chip received the packet, so it isn't.
+A packet is retried only if resending it can't change the result of the first attempt, that is
+if its command byte is in idempotentCommands.  Reads and writes of a fixed location are retried.
+Queue and UART transfers, user buffer continue writes, flash writes and resets are not, since
+the first attempt may have been carried out even though its response was lost.
+
+Attempts are separated by an exponential backoff of baseDelay_uS, multiplied by multiplier each attempt,
+up to maxDelay_uS, minus a random part of up to jitter of it.  The wait uses delayMicroseconds(), which sleeps rather than spins on cPython.
+
+After breakerThreshold packets in a row fail after all their attempts, the chip's circuit breaker
+opens.  While it is open, packets to that chip fail immediately with error 48 instead of waiting
+for timeouts that hold up the rest of a shared bus.  After breakerCooldown_mS one packet is let through.
+Its success closes the breaker, and its failure opens it for another cooldown.
+"""
+class SerialWombatRetryPolicy:
+    def __init__(self, maxAttempts = 3, baseDelay_uS = 200, maxDelay_uS = 20000, multiplier = 2, jitter = 0.5,
+                 breakerThreshold = 8, breakerCooldown_mS = 1000):
+        self.maxAttempts = maxAttempts
+        self.baseDelay_uS = baseDelay_uS
+        self.maxDelay_uS = maxDelay_uS
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.breakerThreshold = breakerThreshold
+        self.breakerCooldown_mS = breakerCooldown_mS
+        #! @brief Error codes that indicate the packet or its response was lost
+        self.retryableErrors = set([48])
+        #! @brief Command bytes that are safe to send more than once
+        self.idempotentCommands = set([
+            SerialWombatCommands.CMD_ECHO,
+            SerialWombatCommands.CMD_VERSION,
+            SerialWombatCommands.CMD_SUPPLYVOLTAGE,
+            SerialWombatCommands.COMMAND_BINARY_READ_PIN_BUFFFER,
+            SerialWombatCommands.COMMAND_BINARY_SET_PIN_BUFFFER,
+            SerialWombatCommands.COMMAND_BINARY_READ_USER_BUFFER,
+            SerialWombatCommands.COMMAND_BINARY_WRITE_USER_BUFFER,
+            SerialWombatCommands.COMMAND_BINARY_PIN_POLL_THRESHOLD,
+            SerialWombatCommands.COMMAND_BINARY_QUEUE_INFORMATION,
+            SerialWombatCommands.COMMAND_BINARY_READ_RAM,
+            SerialWombatCommands.COMMAND_BINARY_READ_FLASH,
+            SerialWombatCommands.COMMAND_BINARY_READ_EEPROM,
+            SerialWombatCommands.COMMAND_BINARY_WRITE_RAM,
+            SerialWombatCommands.COMMAND_READ_LAST_ERROR_PACKET,
+            SerialWombatCommands.CONFIGURE_CHANNEL_MODE_CHECK_MODE_SUPPORTED,
+        ])
+
+    """!
+    @brief Return True if tx may be sent again after a transport failure
+    """
+    def isIdempotent(self, tx):
+        return tx[0] in self.idempotentCommands
+
+    """!
+    @brief Return True if errorCode is a transport failure worth retrying
+    """
+    def isRetryable(self, errorCode):
+        return errorCode in self.retryableErrors
+
+    """!
+    @brief Return the number of uS to wait before attempt number attempt + 1
+    @param attempt The number of attempts made so far, starting at 1
+    """
+    def backoff_uS(self, attempt):
+        delay = min(self.maxDelay_uS, self.baseDelay_uS * (self.multiplier ** (attempt - 1)))
+        if (self.jitter > 0):
+            delay -= delay * self.jitter * random.random()
+        return int(delay)
+
+    def wait(self, attempt):
+        delayMicroseconds(self.backoff_uS(attempt))
+
+    def _breaker(self, chip):
+        breaker = chip._circuitBreaker
+        if (breaker is None):
+            breaker = [0, 0]  # Consecutive failures, millis() time the breaker may let a packet through
+            chip._circuitBreaker = breaker
+        return breaker
+
+    """!
+    @brief Return True if chip's circuit breaker is open and packets to it should fail immediately
+    """
+    def isOpen(self, chip):
+        breaker = self._breaker(chip)
+        if (breaker[0] < self.breakerThreshold):
+            return False
+        now = millis()
+        if (now >= breaker[1]):
+            breaker[1] = now + self.breakerCooldown_mS  # Let this packet through, hold others until it completes or times out
+            return False
+        return True
+
+    """!
+    @brief Record the outcome of a packet, after any retries, in chip's circuit breaker
+    @param failed True if the packet failed with a retryable error
+    """
+    def recordOutcome(self, chip, failed):
+        breaker = self._breaker(chip)
+        if (not failed):
+            breaker[0] = 0
+            return
+        breaker[0] += 1
+        if (breaker[0] >= self.breakerThreshold):
+            breaker[1] = millis() + self.breakerCooldown_mS
+
+    """!
+    @brief Close chip's circuit breaker, for instance after the chip has been replaced
+    """
+    def reset(self, chip):
+        chip._circuitBreaker = None
@@ -271,3 +271,17 @@ class SerialWombatHighFrequencyServo(SerialWombatServo_18AB):
 		tx += bytearray([0x55,0x55,0x55])
 		result,rx = self._sw.sendPacket(tx)
 		return result
+
+
+"""!
+@brief Write 16 bit positions to several servos in one control tick
+
+The positions are sent two per packet through SerialWombatPin.writePublicDataMany().
+@param servos A list of attached SerialWombatServo instances
+@param positions A list of positions, one per servo.  0 sends the minimum pulse width, 65535 the maximum.
+@return 0 on success, or the first negative error code
+"""
+def write16bitMany(servos, positions):
+	for i in range(len(servos)):
+		servos[i]._position = positions[i]
+	return SerialWombatPin.writePublicDataMany(servos, positions)
@@ -0,0 +1,199 @@
+"""
+Copyright 2020-2023 Broadwell Consulting Inc.
+
+"Serial Wombat" is a registered trademark of Broadwell Consulting Inc. in
+the United States.  See SerialWombat.com for usage guidance.
+
+Permission is hereby granted, free of charge, to any person obtaining a
+ * copy of this software and associated documentation files (the "Software"),
+ * to deal in the Software without restriction, including without limitation
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,
+ * and/or sell copies of the Software, and to permit persons to whom the
+ * Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+ * THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+ * OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+ * ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+ * OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""! @file SerialWombatTelemetry.py
+
+Per-command transport statistics for a SerialWombatChip.
+
+Enable with:
+
+    telemetry = sw.enableTelemetry()
+    ...
+    print(telemetry.snapshot())
+    print(telemetry.prometheus())
+
+Statistics are kept per command byte (tx[0]) of each packet sent with sendPacket or sendPackets:
+call count, total and maximum latency, a latency histogram with power of two microsecond buckets,
+retries, echo mismatches and the error codes returned.  Recording a packet costs a dictionary lookup
+and a few integer additions, so telemetry can be left enabled.
+"""
+
+from ArduinoFunctions import millis
+
+## Number of histogram buckets.  Bucket i counts packets that took at most 2**i uS; the last bucket counts everything longer.
+HISTOGRAM_BUCKETS = 24
+
+
+"""!
+@brief Statistics for one command byte
+"""
+class SerialWombatCommandStats():
+    def __init__(self):
+        ## Number of packets sent with this command, not counting retries
+        self.calls = 0
+        ## Number of packets that returned an error response
+        self.errors = 0
+        ## Number of times a packet was resent
+        self.retries = 0
+        ## Number of responses whose echo didn't match the packet sent
+        self.echoMismatches = 0
+        self.totalTime_uS = 0
+        self.maxTime_uS = 0
+        ## histogram[i] is the number of packets that took at most 2**i uS (and more than 2**(i-1)), matching Prometheus' inclusive le bounds
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+        ## Count of each error code returned, keyed by error code
+        self.errorCodes = {}
+
+    def asDict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "echoMismatches": self.echoMismatches,
+            "totalTime_uS": self.totalTime_uS,
+            "maxTime_uS": self.maxTime_uS,
+            "histogram": list(self.histogram),
+            "errorCodes": dict(self.errorCodes),
+        }
+
+
+# The bucket for elapsed_uS is the bit length of elapsed_uS - 1, so 2**i itself falls in bucket i
+def _bucket(elapsed_uS):
+    b = 0
+    elapsed_uS -= 1
+    while (elapsed_uS > 0 and b < HISTOGRAM_BUCKETS - 1):
+        elapsed_uS >>= 1
+        b += 1
+    return b
+
+
+"""!
+@brief Collects per-command statistics for a SerialWombatChip
+
+Created and attached by SerialWombatChip.enableTelemetry().  Several chips may share one instance
+if combined statistics are wanted.
+"""
+class SerialWombatTelemetry():
+    def __init__(self):
+        self.reset()
+
+    """!
+    @brief Clear all statistics
+    """
+    def reset(self):
+        ## SerialWombatCommandStats keyed by command byte
+        self.commands = {}
+        self.startTime_mS = millis()
+
+    """!
+    @brief Record one packet.  Called by SerialWombatChip.
+    @param command The command byte, tx[0]
+    @param elapsed_uS Time from sending the packet to receiving its response, including retries
+    @param errorCode 0 for success or the positive error code returned
+    @param retries Number of times the packet was resent
+    @param echoMismatches Number of responses that didn't echo the packet
+    """
+    def record(self, command, elapsed_uS, errorCode = 0, retries = 0, echoMismatches = 0):
+        stats = self.commands.get(command)
+        if (stats is None):
+            stats = SerialWombatCommandStats()
+            self.commands[command] = stats
+        if (elapsed_uS < 0):
+            elapsed_uS = 0
+        stats.calls += 1
+        stats.totalTime_uS += elapsed_uS
+        if (elapsed_uS > stats.maxTime_uS):
+            stats.maxTime_uS = elapsed_uS
+        stats.histogram[_bucket(elapsed_uS)] += 1
+        if (retries):
+            stats.retries += retries
+        if (echoMismatches):
+            stats.echoMismatches += echoMismatches
+        if (errorCode):
+            stats.errors += 1
+            stats.errorCodes[errorCode] = stats.errorCodes.get(errorCode, 0) + 1
+
+    """!
+    @brief Return the statistics as a dictionary
+
+    The dictionary has totals for all commands under "calls", "errors", "retries", "echoMismatches"
+    and "totalTime_uS", and the statistics of each command under "commands", keyed by command byte.
+    """
+    def snapshot(self):
+        commands = {}
+        totals = {"calls": 0, "errors": 0, "retries": 0, "echoMismatches": 0, "totalTime_uS": 0}
+        for command, stats in self.commands.items():
+            d = stats.asDict()
+            commands[command] = d
+            for key in totals:
+                totals[key] += d[key]
+        totals["elapsed_mS"] = millis() - self.startTime_mS
+        totals["commands"] = commands
+        return totals
+
+    """!
+    @brief Return the statistics in the Prometheus text exposition format
+    @param prefix Prefix for the metric names
+    @param labels Optional dictionary of extra labels added to every sample, e.g. {"address": "0x6B"}
+    """
+    def prometheus(self, prefix = "serialwombat", labels = None):
+        extra = ""
+        if (labels):
+            for key in sorted(labels):
+                extra += ',%s="%s"' % (key, labels[key])
+        lines = []
+        counters = (("packets_total", "calls", "Packets sent"),
+                    ("errors_total", "errors", "Packets that returned an error response"),
+                    ("retries_total", "retries", "Packets resent"),
+                    ("echo_mismatches_total", "echoMismatches", "Responses that did not echo the packet sent"))
+        commands = sorted(self.commands)
+        for name, member, help in counters:
+            lines.append("# HELP %s_%s %s" % (prefix, name, help))
+            lines.append("# TYPE %s_%s counter" % (prefix, name))
+            for command in commands:
+                lines.append('%s_%s{command="0x%02X"%s} %d' % (prefix, name, command, extra, getattr(self.commands[command], member)))
+
+        name = prefix + "_command_errors_total"
+        lines.append("# HELP %s Error responses by error code" % name)
+        lines.append("# TYPE %s counter" % name)
+        for command in commands:
+            errorCodes = self.commands[command].errorCodes
+            for code in sorted(errorCodes):
+                lines.append('%s{command="0x%02X",code="%d"%s} %d' % (name, command, code, extra, errorCodes[code]))
+
+        name = prefix + "_packet_latency_seconds"
+        lines.append("# HELP %s Time from sending a packet to receiving its response" % name)
+        lines.append("# TYPE %s histogram" % name)
+        for command in commands:
+            stats = self.commands[command]
+            label = 'command="0x%02X"%s' % (command, extra)
+            cumulative = 0
+            for i in range(HISTOGRAM_BUCKETS - 1):
+                cumulative += stats.histogram[i]
+                lines.append('%s_bucket{%s,le="%g"} %d' % (name, label, (1 << i) / 1000000, cumulative))
+            lines.append('%s_bucket{%s,le="+Inf"} %d' % (name, label, stats.calls))
+            lines.append('%s_sum{%s} %g' % (name, label, stats.totalTime_uS / 1000000))
+            lines.append('%s_count{%s} %d' % (name, label, stats.calls))
+        return "\n".join(lines) + "\n"
@@ -34,6 +34,7 @@ THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
 import SerialWombat
 from SerialWombatPin import SerialWombatPin
 from SerialWombat import SW_LE16
+from SerialWombatCodec import PKT_CMD, PKT_PIN, PKT_PIN_U8
 from ArduinoFunctions import millis
 import SerialWombatQueue
 
@@ -166,16 +167,14 @@ class SerialWombatUART (SerialWombatPin):
         @return Number of bytes available to read.
         """
         def available(self):
-                tx = [ 201, self._pin,self._pinMode, 0,0x55,0x55,0x55,0x55 ]
-                result,rx = self._sw.sendPacket(tx)
+                result,rx = self._sw.sendPacket(self._sw.encodePacket(PKT_PIN_U8, 201, self._pin, self._pinMode, 0))
                 return (rx[4])
         """!
         @brief Reads a byte from the SerialWombatUART
         @return A byte from 0-255, or -1 if no bytes were avaialble
         """
         def read(self):
-                tx = [ 202, self._pin,self._pinMode, 1,0x55,0x55,0x55,0x55 ]
-                result,rx = self._sw.sendPacket(tx)
+                result,rx = self._sw.sendPacket(self._sw.encodePacket(PKT_PIN_U8, 202, self._pin, self._pinMode, 1))
                 if (result < 0):
                         return -1
                 if (rx[3] != 0):
@@ -194,8 +193,7 @@ class SerialWombatUART (SerialWombatPin):
         @return A byte from 0-255, or -1 if no bytes were avaialble
         """
         def peek(self):
-                tx = [ 203, self._pin,self._pinMode,0x55,0x55,0x55,0x55,0x55 ]
-                result, rx = self._sw.sendPacket(tx)
+                result, rx = self._sw.sendPacket(self._sw.encodePacket(PKT_PIN, 203, self._pin, self._pinMode))
                 if (result < 0):
                        return (-1)
                 if (rx[4] > 0):
@@ -301,8 +299,7 @@ class SerialWombatUART (SerialWombatPin):
                         if (length < 4):
                                 bytecount = length
                                 
-                        tx = [ 202, self._pin,self._pinMode,  bytecount,0x55,0x55,0x55,0x55 ]
-                        result,rx = self._sw.sendPacket(tx)
+                        result,rx = self._sw.sendPacket(self._sw.encodePacket(PKT_PIN_U8, 202, self._pin, self._pinMode, bytecount))
                         bytesAvailable = rx[3]
                         
                         if (bytesAvailable == 0) :
@@ -318,8 +315,7 @@ class SerialWombatUART (SerialWombatPin):
                                 length -= 1
 
                         while (bytesAvailable >= 7 and length >= 7):
-                                tx = [ self._rx7Command, 0x55,0x55,0x55,0x55,0x55,0x55,0x55 ]
-                                result,rx= self._sw.sendPacket(tx)
+                                result,rx= self._sw.sendPacket(self._sw.encodePacket(PKT_CMD, self._rx7Command))
                                 for i in range(7):
                                         buf.append( rx[i + 1])
                                         bytesAvailable -= 1
@@ -138,7 +138,18 @@ class SerialWombatUltrasonicDistanceSensor ( SerialWombatAbstractProcessedInput.
 		return (b[0] + 256 * b[1])
 
 
+	"""!
+	@brief Read several servo sweep distance entries
+	@param entries A list (or array) to receive count 16 bit entries, or None
+	@param count The number of entries to read
+	@return The number of entries read into entries, or if entries is None a bytearray of the raw little endian entries
+	"""
 	def readServoSweepEntries(self, entries,  count):
-
-		return self._sw.readUserBuffer(self.servoMemoryIndex, 2 * count)
+		data = bytearray(2 * count)
+		bytesRead = self._sw.readUserBufferInto(self.servoMemoryIndex, data)
+		if (entries is None):
+			return data[:bytesRead]
+		for i in range(bytesRead // 2):
+			entries[i] = data[2 * i] + 256 * data[2 * i + 1]
+		return bytesRead // 2
 
@@ -0,0 +1,228 @@
+"""
+Copyright 2020-2023 Broadwell Consulting Inc.
+
+"Serial Wombat" is a registered trademark of Broadwell Consulting Inc. in
+the United States.  See SerialWombat.com for usage guidance.
+
+Permission is hereby granted, free of charge, to any person obtaining a
+ * copy of this software and associated documentation files (the "Software"),
+ * to deal in the Software without restriction, including without limitation
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,
+ * and/or sell copies of the Software, and to permit persons to whom the
+ * Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+ * THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+ * OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+ * ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+ * OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""! @file SerialWombatUserBufferMirror.py
+
+A host side copy of part of a Serial Wombat chip's User Buffer that sends only what changed.
+"""
+
+from SerialWombat import SerialWombatCommands
+from SerialWombatCodec import PKT_CMD, PKT_CMD_U16_U8, PACKET_PADDING
+
+
+"""!
+@brief A host copy of a range of the User Buffer with dirty range tracking
+
+Index and assign it like a bytearray.  Assignments are made to the host copy and the changed
+byte ranges are remembered.  flush() then writes only those ranges to the chip, choosing
+4 byte COMMAND_BINARY_WRITE_USER_BUFFER and 7 byte COMMAND_BINARY_WRITE_USER_BUFFER_CONTINUE
+packets to use as few packets as possible.  Nearby ranges are merged when rewriting the unchanged
+bytes between them takes fewer packets than writing the ranges separately, and a final continue
+packet may rewrite up to 2 unchanged bytes rather than needing extra 4 byte packets.  Because
+unchanged bytes may be rewritten from the host copy, the mirror must be the only writer of its range.
+Call load() first if the chip's contents aren't known.
+
+    mirror = UserBufferMirror(sw, 0x400, 960)
+    mirror[10:20] = frame[10:20]
+    mirror[500] = 0xFF
+    mirror.flush()
+
+Code that writes into buffer directly, e.g. through a memoryview, must call markDirty().
+"""
+class UserBufferMirror:
+    """!
+    @brief Constructor for UserBufferMirror
+    @param serial_wombat The chip whose User Buffer is mirrored
+    @param index The index in the User Buffer of the first mirrored byte
+    @param length The number of bytes mirrored
+    """
+    def __init__(self, serial_wombat, index = 0, length = 8192):
+        self._sw = serial_wombat
+        self.index = index
+        ## The host copy of the mirrored User Buffer bytes
+        self.buffer = bytearray(length)
+        self._dirty = []
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def __getitem__(self, key):
+        return self.buffer[key]
+
+    def __setitem__(self, key, value):
+        self.buffer[key] = value
+        if (isinstance(key, slice)):
+            start, stop, step = key.indices(len(self.buffer))
+            if (step != 1):
+                start, stop = min(start, stop + 1), max(start + 1, stop)
+            self.markDirty(start, stop)
+        else:
+            if (key < 0):
+                key += len(self.buffer)
+            self.markDirty(key, key + 1)
+
+    """!
+    @brief Copy bytes into the mirror
+    @param offset Offset in the mirror (not the User Buffer index) of the first byte
+    @param data The bytes to copy
+    """
+    def write(self, offset, data):
+        self.buffer[offset:offset + len(data)] = data
+        self.markDirty(offset, offset + len(data))
+
+    """!
+    @brief Record that mirror bytes start up to (not including) end have changed
+    """
+    def markDirty(self, start, end):
+        if (start < 0):
+            start = 0
+        if (end > len(self.buffer)):
+            end = len(self.buffer)
+        if (start >= end):
+            return
+        dirty = self._dirty
+        # Sequential writes extend the last range without a search
+        if (len(dirty) > 0 and dirty[-1][0] <= end and start <= dirty[-1][1]):
+            last = dirty[-1]
+            last[0] = min(last[0], start)
+            last[1] = max(last[1], end)
+            while (len(dirty) > 1 and dirty[-2][1] >= last[0]):
+                previous = dirty.pop(-2)
+                last[0] = min(last[0], previous[0])
+                last[1] = max(last[1], previous[1])
+            return
+        i = 0
+        while (i < len(dirty) and dirty[i][1] < start):
+            i += 1
+        merged = [start, end]
+        while (i < len(dirty) and dirty[i][0] <= end):
+            merged[0] = min(merged[0], dirty[i][0])
+            merged[1] = max(merged[1], dirty[i][1])
+            dirty.pop(i)
+        dirty.insert(i, merged)
+
+    def markAllDirty(self):
+        self._dirty = [[0, len(self.buffer)]]
+
+    def isDirty(self):
+        return len(self._dirty) > 0
+
+    """!
+    @brief Return the changed ranges as a list of (start, end) mirror offsets
+    """
+    def dirtyRanges(self):
+        return [(r[0], r[1]) for r in self._dirty]
+
+    """!
+    @brief Read the mirrored range from the chip into the host copy and clear the dirty ranges
+    @return The number of bytes read
+    """
+    def load(self):
+        count = self._sw.readUserBufferInto(self.index, self.buffer)
+        if (count == len(self.buffer)):
+            self._dirty = []
+        return count
+
+    def _packet(self, layout, *values):
+        tx = bytearray(8)
+        layout.pack_into(tx, 0, *values, PACKET_PADDING)
+        return tx
+
+    def _writePacket(self, offset, count):
+        tx = self._packet(PKT_CMD_U16_U8, SerialWombatCommands.COMMAND_BINARY_WRITE_USER_BUFFER, self.index + offset, count)
+        tx[4:4 + count] = self.buffer[offset:offset + count]
+        return tx
+
+    # Packets that write mirror bytes start up to end
+    def _planRange(self, start, end):
+        packets = []
+        count = min(4, end - start)
+        packets.append(self._writePacket(start, count))
+        position = start + count
+        while (position < end):
+            if (end - position > 4 and position + 7 <= len(self.buffer)):
+                tx = self._packet(PKT_CMD, SerialWombatCommands.COMMAND_BINARY_WRITE_USER_BUFFER_CONTINUE)
+                tx[1:8] = self.buffer[position:position + 7]
+                packets.append(tx)
+                position += 7
+            else:
+                count = min(4, end - position)
+                packets.append(self._writePacket(position, count))
+                position += count
+        return packets
+
+    # Number of packets _planRange(start, end) returns, computed without building them
+    def _rangePacketCount(self, start, end):
+        position = start + min(4, end - start)
+        remaining = end - position
+        # Continue packets are used while more than 4 bytes remain and 7 fit before the end of the mirror
+        continues = 0
+        if (remaining > 4):
+            continues = (remaining - 4 + 6) // 7
+            fit = (len(self.buffer) - 7 - position) // 7 + 1
+            if (fit < continues):
+                continues = max(fit, 0)
+            remaining -= 7 * continues
+        if (remaining < 0):
+            remaining = 0
+        return 1 + continues + (remaining + 3) // 4
+
+    """!
+    @brief Compute the packets flush() would send
+    @return A list of 8 byte packets
+    """
+    def plan(self):
+        packets = []
+        if (len(self._dirty) == 0):
+            return packets
+        start, end = self._dirty[0]
+        current = self._rangePacketCount(start, end)
+        for nextStart, nextEnd in self._dirty[1:]:
+            following = self._rangePacketCount(nextStart, nextEnd)
+            merged = self._rangePacketCount(start, nextEnd)
+            if (merged <= current + following):
+                current = merged
+                end = nextEnd
+            else:
+                packets += self._planRange(start, end)
+                start, end = nextStart, nextEnd
+                current = following
+        packets += self._planRange(start, end)
+        return packets
+
+    """!
+    @brief Write the changed ranges to the chip
+    @return The number of packets sent, or a negative error code.  On error the ranges stay dirty.
+    """
+    def flush(self):
+        packets = self.plan()
+        if (len(packets) == 0):
+            return 0
+        results = self._sw.sendPackets(packets)
+        for result, rx in results:
+            if (result < 0):
+                return result
+        self._dirty = []
+        return len(packets)
@@ -0,0 +1,628 @@
+"""
+Copyright 2020-2023 Broadwell Consulting Inc.
+
+"Serial Wombat" is a registered trademark of Broadwell Consulting Inc. in
+the United States.  See SerialWombat.com for usage guidance.
+
+Permission is hereby granted, free of charge, to any person obtaining a
+ * copy of this software and associated documentation files (the "Software"),
+ * to deal in the Software without restriction, including without limitation
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,
+ * and/or sell copies of the Software, and to permit persons to whom the
+ * Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+ * THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+ * OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+ * ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+ * OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""! @file SerialWombatVirtualChip.py
+
+An in-process model of a Serial Wombat chip for testing and benchmarking without hardware.
+"""
+
+import SerialWombat
+from SerialWombat import SerialWombatCommands, SerialWombatPinMode_t, SerialWombatDataSource
+import SerialWombatErrors
+from ArduinoFunctions import millis, delayMicroseconds
+
+
+"""!
+@brief A SerialWombatChip that answers packets from memory instead of hardware
+
+SerialWombatVirtualChip implements sendReceivePacketHardware() by decoding each packet and
+updating an in-memory model of the chip, so every driver in this library can run on a host
+with no Serial Wombat chips attached.  The model covers:
+
+- Version, echo, reset and bootloader/sleep commands
+- 16 bit public data for the chip's pins and the special data sources in SerialWombatDataSource
+  (incrementing number, frame counters, temperature, packet and error counters, supply voltage, LFSR, test waves...)
+- Reading and writing the User Buffer (0x83 - 0x85)
+- RAM byte queues in the User Buffer (0x90 - 0x94)
+- RAM and flash reads, RAM writes
+- Pin mode configuration, including the supported-mode check, with functional models of
+  digital I/O, the hardware UARTs (looped back from TX to RX), WS2812, VGA and SPI (MISO looped back from MOSI).
+  Other pin modes accept their configuration packets and echo them.
+- The public data threshold bitmap (0x8F)
+- Error responses ("E" followed by a 5 digit error code) for the errors the firmware reports
+
+A latency model can be configured with setLatency() so that the time cost of a given transport
+can be approximated.  The model is a fixed delay per transport transaction plus the time to move
+the bytes at a given bit rate.
+
+Model state is public so tests can inspect or stimulate it, e.g. publicData[pin], userBuffer, leds[pin],
+vgaFrameBuffer, uartReceive().
+"""
+class SerialWombatVirtualChip(SerialWombat.SerialWombatChip):
+    USER_BUFFER_SIZE = 8192
+    RAM_SIZE = 0x10000
+    UART_TX_QUEUE_SIZE = 64
+    UART_RX_QUEUE_SIZE = 128
+    QUEUE_HEADER_SIZE = 8
+    VGA_WIDTH = 160
+    VGA_HEIGHT = 120
+
+    """!
+    @brief Constructor for SerialWombatVirtualChip
+    @param address The address reported for this chip (used for keys and the COM address data sources)
+    @param model Four character model string returned in the version response, e.g. "S18B", "S08B" or "S04B"
+    @param firmwareVersion Three digit firmware version string
+    """
+    def __init__(self, address = 0x6B, model = "S18B", firmwareVersion = None):
+        SerialWombat.SerialWombatChip.__init__(self)
+        self.address = address
+        self.virtualModel = model
+        if (firmwareVersion is None):
+            if (model[1:3] == "18"):
+                firmwareVersion = str(SerialWombat.SW18AB_LATEST_FIRMWARE)
+            elif (model[1:3] == "08"):
+                firmwareVersion = str(SerialWombat.SW08B_LATEST_FIRMWARE)
+            else:
+                firmwareVersion = str(SerialWombat.SW4B_LATEST_FIRMWARE)
+        self.virtualFirmwareVersion = firmwareVersion
+        if (model[1:3] == "18"):
+            self.pinCount = 20
+        elif (model[1:3] == "08"):
+            self.pinCount = 8
+        else:
+            self.pinCount = 4
+        self.supplyVoltage_mV = 3300
+        self.temperature_100thsDegC = 2500
+        self.flash = {}
+        self._defaultFlash()
+        self.transactionLatency_uS = 0
+        self.bitsPerSecond = 0
+        self.bitsPerByte = 9
+        self.virtualReset()
+
+    """!
+    @brief Return the model to its power-on state
+    """
+    def virtualReset(self):
+        self.publicData = [0] * self.pinCount
+        self.inputLevels = [0] * self.pinCount
+        self.pinModes = [SerialWombatPinMode_t.PIN_MODE_DIGITALIO] * self.pinCount
+        self.userBuffer = bytearray(self.USER_BUFFER_SIZE)
+        self.ram = bytearray(self.RAM_SIZE)
+        self.queues = {}
+        self.leds = {}
+        self.vgaFrameBuffer = bytearray(self.VGA_WIDTH * self.VGA_HEIGHT)
+        self.vgaLineColors = bytearray(self.VGA_HEIGHT)
+        self.uartRx = [bytearray(), bytearray()]
+        self.uartLoopback = True
+        self.lastErrorPacket = bytearray(8)
+        self.packetsReceived = 0
+        self.errors = 0
+        self.inBootloader = False
+        self._resetMillis = millis()
+        self._incrementingNumber = 0
+        self._lfsr = 0xACE1
+        self._writeUserBufferContinue = -1
+        self._lastQueueIndex = 0xFFFF
+
+    def _defaultFlash(self):
+        if (self.pinCount == 20):
+            # Unique identifier and device identifier / revision locations read by SerialWombatChip
+            for i in range(5):
+                self.flash[0x801600 + 2 * i] = (0x3A5C17 + 0x010203 * (self.address + i)) & 0xFFFFFF
+            self.flash[0xFF0000] = 0x4B0B
+            self.flash[0xFF0002] = 0x0003
+        else:
+            for i in range(9):
+                self.flash[0x8100 + i] = (0x35 + self.address + i) & 0x3FFF
+            self.flash[0x8006] = 0x30E1
+            self.flash[0x8005] = 0x2002
+
+    """!
+    @brief Configure the latency model
+    @param transactionLatency_uS Fixed time charged per transport transaction (one packet, or one batch of packets)
+    @param bitsPerSecond Bus bit rate used to charge for bytes moved.  0 for no per-byte cost.
+    @param bitsPerByte Bits on the wire per byte, e.g. 9 for I2C (ACK bit) or 10 for 8-N-1 UART
+    """
+    def setLatency(self, transactionLatency_uS = 0, bitsPerSecond = 0, bitsPerByte = 9):
+        self.transactionLatency_uS = transactionLatency_uS
+        self.bitsPerSecond = bitsPerSecond
+        self.bitsPerByte = bitsPerByte
+
+    def _chargeLatency(self, byteCount):
+        delay_uS = self.transactionLatency_uS
+        if (self.bitsPerSecond > 0):
+            delay_uS += byteCount * self.bitsPerByte * 1000000 // self.bitsPerSecond
+        if (delay_uS > 0):
+            delayMicroseconds(delay_uS)
+
+    """!
+    @brief Place bytes in a hardware UART's receive queue as if they had arrived on the RX pin
+    @param hwInterface 0 for the first UART, 1 for the second
+    """
+    def uartReceive(self, hwInterface, data):
+        q = self.uartRx[hwInterface]
+        space = self.UART_RX_QUEUE_SIZE - len(q)
+        q += bytearray(data)[:space]
+
+    #Transport
+
+    def sendReceivePacketHardware(self, tx):
+        self._chargeLatency(16)
+        return 8, self.processPacket(tx)
+
+    def sendReceivePacketsHardware(self, txList):
+        self._chargeLatency(16 * len(txList))
+        responses = []
+        for tx in txList:
+            responses.append((8, self.processPacket(tx)))
+        return responses
+
+    def sendPacketToHardware(self, tx):
+        self._chargeLatency(8)
+        self.processPacket(tx)
+        return 8, bytes("E00048UU",'utf-8')
+
+    #Packet processing
+
+    def _error(self, tx, code):
+        self.errors += 1
+        self.lastErrorPacket = bytearray(tx)
+        return bytearray(("E%05dUU" % code).encode())
+
+    def _le16(self, tx, i):
+        return tx[i] + (tx[i + 1] << 8)
+
+    def _setLe16(self, rx, i, value):
+        rx[i] = value & 0xFF
+        rx[i + 1] = (value >> 8) & 0xFF
+
+    """!
+    @brief Process one 8 byte packet against the model
+    @return The 8 byte response the chip would send
+    """
+    def processPacket(self, tx):
+        tx = bytearray(tx)
+        while (len(tx) < 8):
+            tx.append(0x55)
+        self.packetsReceived += 1
+        cmd = tx[0]
+        if (tx == bytearray(b"ReSeT!#*")):
+            self.virtualReset()
+            return bytearray(tx)
+        if (tx == bytearray(b"BoOtLoAd")):
+            self.inBootloader = True
+            return bytearray(tx)
+        handler = self._commandHandlers.get(cmd)
+        if (handler is None):
+            if (cmd >= SerialWombatCommands.CONFIGURE_PIN_MODE0 and cmd <= SerialWombatCommands.CONFIGURE_CHANNEL_MODE_HW_3):
+                return self._pinConfigure(tx)
+            return self._error(tx, SerialWombatErrors.SW_ERROR_INVALID_COMMAND)
+        return handler(self, tx)
+
+    def _echo(self, tx):
+        return bytearray(tx)
+
+    def _version(self, tx):
+        return bytearray(("V" + self.virtualModel + self.virtualFirmwareVersion).encode())
+
+    def _readSource(self, source):
+        if (source < self.pinCount):
+            return self.publicData[source]
+        frames = (millis() - self._resetMillis) & 0xFFFFFFFF
+        if (source == SerialWombatDataSource.SW_DATA_SOURCE_INCREMENTING_NUMBER):
+            self._incrementingNumber = (self._incrementingNumber + 1) & 0xFFFF
+            return self._incrementingNumber
+        if (source == SerialWombatDataSource.SW_DATA_SOURCE_1024mvCounts):
+            return (1024 * 65536 // self.supplyVoltage_mV) & 0xFFFF
+        if (source == SerialWombatDataSource.SW_DATA_SOURCE_FRAMES_RUN_LSW):
+            return frames & 0xFFFF
+        if (source == SerialWombatDataSource.SW_DATA_SOURCE_FRAMES_RUN_MSW):
+            return frames >> 16
+        if (source == SerialWombatDataSource.SW_DATA_SOURCE_TEMPERATURE):
+            return self.temperature_100thsDegC & 0xFFFF
+        if (source == SerialWombatDataSource.SW_DATA_SOURCE_PACKETS_RECEIVED):
+            return self.packetsReceived & 0xFFFF
+        if (source == SerialWombatDataSource.SW_DATA_SOURCE_ERRORS):
+            return self.errors & 0xFFFF
+        if (source == SerialWombatDataSource.SW_DATA_SOURCE_SYSTEM_UTILIZATION):
+            return 0x1000
+        if (source == SerialWombatDataSource.SW_DATA_SOURCE_VCC_mVOLTS):
+            return self.supplyVoltage_mV
+        if (source == SerialWombatDataSource.SW_DATA_SOURCE_LFSR):
+            lsb = self._lfsr & 1
+            self._lfsr >>= 1
+            if (lsb):
+                self._lfsr ^= 0xB400
+            return self._lfsr
+        if (source == SerialWombatDataSource.SW_DATA_COM_ADDRESS_LOW):
+            return self.address & 0xFFFF
+        if (source == SerialWombatDataSource.SW_DATA_COM_ADDRESS_HIGH):
+            return (self.address >> 16) & 0xFFFF
+        if (source == SerialWombatDataSource.SW_DATA_SOURCE_0x55):
+            return 0x5555
+        if (source >= SerialWombatDataSource.SW_DATA_SOURCE_PIN_0_MV and source < SerialWombatDataSource.SW_DATA_SOURCE_PIN_0_MV + self.pinCount):
+            return self.publicData[source - SerialWombatDataSource.SW_DATA_SOURCE_PIN_0_MV] * self.supplyVoltage_mV >> 16
+        if (source >= SerialWombatDataSource.SW_DATA_SOURCE_2HZ_SQUARE and source <= SerialWombatDataSource.SW_DATA_SOURCE_65SEC_SAW):
+            periods = { 164: 512, 165: 512, 167: 1024, 168: 1024, 170: 2048, 171: 2048, 173: 8192, 174: 8192, 176: 65536, 177: 65536 }
+            period = periods.get(source)
+            if (period is None):
+                return 0
+            phase = frames % period
+            if ((source - SerialWombatDataSource.SW_DATA_SOURCE_2HZ_SQUARE) % 3 == 0):
+                if (phase < period // 2):
+                    return 0
+                return 0xFFFF
+            if (phase < period // 2):
+                return (phase * 0x20000 // period) & 0xFFFF
+            return ((period - phase) * 0x20000 // period - 1) & 0xFFFF
+        return 0
+
+    def _readPinBuffer(self, tx):
+        rx = bytearray(tx)
+        self._setLe16(rx, 2, self._readSource(tx[1]))
+        if (tx[2] != 255):
+            self._setLe16(rx, 4, self._readSource(tx[2]))
+        return rx
+
+    def _writePublic(self, pin, value):
+        if (pin < self.pinCount):
+            self.publicData[pin] = value
+
+    def _setPinBuffer(self, tx):
+        self._writePublic(tx[1], self._le16(tx, 2))
+        if (tx[4] != 255):
+            self._writePublic(tx[4], self._le16(tx, 5))
+        return bytearray(tx)
+
+    def _pollThreshold(self, tx):
+        threshold = self._le16(tx, 1)
+        bitmap = 0
+        for pin in range(self.pinCount):
+            if (self.publicData[pin] > threshold):
+                bitmap |= (1 << pin)
+        rx = bytearray(tx)
+        rx[1] = bitmap & 0xFF
+        rx[2] = (bitmap >> 8) & 0xFF
+        rx[3] = (bitmap >> 16) & 0xFF
+        rx[4] = (bitmap >> 24) & 0xFF
+        return rx
+
+    def _readUserBuffer(self, tx):
+        index = self._le16(tx, 1)
+        if (index >= self.USER_BUFFER_SIZE):
+            return self._error(tx, SerialWombatErrors.SW_ERROR_RUB_INVALID_ADDRESS)
+        rx = bytearray(tx)
+        data = self.userBuffer[index:index + 7]
+        rx[1:1 + len(data)] = data
+        return rx
+
+    def _writeUserBuffer(self, tx):
+        index = self._le16(tx, 1)
+        count = tx[3]
+        if (count > 4):
+            return self._error(tx, SerialWombatErrors.SW_ERROR_WUB_COUNT_GT_4)
+        if (index + count > self.USER_BUFFER_SIZE):
+            return self._error(tx, SerialWombatErrors.SW_ERROR_WUB_INVALID_ADDRESS)
+        self.userBuffer[index:index + count] = tx[4:4 + count]
+        self._writeUserBufferContinue = index + count
+        return bytearray(tx)
+
+    def _writeUserBufferContinue(self, tx):
+        index = self._writeUserBufferContinue
+        if (index < 0 or index + 7 > self.USER_BUFFER_SIZE):
+            return self._error(tx, SerialWombatErrors.SW_ERROR_WUB_CONTINUE_OUTOFBOUNDS)
+        self.userBuffer[index:index + 7] = tx[1:8]
+        self._writeUserBufferContinue = index + 7
+        return bytearray(tx)
+
+    #Queues
+
+    def _queueInitialize(self, tx):
+        index = self._le16(tx, 1)
+        length = self._le16(tx, 3)
+        if (index & 1):
+            return self._error(tx, SerialWombatErrors.SW_ERROR_QUEUE_RESULT_UNALIGNED_ADDRESS)
+        if (index + length + self.QUEUE_HEADER_SIZE > self.USER_BUFFER_SIZE):
+            return self._error(tx, SerialWombatErrors.SW_ERROR_QUEUE_RESULT_INSUFFICIENT_USER_SPACE)
+        self.queues[index] = [length, bytearray()]
+        rx = bytearray(tx)
+        self._setLe16(rx, 3, length + self.QUEUE_HEADER_SIZE)
+        return rx
+
+    def _queueAdd(self, tx, index, data):
+        queue = self.queues.get(index)
+        if (queue is None):
+            return None
+        space = queue[0] - len(queue[1])
+        added = data[:space]
+        queue[1] += added
+        return len(added)
+
+    def _queueAddBytes(self, tx):
+        index = self._le16(tx, 1)
+        count = tx[3]
+        if (count > 4):
+            count = 4
+        self._lastQueueIndex = index
+        added = self._queueAdd(tx, index, tx[4:4 + count])
+        if (added is None):
+            return self._error(tx, SerialWombatErrors.SW_ERROR_QUEUE_RESULT_INVALID_QUEUE)
+        rx = bytearray(tx)
+        rx[3] = added
+        return rx
+
+    def _queueAdd7Bytes(self, tx):
+        added = self._queueAdd(tx, self._lastQueueIndex, tx[1:8])
+        if (added is None):
+            return self._error(tx, SerialWombatErrors.SW_ERROR_QUEUE_RESULT_INVALID_QUEUE)
+        rx = bytearray(tx)
+        rx[3] = added
+        return rx
+
+    def _queueReadBytes(self, tx):
+        queue = self.queues.get(self._le16(tx, 1))
+        if (queue is None):
+            return self._error(tx, SerialWombatErrors.SW_ERROR_QUEUE_RESULT_INVALID_QUEUE)
+        count = tx[3]
+        if (count > 6):
+            count = 6
+        data = queue[1][:count]
+        queue[1] = queue[1][len(data):]
+        rx = bytearray([tx[0], len(data), 0x55, 0x55, 0x55, 0x55, 0x55, 0x55])
+        rx[2:2 + len(data)] = data
+        return rx
+
+    def _queueInformation(self, tx):
+        queue = self.queues.get(self._le16(tx, 1))
+        if (queue is None):
+            return self._error(tx, SerialWombatErrors.SW_ERROR_QUEUE_RESULT_INVALID_QUEUE)
+        rx = bytearray(tx)
+        if (len(queue[1]) > 0):
+            rx[3] = queue[1][0]
+        self._setLe16(rx, 4, len(queue[1]))
+        self._setLe16(rx, 6, queue[0] - len(queue[1]))
+        return rx
+
+    #Memory
+
+    def _readRam(self, tx):
+        rx = bytearray(tx)
+        rx[3] = self.ram[self._le16(tx, 1)]
+        return rx
+
+    def _writeRam(self, tx):
+        self.ram[self._le16(tx, 1)] = tx[5]
+        return bytearray(tx)
+
+    def _readFlash(self, tx):
+        address = tx[1] + (tx[2] << 8) + (tx[3] << 16) + (tx[4] << 24)
+        if (self.pinCount == 20 and (address & 1)):
+            return self._error(tx, SerialWombatErrors.SW_ERROR_RF_ODD_ADDRESS)
+        if (self.pinCount == 20):
+            value = self.flash.get(address, 0xFFFFFF)
+        else:
+            value = self.flash.get(address, 0x3FFF)
+        rx = bytearray(tx)
+        rx[4] = value & 0xFF
+        rx[5] = (value >> 8) & 0xFF
+        rx[6] = (value >> 16) & 0xFF
+        rx[7] = (value >> 24) & 0xFF
+        return rx
+
+    def _readLastErrorPacket(self, tx):
+        rx = bytearray(tx)
+        start = tx[1]
+        data = self.lastErrorPacket[start:start + 7]
+        rx[1:1 + len(data)] = data
+        return rx
+
+    #UARTs
+
+    def _uartForCommand(self, cmd):
+        if (cmd == SerialWombatCommands.COMMAND_UART0_TX_7BYTES or cmd == SerialWombatCommands.COMMAND_UART0_RX_7BYTES):
+            return 0
+        return 1
+
+    def _uartTransmit(self, hw, data):
+        if (self.uartLoopback):
+            self.uartReceive(hw, data)
+
+    def _uartTx7(self, tx):
+        self._uartTransmit(self._uartForCommand(tx[0]), tx[1:8])
+        return bytearray(tx)
+
+    def _uartRx7(self, tx):
+        q = self.uartRx[self._uartForCommand(tx[0])]
+        data = q[:7]
+        self.uartRx[self._uartForCommand(tx[0])] = q[len(data):]
+        rx = bytearray(tx)
+        rx[1:1 + len(data)] = data
+        return rx
+
+    def _uartPinCommand(self, tx, hw):
+        cmd = tx[0]
+        rx = bytearray(tx)
+        q = self.uartRx[hw]
+        if (cmd == 200):
+            self.uartRx[hw] = bytearray()
+            return rx
+        if (cmd == 201):
+            count = min(tx[3], 4)
+            self._uartTransmit(hw, tx[4:4 + count])
+            rx[3] = self.UART_TX_QUEUE_SIZE
+            rx[4] = len(self.uartRx[hw])
+            return rx
+        if (cmd == 202):
+            count = min(tx[3], 4)
+            rx[3] = len(q)
+            data = q[:count]
+            self.uartRx[hw] = q[len(data):]
+            rx[4:4 + len(data)] = data
+            return rx
+        if (cmd == 203):
+            rx[3] = self.UART_TX_QUEUE_SIZE
+            rx[4] = len(q)
+            if (len(q) > 0):
+                rx[5] = q[0]
+            return rx
+        return rx
+
+    #Pin modes
+
+    def _pinConfigure(self, tx):
+        cmd = tx[0]
+        pin = tx[1]
+        mode = tx[2]
+        if (cmd == SerialWombatCommands.CONFIGURE_CHANNEL_MODE_CHECK_MODE_SUPPORTED):
+            if (self.isVirtualPinModeSupported(mode)):
+                return bytearray(tx)
+            return self._error(tx, SerialWombatErrors.SW_ERROR_UNKNOWN_PIN_MODE)
+        if (pin >= self.pinCount):
+            return self._error(tx, SerialWombatErrors.SW_ERROR_PIN_NUMBER_TOO_HIGH)
+        if (cmd == SerialWombatCommands.CONFIGURE_PIN_MODE_DISABLE):
+            self.pinModes[pin] = SerialWombatPinMode_t.PIN_MODE_DIGITALIO
+            return bytearray(tx)
+        if (cmd == SerialWombatCommands.CONFIGURE_PIN_MODE0):
+            if (not self.isVirtualPinModeSupported(mode)):
+                return self._error(tx, SerialWombatErrors.SW_ERROR_UNKNOWN_PIN_MODE)
+            self.pinModes[pin] = mode
+        elif (cmd < SerialWombatCommands.CONFIGURE_PIN_OUTPUTSCALE and self.pinModes[pin] != mode):
+            return self._error(tx, SerialWombatErrors.SW_ERROR_PIN_CONFIG_WRONG_ORDER)
+
+        if (mode == SerialWombatPinMode_t.PIN_MODE_DIGITALIO and cmd == SerialWombatCommands.CONFIGURE_PIN_MODE0):
+            if (tx[3] == 0 or tx[3] == 1):
+                self.publicData[pin] = tx[3]
+            else:
+                self.publicData[pin] = self.inputLevels[pin]
+        elif (mode == SerialWombatPinMode_t.PIN_MODE_UART_RX_TX):
+            return self._uartPinCommand(tx, 0)
+        elif (mode == SerialWombatPinMode_t.PIN_MODE_UART1_RX_TX):
+            return self._uartPinCommand(tx, 1)
+        elif (mode == SerialWombatPinMode_t.PIN_MODE_WS2812):
+            return self._ws2812Command(tx)
+        elif (mode == SerialWombatPinMode_t.PIN_MODE_VGA):
+            return self._vgaCommand(tx)
+        elif (mode == SerialWombatPinMode_t.PIN_MODE_SPI):
+            return self._spiCommand(tx)
+        return bytearray(tx)
+
+    def isVirtualPinModeSupported(self, mode):
+        if (self.pinCount == 4):
+            return mode in (SerialWombatPinMode_t.PIN_MODE_DIGITALIO,
+                            SerialWombatPinMode_t.PIN_MODE_ANALOGINPUT,
+                            SerialWombatPinMode_t.PIN_MODE_CONTROLLED,
+                            SerialWombatPinMode_t.PIN_MODE_SERVO,
+                            SerialWombatPinMode_t.PIN_MODE_PWM,
+                            SerialWombatPinMode_t.PIN_MODE_DEBOUNCE,
+                            SerialWombatPinMode_t.PIN_MODE_QUADRATUREENCODER,
+                            SerialWombatPinMode_t.PIN_MODE_WATCHDOG,
+                            SerialWombatPinMode_t.PIN_MODE_PULSETIMER,
+                            SerialWombatPinMode_t.PIN_MODE_PROTECTED_OUTPUT,
+                            SerialWombatPinMode_t.PIN_MODE_UART_RX_TX)
+        if (self.pinCount == 8 and mode in (SerialWombatPinMode_t.PIN_MODE_VGA,
+                                            SerialWombatPinMode_t.PIN_MODE_WS2812,
+                                            SerialWombatPinMode_t.PIN_MODE_UART1_RX_TX)):
+            return False
+        return mode != SerialWombatPinMode_t.PIN_MODE_UNKNOWN and mode <= SerialWombatPinMode_t.PIN_MODE_RANDOMBLINK
+
+    def _ws2812Command(self, tx):
+        cmd = tx[0]
+        pin = tx[1]
+        rx = bytearray(tx)
+        if (cmd == 200):
+            self.leds[pin] = [0] * tx[5]
+        elif (cmd == 201):
+            leds = self.leds.get(pin, [])
+            if (tx[3] >= len(leds)):
+                return self._error(tx, SerialWombatErrors.SW_ERROR_WS2812_INDEX_GT_LEDS)
+            leds[tx[3]] = tx[4] + (tx[5] << 8) + (tx[6] << 16) + (tx[7] << 24)
+        elif (cmd == 202):
+            self._setLe16(rx, 3, tx[3] * 48)
+        return rx
+
+    def _vgaCommand(self, tx):
+        cmd = tx[0]
+        rx = bytearray(tx)
+        w = self.VGA_WIDTH
+        if (cmd == 201):
+            op = tx[3]
+            if (op == 0):
+                if (tx[4] < w and tx[5] < self.VGA_HEIGHT):
+                    self.vgaFrameBuffer[tx[5] * w + tx[4]] = 1 if tx[6] else 0
+            elif (op == 1):
+                value = 1 if tx[4] else 0
+                for i in range(len(self.vgaFrameBuffer)):
+                    self.vgaFrameBuffer[i] = value
+            elif (op == 2 or op == 3):
+                value = 1 if op == 2 else 0
+                for y in range(tx[5], min(tx[7] + 1, self.VGA_HEIGHT)):
+                    for x in range(tx[4], min(tx[6] + 1, w)):
+                        self.vgaFrameBuffer[y * w + x] = value
+        elif (cmd == 202):
+            for y in range(tx[3], min(tx[4] + 1, self.VGA_HEIGHT)):
+                self.vgaLineColors[y] = tx[5]
+        return rx
+
+    def _spiCommand(self, tx):
+        # MISO is modeled as looped back from MOSI, so received data equals sent data
+        return bytearray(tx)
+
+    _commandHandlers = {
+        SerialWombatCommands.CMD_ECHO: _echo,
+        SerialWombatCommands.CMD_VERSION: _version,
+        SerialWombatCommands.CMD_RESYNC: _echo,
+        ord('S'): _echo,
+        SerialWombatCommands.COMMAND_BINARY_READ_PIN_BUFFFER: _readPinBuffer,
+        SerialWombatCommands.COMMAND_BINARY_SET_PIN_BUFFFER: _setPinBuffer,
+        SerialWombatCommands.COMMAND_BINARY_READ_USER_BUFFER: _readUserBuffer,
+        SerialWombatCommands.COMMAND_BINARY_WRITE_USER_BUFFER: _writeUserBuffer,
+        SerialWombatCommands.COMMAND_BINARY_WRITE_USER_BUFFER_CONTINUE: _writeUserBufferContinue,
+        SerialWombatCommands.COMMAND_BINARY_PIN_POLL_THRESHOLD: _pollThreshold,
+        SerialWombatCommands.COMMAND_BINARY_QUEUE_INITIALIZE: _queueInitialize,
+        SerialWombatCommands.COMMAND_BINARY_QUEUE_ADD_BYTES: _queueAddBytes,
+        SerialWombatCommands.COMMAND_BINARY_QUEUE_ADD_7BYTES: _queueAdd7Bytes,
+        SerialWombatCommands.COMMAND_BINARY_QUEUE_READ_BYTES: _queueReadBytes,
+        SerialWombatCommands.COMMAND_BINARY_QUEUE_INFORMATION: _queueInformation,
+        SerialWombatCommands.COMMAND_BINARY_CONFIG_DATALOGGER: _echo,
+        SerialWombatCommands.COMMAND_BINARY_CONFIGURE: _echo,
+        SerialWombatCommands.COMMAND_BINARY_READ_RAM: _readRam,
+        SerialWombatCommands.COMMAND_BINARY_READ_FLASH: _readFlash,
+        SerialWombatCommands.COMMAND_BINARY_WRITE_RAM: _writeRam,
+        SerialWombatCommands.COMMAND_BINARY_WRITE_FLASH: _echo,
+        SerialWombatCommands.COMMAND_CALIBRATE_ANALOG: _echo,
+        SerialWombatCommands.COMMAND_ENABLE_2ND_UART: _echo,
+        SerialWombatCommands.COMMAND_READ_LAST_ERROR_PACKET: _readLastErrorPacket,
+        SerialWombatCommands.COMMAND_UART0_TX_7BYTES: _uartTx7,
+        SerialWombatCommands.COMMAND_UART0_RX_7BYTES: _uartRx7,
+        SerialWombatCommands.COMMAND_UART1_TX_7BYTES: _uartTx7,
+        SerialWombatCommands.COMMAND_UART1_RX_7BYTES: _uartRx7,
+        SerialWombatCommands.COMMAND_BINARY_TEST_SEQUENCE: _echo,
+        SerialWombatCommands.COMMAND_BINARY_RW_PIN_MEMORY: _echo,
+        SerialWombatCommands.COMMAND_CAPTURE_STARTUP_SEQUENCE: _echo,
+        SerialWombatCommands.COMMAND_ADJUST_FREQUENCY: _echo,
+        SerialWombatCommands.COMMAND_SET_PIN_HW: _echo,
+        SerialWombatCommands.COMMAND_BINARY_SET_ADDRESS: _echo,
+    }
@@ -27,6 +27,7 @@ THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
 import SerialWombatPin
 from SerialWombat import SW_LE16
 from SerialWombat import SW_LE32
+from SerialWombatCodec import PKT_PIN_U8_U32
 
 
 class SWWS2812Mode():
@@ -133,8 +134,7 @@ class SerialWombatWS2812(SerialWombatPin.SerialWombatPin):
 	@param color The color of the LED in 0x00RRGGBB format
 	"""
 	def write(self,  led,  color):
-		tx = bytearray([ 201,self._pin,12,led]) + SW_LE32(color) + bytearray([0x55])
-		result,rx = self._sw.sendPacket(tx)
+		result,rx = self._sw.sendPacket(self._sw.encodePacket(PKT_PIN_U8_U32, 201, self._pin, 12, led, color & 0xFFFFFFFF))
 		return result
 
 	"""
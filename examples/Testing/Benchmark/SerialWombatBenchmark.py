@@ -0,0 +1,320 @@
+"""
+Copyright 2020-2023 Broadwell Consulting Inc.
+
+"Serial Wombat" is a registered trademark of Broadwell Consulting Inc. in
+the United States.  See SerialWombat.com for usage guidance.
+
+Permission is hereby granted, free of charge, to any person obtaining a
+ * copy of this software and associated documentation files (the "Software"),
+ * to deal in the Software without restriction, including without limitation
+ * the rights to use, copy, modify, merge, publish, distribute, sublicense,
+ * and/or sell copies of the Software, and to permit persons to whom the
+ * Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+ * all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+ * THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+ * OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+ * ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+ * OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""! @file SerialWombatBenchmark.py
+
+Driver level benchmark for the Serial Wombat Python library.
+
+Runs bulk operations of several drivers and reports, per logical operation, the wall time,
+the number of 8 byte packets exchanged, the number of transport transactions (a batch of
+pipelined packets counts as one), and the bytes moved in each direction.  Results are written
+as JSON so a baseline can be saved and diffed against a later version of the library:
+
+    python SerialWombatBenchmark.py --output baseline.json
+    (change the library)
+    python SerialWombatBenchmark.py --compare baseline.json
+
+By default the benchmark runs against SerialWombatVirtualChip so no hardware is needed and
+packet counts are deterministic.  --latency-us and --bps add the virtual chip's transport latency
+model so wall time approximates a real link, e.g. --latency-us 150 --bps 400000 for 400kHz I2C.
+To benchmark real hardware, call runBenchmarks() with a chip created from one of the interfaces.
+
+Run with the repository root and interfaces/cpython on PYTHONPATH.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import SerialWombat
+import SerialWombatVirtualChip
+import SerialWombatQueue
+import SerialWombatUART
+import SerialWombatWS2812
+import SerialWombat18ABVGA
+import SerialWombatSPI
+
+
+"""!
+@brief Counts packets, transport transactions and bytes for a SerialWombatChip
+
+attach() replaces the chip's hardware methods with counting wrappers on the instance, so the
+counts include every packet any driver or library function sends, including retries.
+"""
+class PacketCounter():
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.packets = 0
+        self.transactions = 0
+        self.bytesOut = 0
+        self.bytesIn = 0
+
+    def attach(self, sw):
+        sendReceive = sw.sendReceivePacketHardware
+        sendReceiveMany = sw.sendReceivePacketsHardware
+        sendOnly = sw.sendPacketToHardware
+
+        def countedSendReceivePacketHardware(tx):
+            self.packets += 1
+            self.transactions += 1
+            self.bytesOut += len(tx)
+            self.bytesIn += 8
+            return sendReceive(tx)
+
+        def countedSendReceivePacketsHardware(txList):
+            self.packets += len(txList)
+            self.transactions += 1
+            for tx in txList:
+                self.bytesOut += len(tx)
+            self.bytesIn += 8 * len(txList)
+            return sendReceiveMany(txList)
+
+        def countedSendPacketToHardware(tx):
+            self.packets += 1
+            self.transactions += 1
+            self.bytesOut += len(tx)
+            return sendOnly(tx)
+
+        sw.sendReceivePacketHardware = countedSendReceivePacketHardware
+        sw.sendReceivePacketsHardware = countedSendReceivePacketsHardware
+        sw.sendPacketToHardware = countedSendPacketToHardware
+        return sw
+
+
+def _colors(count):
+    return [(i * 0x010305) & 0xFFFFFF for i in range(count)]
+
+
+def _payload(count):
+    return bytearray([(i * 7 + 3) & 0xFF for i in range(count)])
+
+
+# Each benchmark is (name, setup, operation).  setup(sw) runs uncounted and returns the context
+# passed to operation(sw, context).  Each benchmark gets a freshly reset chip.
+
+def _queueSetup(sw):
+    queue = SerialWombatQueue.SerialWombatQueue(sw)
+    queue.begin(0, 2048)
+    queue.writeBuffer(_payload(1024), 1024)
+    return queue
+
+def _queueRead(sw, queue):
+    return queue.readBytes(1024)
+
+def _queueWriteSetup(sw):
+    queue = SerialWombatQueue.SerialWombatQueue(sw)
+    queue.begin(0, 2048)
+    return queue
+
+def _queueWrite(sw, queue):
+    return queue.writeBuffer(_payload(1024), 1024)
+
+def _uartSetup(sw):
+    uart = SerialWombatUART.SerialWombatUART(sw)
+    uart.begin(115200, 9, 9, 10)
+    return uart
+
+def _uartWrite(sw, uart):
+    return uart.write(_payload(1024), 1024)
+
+def _uartReadSetup(sw):
+    uart = _uartSetup(sw)
+    sw.uartLoopback = False
+    sw.uartReceive(0, _payload(128))
+    return uart
+
+def _uartRead(sw, uart):
+    return uart.readBytes(128)
+
+def _ws2812Setup(sw):
+    # numberOfLEDs is a single byte in the configuration packet, so 300 LEDs are split across two strings
+    strings = []
+    for pin, index in ((15, 0), (16, 0x1000)):
+        ws2812 = SerialWombatWS2812.SerialWombatWS2812(sw)
+        ws2812.begin(pin, 150, index)
+        strings.append(ws2812)
+    return strings
+
+def _ws2812WriteArray(sw, strings):
+    colors = _colors(300)
+    strings[0].writearray(0, 150, colors[:150])
+    return strings[1].writearray(0, 150, colors[150:])
+
+def _vgaSetup(sw):
+    vga = SerialWombat18ABVGA.SerialWombat18ABVGA(sw)
+    vga.begin(18, 0)
+    return vga
+
+def _vgaFillRect(sw, vga):
+    return vga.fillRect(10, 10, 100, 80, 1)
+
+def _vgaPixels(sw, vga):
+    for x in range(160):
+        vga.writePixel(x, x * 3 // 4, 1)
+
+def _writeUserBuffer(sw, context):
+    return sw.writeUserBuffer(0, _payload(4096), 4096)
+
+def _readUserBufferSetup(sw):
+    sw.writeUserBuffer(0, _payload(4096), 4096)
+    return None
+
+def _readUserBuffer(sw, context):
+    return sw.readUserBuffer(0, 4096)
+
+def _spiSetup(sw):
+    spi = SerialWombatSPI.SerialWombatSPI(sw)
+    spi.begin(5, 0, 6, 7, 8)
+    return spi
+
+def _spiTransferBuffer(sw, spi):
+    inBuffer = bytearray(256)
+    return spi.transferBuffer(_payload(256), inBuffer, 256)
+
+def _readPublicData(sw, context):
+    for pin in range(20):
+        sw.readPublicData(pin)
+
+def _readPublicDataMany(sw, context):
+    sw.readPublicDataMany(range(20))
+
+def _none(sw):
+    return None
+
+BENCHMARKS = [
+    ("SerialWombatQueue.readBytes(1024)", _queueSetup, _queueRead),
+    ("SerialWombatQueue.writeBuffer(1024)", _queueWriteSetup, _queueWrite),
+    ("SerialWombatUART.write(1024)", _uartSetup, _uartWrite),
+    ("SerialWombatUART.readBytes(128)", _uartReadSetup, _uartRead),
+    ("SerialWombatWS2812.writearray(300 LEDs)", _ws2812Setup, _ws2812WriteArray),
+    ("SerialWombat18ABVGA.fillRect(100x80)", _vgaSetup, _vgaFillRect),
+    ("SerialWombat18ABVGA.writePixel x160", _vgaSetup, _vgaPixels),
+    ("SerialWombatChip.writeUserBuffer(4096)", _none, _writeUserBuffer),
+    ("SerialWombatChip.readUserBuffer(4096)", _readUserBufferSetup, _readUserBuffer),
+    ("SerialWombatSPI.transferBuffer(256)", _spiSetup, _spiTransferBuffer),
+    ("SerialWombatChip.readPublicData x20 pins", _none, _readPublicData),
+    ("SerialWombatChip.readPublicDataMany(20 pins)", _none, _readPublicDataMany),
+]
+
+
+"""!
+@brief Run the benchmarks
+@param chipFactory A function returning a ready to use SerialWombatChip.  Called once per benchmark.
+@param repeat Number of times each operation is run.  Reported numbers are per operation.
+@param only Optional list of substrings.  Only benchmarks whose names contain one of them are run.
+@return A dictionary of results keyed by benchmark name
+"""
+def runBenchmarks(chipFactory, repeat = 5, only = None):
+    results = {}
+    for name, setup, operation in BENCHMARKS:
+        if (only and not any(o in name for o in only)):
+            continue
+        sw = chipFactory()
+        counter = PacketCounter()
+        counter.attach(sw)
+        elapsed = 0.0
+        for i in range(repeat):
+            context = setup(sw)
+            counter.reset()
+            start = time.perf_counter()
+            operation(sw, context)
+            elapsed += time.perf_counter() - start
+        # Packet counts are taken from the last run; they are the same every run on the virtual chip
+        results[name] = {
+            "seconds": elapsed / repeat,
+            "packets": counter.packets,
+            "transactions": counter.transactions,
+            "bytesOut": counter.bytesOut,
+            "bytesIn": counter.bytesIn,
+        }
+    return results
+
+
+"""!
+@brief Print the differences between two result sets
+@return True if any benchmark sends more packets or transactions than in the baseline
+"""
+def compareResults(baseline, current):
+    regressed = False
+    print("%-42s %14s %14s %20s" % ("benchmark", "packets", "transactions", "time"))
+    for name, new in current.items():
+        old = baseline.get(name)
+        if (old is None):
+            print("%-42s %14s %14s %20s" % (name, new["packets"], new["transactions"], "(new)"))
+            continue
+        if (new["packets"] > old["packets"] or new["transactions"] > old["transactions"]):
+            regressed = True
+        ratio = new["seconds"] / old["seconds"] if old["seconds"] > 0 else 0
+        print("%-42s %6d -> %-5d %6d -> %-5d %9.3fms (x%.2f)" % (name, old["packets"], new["packets"],
+              old["transactions"], new["transactions"], new["seconds"] * 1000, ratio))
+    return regressed
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Serial Wombat driver benchmark")
+    parser.add_argument("--output", help = "write results to this JSON file")
+    parser.add_argument("--compare", help = "compare results against this JSON baseline")
+    parser.add_argument("--repeat", type = int, default = 5)
+    parser.add_argument("--latency-us", type = float, default = 0, help = "virtual chip per-transaction latency")
+    parser.add_argument("--bps", type = int, default = 0, help = "virtual chip bus bit rate")
+    parser.add_argument("--only", action = "append", help = "run only benchmarks containing this text")
+    args = parser.parse_args(argv)
+
+    def chipFactory():
+        sw = SerialWombatVirtualChip.SerialWombatVirtualChip()
+        sw.setLatency(args.latency_us, args.bps)
+        return sw
+
+    results = runBenchmarks(chipFactory, args.repeat, args.only)
+    report = {
+        "python": platform.python_implementation() + " " + platform.python_version(),
+        "transport": {"latency_us": args.latency_us, "bps": args.bps},
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    for name, r in results.items():
+        print("%-42s %9.3fms %6d packets %6d transactions %7d bytes" % (name, r["seconds"] * 1000,
+              r["packets"], r["transactions"], r["bytesOut"] + r["bytesIn"]))
+
+    if (args.output):
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent = 2, sort_keys = True)
+
+    if (args.compare):
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        if (compareResults(baseline["results"], results)):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,10 @@ millisStart = supervisor.ticks_ms()
 def millis():
     return(int((supervisor.ticks_ms() - millisStart)))
 
+microsStart = time.monotonic_ns()
+def micros():
+    return((time.monotonic_ns() - microsStart) // 1000)
+
 def delay(delayMs):
     time.sleep(delayMs / 1000)
     
@@ -13,10 +13,18 @@ SW_SDA_PIN = board.SDA
 
 class SerialWombatChip_cp_i2c(SerialWombat.SerialWombatChip):
     i2c  = 0
-    def __init__(self,address,i2cPort):
+    def __init__(self,address,i2cPort,busName = None):
         super().__init__()
         self.i2c = i2cPort
         self.address = address
+        # Names the bus in the identity cache, e.g. "SCL1/SDA1".  busio.I2C objects don't describe their pins.
+        self.busName = busName
+
+    def identityKey(self):
+        busName = self.busName
+        if (busName is None):
+            busName = id(self.i2c)  # Unique, but changes between runs
+        return "%s:%s:%s" % (type(self).__name__, busName, self.address)
 
 
 
@@ -1,15 +1,72 @@
 import time
 
-millisStart = time.time()
+"""
+Timing functions for cPython.
+
+Time is measured with time.monotonic_ns so it is not affected by changes to the wall clock.
+Delays are carried out by a timing backend.  The default HybridSleepClock sleeps for most of the
+interval and only spins for the last part, so a host waiting on Serial Wombat chips uses almost no
+CPU while keeping sub-millisecond delays accurate.  Call setTimingBackend() to use a different
+backend, for instance SpinClock() to get the old busy-wait behavior.
+"""
+
+class HybridSleepClock():
+    """
+    Sleeps until spinThreshold_ns before the deadline, then spins on time.monotonic_ns.
+    spinThreshold_ns should be a bit more than the operating system's sleep overshoot.
+    """
+    def __init__(self, spinThreshold_ns = 500000):
+        self.spinThreshold_ns = spinThreshold_ns
+
+    def sleepUntil_ns(self, deadline_ns):
+        remaining = deadline_ns - time.monotonic_ns()
+        if (remaining > self.spinThreshold_ns):
+            time.sleep((remaining - self.spinThreshold_ns) / 1000000000)
+        while (time.monotonic_ns() < deadline_ns):
+            continue
+
+    def sleep_ns(self, interval_ns):
+        if (interval_ns <= 0):
+            time.sleep(0)  # Yield to other threads, like delay(0) on Arduino
+            return
+        self.sleepUntil_ns(time.monotonic_ns() + interval_ns)
+
+
+class SleepClock(HybridSleepClock):
+    """
+    Never spins.  Lowest CPU use, but delays may overshoot by the operating system's timer granularity.
+    """
+    def __init__(self):
+        HybridSleepClock.__init__(self, 0)
+
+
+class SpinClock(HybridSleepClock):
+    """
+    Always spins.  Most precise, but uses a full core while waiting.
+    """
+    def __init__(self):
+        HybridSleepClock.__init__(self, 1 << 62)
+
+
+_timingBackend = HybridSleepClock()
+
+def setTimingBackend(backend):
+    global _timingBackend
+    _timingBackend = backend
+
+def getTimingBackend():
+    return _timingBackend
+
+
+millisStart = time.monotonic_ns()
 def millis():
-    return(int((time.time() - millisStart) * 1000))
+    return((time.monotonic_ns() - millisStart) // 1000000)
+
+def micros():
+    return((time.monotonic_ns() - millisStart) // 1000)
 
 def delay(delayMs):
-    startTime = millis()
-    while (millis() < startTime + delayMs):
-        continue
+    _timingBackend.sleep_ns(int(delayMs * 1000000))
 
 def delayMicroseconds(delayUs):
-    startTime = time.time()
-    while (time.time() < startTime + delayUs):
-        continue
+    _timingBackend.sleep_ns(int(delayUs * 1000))
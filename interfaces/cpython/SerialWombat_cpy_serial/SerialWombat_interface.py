@@ -1,5 +1,4 @@
 import SerialWombat
-from ArduinoFunctions import delay
 import time
 import serial
 
@@ -8,56 +7,105 @@ import serial
 ################################################
 
 sw_com_port = setYourComPortHere # example "COM6"
-ser = serial.Serial(sw_com_port,115200,timeout=0)
+
+# Seconds to wait for a chip's 8 byte response before giving up
+SW_RESPONSE_TIMEOUT = 0.05
+
+ser = serial.Serial(sw_com_port,115200,timeout=SW_RESPONSE_TIMEOUT)
 
 
 class SerialWombatChip_cpy_serial(SerialWombat.SerialWombatChip):
     ser = 0
-    def __init__(self,serialPortName,address = 0):
+    def __init__(self,serialPort,address = 0):
             SerialWombat.SerialWombatChip.__init__(self)
             self.address = address
-            self.ser = serial.Serial(serialPortName,115200,timeout=0)
+            self.responseTimeout = SW_RESPONSE_TIMEOUT
+            self.resyncEveryPacket = False
+            self._needsResync = True
+            if (isinstance(serialPort,str)):
+                self.ser = serial.Serial(serialPort,115200,timeout=self.responseTimeout)
+            else:
+                self.ser = serialPort
+                self.ser.timeout = self.responseTimeout
+
+    """
+    Sends the 0x55 resync sequence and discards anything left in the receive buffer, but only
+    when the link may be out of sync: before the first packet, after a timeout, after a response
+    whose first byte doesn't echo the command, or after a packet that gets no response.
+    Set resyncEveryPacket to True to resync before every packet as earlier versions did.
+    """
+    def _resyncIfNeeded(self):
+        if (self._needsResync or self.resyncEveryPacket):
+            clear = [0x55,0x55,0x55,0x55,0x55,0x55,0x55,0x55]
+            self.ser.write(clear)
+            self.ser.flush()
+            self.ser.reset_input_buffer()
+            self._needsResync = False
+
+    def identityKey(self):
+        return "%s:%s:%s" % (type(self).__name__, getattr(self.ser, "port", ""), self.address)
+
+    def _checkFraming(self, tx, rx):
+        if (len(rx) < 8 or (rx[0] != tx[0] and rx[0] != ord('E'))):
+            self._needsResync = True
 
+    """
+    Read size bytes.  The port's read timeout makes pyserial block on the file descriptor
+    until the last byte arrives, so this returns as soon as the response is complete.
+    Gives up responseTimeout seconds per expected packet after the call.
+    """
+    def _readResponse(self, size):
+        deadline = time.monotonic() + self.responseTimeout * (size // 8)
+        rx = self.ser.read(size)
+        while (len(rx) < size and time.monotonic() < deadline):
+            rx += self.ser.read(size - len(rx))
+        return rx
 
     def sendReceivePacketHardware (self,tx):
         try:
-            clear = [0x55,0x55,0x55,0x55,0x55,0x55,0x55,0x55]
-            self.ser.write(clear)
-            while(self.ser.out_waiting > 0):
-                pass
-            rx = self.ser.read(size=8) 
-            while (len(rx) > 0):
-                rx = self.ser.read(size = 1)
-            
+            self._resyncIfNeeded()
             self.ser.write(tx)
-            rx = self.ser.read(size=8) 
-            delaycount = 0
-            while (len(rx) < 8 and delaycount < 25):
-                newBytes = self.ser.read(size = 8 - len(rx))
-                if (len(newBytes) > 0):
-                    rx += newBytes
-                delay(2)
-                delaycount +=1
-            return 8,rx  #TODO add error check, size check
+            rx = self._readResponse(8)
+            self._checkFraming(tx, rx)
+            if (len(rx) < 8):
+                return -48,bytes("E00048UU",'utf-8')
+            return 8,rx
 
         except OSError:
+            self._needsResync = True
             return -48,bytes("E00048UU",'utf-8')
 
+    # Packets written back to back before reading responses.  Keeps the chip's UART receive buffer from overflowing.
+    maxPacketsPerTransfer = 8
+
+    def sendReceivePacketsHardware (self,txList):
+        responses = []
+        for start in range(0, len(txList), self.maxPacketsPerTransfer):
+            chunk = txList[start:start + self.maxPacketsPerTransfer]
+            try:
+                self._resyncIfNeeded()
+                self.ser.write(b''.join([bytes(tx) for tx in chunk]))
+                rx = self._readResponse(8 * len(chunk))
+            except OSError:
+                rx = b''
+            for i in range(len(chunk)):
+                self._checkFraming(chunk[i], rx[8 * i:8 * (i + 1)])
+                if (len(rx) >= 8 * (i + 1)):
+                    responses.append((8,rx[8 * i:8 * (i + 1)]))
+                else:
+                    responses.append((-48,bytes("E00048UU",'utf-8')))
+        return responses
+
     def sendPacketToHardware(self,tx):
         try:
-            clear = [0x55,0x55,0x55,0x55,0x55,0x55,0x55,0x55]
-            self.ser.write(clear)
-            while(self.ser.out_waiting > 0):
-                pass
-            rx = self.ser.read(size=8) 
-            while (len(rx) > 0):
-                rx = self.ser.read(size = 1)
-            
+            self._resyncIfNeeded()
             self.ser.write(tx)
+            self._needsResync = True
             return (8,bytes("E00048UU",'utf-8'))
 
         except OSError:
+            self._needsResync = True
             return -48,bytes("E00048UU",'utf-8')
 
 def SerialWombatChipInstance(address):
-    return SerialWombatChip_cpy_serial(ser,address)
\ No newline at end of file
+    return SerialWombatChip_cpy_serial(ser,address)
@@ -1,7 +1,5 @@
-from tkinter import SW
-
 import SerialWombat
-from ArduinoFunctions import delay
+from SerialWombatBus import SerialWombatBus
 import time
 import serial
 import sys
@@ -12,6 +10,9 @@ import sys
 ################################################
 SW_SERIAL_PORT = "COM6"
 
+# Seconds to wait for a chip's 8 byte response before giving up
+SW_RESPONSE_TIMEOUT = 0.05
+
 
 
 class SerialWombatChip_cpy_serial_addressed(SerialWombat.SerialWombatChip):
@@ -20,65 +21,102 @@ class SerialWombatChip_cpy_serial_addressed(SerialWombat.SerialWombatChip):
             SerialWombat.SerialWombatChip.__init__(self)
             self.address = address
             self.ser = openedSerialPort
+            self.responseTimeout = SW_RESPONSE_TIMEOUT
+            self.resyncEveryPacket = False
+            self._needsResync = True
+            self.ser.timeout = self.responseTimeout
 
-    def sendReceivePacketHardware (self,tx):
-        try:
+    """
+    Sends the 0x55 resync sequence and discards anything left in the receive buffer, but only
+    when the link may be out of sync: before the first packet, after a timeout, after a response
+    whose first byte doesn't echo the command, or after a packet that gets no response.
+    Set resyncEveryPacket to True to resync before every packet as earlier versions did.
+    """
+    def _resyncIfNeeded(self):
+        if (self._needsResync or self.resyncEveryPacket):
             clear = [0x55,0x55,0x55,0x55,0x55,0x55,0x55,0x55]
             self.ser.write(clear)
-            while(self.ser.out_waiting > 0):
-                pass
-            rx = self.ser.read(size=8) 
-            while (len(rx) > 0):
-                rx = self.ser.read(size = 1)
-            
-            self.ser.write([self.address])  
-            self.ser.write(tx)
-            while(self.ser.out_waiting > 0):
-                pass
-            rx = self.ser.read(size=8) 
-            delaycount = 0
-            while (len(rx) < 8 and delaycount < 25):
-                newBytes = self.ser.read(size = 8 - len(rx))
-                if (len(newBytes) > 0):
-                    rx += newBytes
-                delay(2)
-                delaycount +=1
+            self.ser.flush()
+            self.ser.reset_input_buffer()
+            self._needsResync = False
+
+    def identityKey(self):
+        return "%s:%s:%s" % (type(self).__name__, getattr(self.ser, "port", ""), self.address)
+
+    def _checkFraming(self, tx, rx):
+        if (len(rx) < 8 or (rx[0] != tx[0] and rx[0] != ord('E'))):
+            self._needsResync = True
+
+    """
+    Read size bytes.  The port's read timeout makes pyserial block on the file descriptor
+    until the last byte arrives, so this returns as soon as the response is complete.
+    Gives up responseTimeout seconds per expected packet after the call.
+    """
+    def _readResponse(self, size):
+        deadline = time.monotonic() + self.responseTimeout * (size // 8)
+        rx = self.ser.read(size)
+        while (len(rx) < size and time.monotonic() < deadline):
+            rx += self.ser.read(size - len(rx))
+        return rx
+
+    def sendReceivePacketHardware (self,tx):
+        try:
+            self._resyncIfNeeded()
+            self.ser.write(bytes([self.address]) + bytes(tx))
+            rx = self._readResponse(8)
+            self._checkFraming(tx, rx)
             if (len(rx) < 8):
                 return -48,bytes("E00048UU",'utf-8')
-            return 8,rx  #TODO add error check, size check
+            return 8,rx  #TODO add error check
 
         except OSError:
+            self._needsResync = True
             return -48,bytes("E00048UU",'utf-8')
 
+    # Packets written back to back before reading responses.  Keeps the bridge's receive buffer from overflowing.
+    maxPacketsPerTransfer = 8
+
+    def sendReceivePacketsHardware (self,txList):
+        responses = []
+        for start in range(0, len(txList), self.maxPacketsPerTransfer):
+            chunk = txList[start:start + self.maxPacketsPerTransfer]
+            try:
+                self._resyncIfNeeded()
+                self.ser.write(b''.join([bytes([self.address]) + bytes(tx) for tx in chunk]))
+                rx = self._readResponse(8 * len(chunk))
+            except OSError:
+                rx = b''
+            for i in range(len(chunk)):
+                self._checkFraming(chunk[i], rx[8 * i:8 * (i + 1)])
+                if (len(rx) >= 8 * (i + 1)):
+                    responses.append((8,rx[8 * i:8 * (i + 1)]))
+                else:
+                    responses.append((-48,bytes("E00048UU",'utf-8')))
+        return responses
+
     def sendPacketToHardware(self,tx):
         try:
-            clear = [0x55,0x55,0x55,0x55,0x55,0x55,0x55,0x55]
-            self.ser.write(clear)
-            while(self.ser.out_waiting > 0):
-                pass
-            rx = self.ser.read(size=8) 
-            while (len(rx) > 0):
-                rx = self.ser.read(size = 1)
-            
-           
-            self.ser.write([self.address])  #this is for I2C Bridge when using an arduino or Micropython to do UART to I2C conversion.  
-            self.ser.write(tx)
+            self._resyncIfNeeded()
+            #The address byte is for the I2C Bridge when using an arduino or Micropython to do UART to I2C conversion.
+            self.ser.write(bytes([self.address]) + bytes(tx))
+            self._needsResync = True
             return (8,bytes("E00048UU",'utf-8'))
 
         except OSError:
+            self._needsResync = True
             return -48,bytes("E00048UU",'utf-8')
 
 
 
 def SerialWombatChipInstance(address):
-    ser = serial.Serial(SW_SERIAL_PORT,115200,timeout=0)
+    ser = serial.Serial(SW_SERIAL_PORT,115200,timeout=SW_RESPONSE_TIMEOUT)
     if (isinstance(address,list)):
+        # The chips share one bus, so their transactions are serialized by a SerialWombatBus
+        bus = SerialWombatBus()
         swcs = []
         for address_i in address:
-            swcs.append(SerialWombatChip_cpy_serial_addressed(ser,address_i))
+            swcs.append(bus.attach(SerialWombatChip_cpy_serial_addressed(ser,address_i)))
         return swcs
-            
+
     else:
         return SerialWombatChip_cpy_serial_addressed(ser,address)
-
-
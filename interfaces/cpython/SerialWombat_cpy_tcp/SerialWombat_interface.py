@@ -0,0 +1,164 @@
+import SerialWombat
+import socket
+import time
+from ArduinoFunctions import millis
+
+
+################################################
+#CONFIGURE HERE:
+################################################
+SW_BRIDGE_HOST = "192.168.1.50"
+SW_BRIDGE_PORT = 4000
+
+# Seconds to wait for a chip's 8 byte response before giving up
+SW_RESPONSE_TIMEOUT = 0.5
+
+# True if the bridge takes an address byte before each packet.  The tcp_i2c_bridge doesn't.
+SW_BRIDGE_ADDRESSED = False
+
+
+
+class SerialWombatChip_tcp(SerialWombat.SerialWombatChip):
+    """
+    Talks to a Serial Wombat chip through a TCP bridge such as examples/Bridges/tcp_i2c_bridge.
+
+    The connection is kept open between packets and TCP_NODELAY is set so each packet is sent
+    at once.  sendReceivePacketsHardware() writes up to maxPacketsInFlight packets before
+    reading their responses, so a batch costs one network round trip rather than one per packet.
+
+    The tcp_i2c_bridge takes plain 8 byte packets for the one chip it is configured for.  Set
+    addressed to True for bridges that take an address byte before each packet, like the
+    addressed serial bridges, so several chips can share one bridge.
+
+    If the connection fails, packets return error 48 and the connection is dropped.  It is
+    reopened by a later packet, waiting reconnectDelay_mS after a failed attempt.  The delay
+    doubles with each failure up to maxReconnectDelay_mS.
+    """
+    def __init__(self, host, port = SW_BRIDGE_PORT, address = 0x6B, addressed = False):
+        SerialWombat.SerialWombatChip.__init__(self)
+        self.host = host
+        self.port = port
+        self.address = address
+        self.addressed = addressed
+        self.responseTimeout = SW_RESPONSE_TIMEOUT
+        self.connectTimeout = 2.0
+        self.maxPacketsInFlight = 64
+        self.minReconnectDelay_mS = 100
+        self.maxReconnectDelay_mS = 10000
+        self.reconnectDelay_mS = self.minReconnectDelay_mS
+        self.sock = None
+        self._nextConnectTime = 0
+        self._discard = 0
+
+    def identityKey(self):
+        return "%s:%s:%s:%s" % (type(self).__name__, self.host, self.port, self.address)
+
+    def _connect(self):
+        if (self.sock is not None):
+            return True
+        if (millis() < self._nextConnectTime):
+            return False
+        try:
+            sock = socket.create_connection((self.host, self.port), self.connectTimeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.settimeout(self.responseTimeout)
+        except OSError:
+            self._nextConnectTime = millis() + self.reconnectDelay_mS
+            self.reconnectDelay_mS = min(self.maxReconnectDelay_mS, self.reconnectDelay_mS * 2)
+            return False
+        self.sock = sock
+        self._discard = 0
+        self.reconnectDelay_mS = self.minReconnectDelay_mS
+        return True
+
+    """
+    Close the connection.  The next packet reopens it.
+    """
+    def disconnect(self):
+        if (self.sock is not None):
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def _frame(self, tx):
+        if (self.addressed):
+            return bytes([self.address]) + bytes(tx)
+        return bytes(tx)
+
+    # The tcp_i2c_bridge skips ' ' and 'U' bytes between packets, so it doesn't answer resync packets
+    def _expectsResponse(self, tx):
+        return (self.addressed or (tx[0] != 0x20 and tx[0] != 0x55))
+
+    def _receive(self, size):
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while (received < size):
+            count = self.sock.recv_into(view[received:])
+            if (count == 0):
+                raise OSError("bridge closed the connection")
+            received += count
+        return buffer
+
+    # Send packets and read one response per packet.  Raises OSError on failure.
+    def _transfer(self, txList):
+        self.sock.sendall(b''.join([self._frame(tx) for tx in txList]))
+        if (self._discard > 0):
+            # Responses to packets sent with sendPacketToHardware
+            self._receive(self._discard)
+            self._discard = 0
+        return self._receive(8 * len(txList))
+
+    def sendReceivePacketHardware (self,tx):
+        if (not self._connect()):
+            return -48,bytes("E00048UU",'utf-8')
+        try:
+            rx = self._transfer([tx])
+            return 8,bytes(rx)
+        except OSError:
+            self.disconnect()
+            return -48,bytes("E00048UU",'utf-8')
+
+    def sendReceivePacketsHardware (self,txList):
+        responses = []
+        for start in range(0, len(txList), self.maxPacketsInFlight):
+            chunk = txList[start:start + self.maxPacketsInFlight]
+            rx = b''
+            if (self._connect()):
+                try:
+                    rx = self._transfer(chunk)
+                except OSError:
+                    self.disconnect()
+            for i in range(len(chunk)):
+                if (len(rx) >= 8 * (i + 1)):
+                    responses.append((8,bytes(rx[8 * i:8 * (i + 1)])))
+                else:
+                    responses.append((-48,bytes("E00048UU",'utf-8')))
+        return responses
+
+    def sendPacketToHardware(self,tx):
+        if (not self._connect()):
+            return -48,bytes("E00048UU",'utf-8')
+        try:
+            self.sock.sendall(self._frame(tx))
+            if (self._expectsResponse(tx)):
+                # The response is read and dropped before the next one
+                self._discard += 8
+            return (8,bytes("E00048UU",'utf-8'))
+        except OSError:
+            self.disconnect()
+            return -48,bytes("E00048UU",'utf-8')
+
+
+
+def SerialWombatChipInstance(address, addressed = SW_BRIDGE_ADDRESSED):
+    if (isinstance(address,list)):
+        swcs = []
+        for address_i in address:
+            swcs.append(SerialWombatChip_tcp(SW_BRIDGE_HOST,SW_BRIDGE_PORT,address_i,addressed))
+        return swcs
+
+    else:
+        return SerialWombatChip_tcp(SW_BRIDGE_HOST,SW_BRIDGE_PORT,address,addressed)
@@ -0,0 +1,105 @@
+import asyncio
+import argparse
+import SerialWombat
+
+
+class SerialWombatTcpBridgeServer():
+    """
+    An asyncio TCP bridge that forwards packets to SerialWombatChip instances in this process.
+
+    It speaks the same protocol as examples/Bridges/tcp_i2c_bridge, so SerialWombatChip_tcp can
+    be tested without a network bridge or chip, for instance in front of SerialWombatVirtualChip:
+    8 byte packets, each answered with the chip's 8 byte response, with ' ' and 'U' bytes between
+    packets ignored.  If addressed is True, each packet is preceded by the address of the chip
+    it is for instead, and chips is a dictionary of chips keyed by address.
+
+    All complete packets received together are processed before their responses are sent back
+    in one write, so pipelined requests are answered in one round trip.
+    """
+    def __init__(self, chips, addressed = False):
+        self.chips = chips
+        self.addressed = addressed
+        self.packetsForwarded = 0
+        self._server = None
+
+    def _respond(self, address, tx):
+        chip = self.chips
+        if (self.addressed):
+            chip = self.chips.get(address)
+            if (chip is None):
+                return bytes("E00048UU",'utf-8')
+        self.packetsForwarded += 1
+        result, rx = chip.sendReceivePacketHardware(tx)
+        return bytes(rx)
+
+    async def _handle(self, reader, writer):
+        frameSize = 8
+        if (self.addressed):
+            frameSize = 9
+        pending = bytearray()
+        try:
+            while (True):
+                data = await reader.read(4096)
+                if (len(data) == 0):
+                    break
+                responses = bytearray()
+                for c in data:
+                    if (len(pending) == 0 and not self.addressed and (c == 0x20 or c == 0x55)):
+                        continue
+                    pending.append(c)
+                    if (len(pending) == frameSize):
+                        if (self.addressed):
+                            responses += self._respond(pending[0], pending[1:])
+                        else:
+                            responses += self._respond(None, pending)
+                        pending = bytearray()
+                if (len(responses) > 0):
+                    writer.write(responses)
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host = "127.0.0.1", port = 4000):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server
+
+    """
+    The port the server is listening on.  Useful after starting on port 0.
+    """
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self, host = "127.0.0.1", port = 4000):
+        await self.start(host, port)
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        if (self._server is not None):
+            self._server.close()
+
+
+def main():
+    import SerialWombatVirtualChip
+    parser = argparse.ArgumentParser(description = "TCP bridge in front of simulated Serial Wombat chips")
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = 4000)
+    parser.add_argument("--model", default = "S18B", help = "Model of the simulated chips, e.g. S18B, S08B or S04B")
+    parser.add_argument("--addresses", default = "", help = "Comma separated chip addresses.  Serves the addressed protocol if given.")
+    args = parser.parse_args()
+    if (args.addresses):
+        chips = {}
+        for address in args.addresses.split(","):
+            address = int(address, 0)
+            chips[address] = SerialWombatVirtualChip.SerialWombatVirtualChip(address, args.model)
+        server = SerialWombatTcpBridgeServer(chips, True)
+    else:
+        server = SerialWombatTcpBridgeServer(SerialWombatVirtualChip.SerialWombatVirtualChip(model = args.model))
+    print("Serving simulated Serial Wombat chips on %s:%d" % (args.host, args.port))
+    asyncio.run(server.serve_forever(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
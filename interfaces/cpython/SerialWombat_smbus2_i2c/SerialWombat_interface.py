@@ -1,5 +1,7 @@
 import SerialWombat
+from SerialWombatBus import SerialWombatBus
 import time
+import os
 from smbus2 import SMBus, i2c_msg
 
 
@@ -16,6 +18,14 @@ class SerialWombatChip_smbus2_i2c(SerialWombat.SerialWombatChip):
         self.i2c = i2c
         self.address = address
 
+    def identityKey(self):
+        # The device path, e.g. /dev/i2c-1, identifies the bus across runs
+        try:
+            bus = os.readlink("/proc/self/fd/%d" % self.i2c.fd)
+        except (OSError, AttributeError, TypeError):
+            bus = id(self.i2c)
+        return "%s:%s:%s" % (type(self).__name__, bus, self.address)
+
 
 
 
@@ -31,10 +41,34 @@ class SerialWombatChip_smbus2_i2c(SerialWombat.SerialWombatChip):
             
             if (len(rx) < 8 ):
                 return (-len(rx))
-            return 8,list(rx)  
+            return 8,bytes(rx)
         except OSError:
             return -48,bytes("E00048UU",'utf-8')
 
+    # The kernel limits an I2C_RDWR ioctl to 42 messages, i.e. 21 write/read pairs
+    maxPacketsPerTransfer = 21
+
+    def sendReceivePacketsHardware (self,txList):
+        responses = []
+        for start in range(0, len(txList), self.maxPacketsPerTransfer):
+            chunk = txList[start:start + self.maxPacketsPerTransfer]
+            msgs = []
+            reads = []
+            for tx in chunk:
+                rx = i2c_msg.read(self.address,8)
+                msgs.append(i2c_msg.write(self.address,bytearray(tx)))
+                msgs.append(rx)
+                reads.append(rx)
+            try:
+                self.i2c.i2c_rdwr(*msgs)
+            except OSError:
+                for tx in chunk:
+                    responses.append((-48,bytes("E00048UU",'utf-8')))
+                continue
+            for rx in reads:
+                responses.append((8,bytes(rx)))
+        return responses
+
     def sendPacketToHardware (self,tx):
         try:
             if (isinstance(tx,list)):
@@ -50,10 +84,12 @@ class SerialWombatChip_smbus2_i2c(SerialWombat.SerialWombatChip):
 
 def SerialWombatChipInstance(address):
     swi2cbus = SMBus(I2C_BUS)
-   if (isinstance(address,list)):
+    if (isinstance(address,list)):
+        # The chips share one bus, so their transactions are serialized by a SerialWombatBus
+        bus = SerialWombatBus()
         swcs = []
         for address_i in address:
-            swcs.append(SerialWombatChip_smbus2_i2c(swi2cbus,address_i))
+            swcs.append(bus.attach(SerialWombatChip_smbus2_i2c(swi2cbus,address_i)))
         return swcs
             
     else:
@@ -4,6 +4,10 @@ millisStart = time.ticks_ms()
 def millis():
     return(int((time.ticks_ms() - millisStart)))
 
+microsStart = time.ticks_us()
+def micros():
+    return(time.ticks_diff(time.ticks_us(), microsStart))
+
 def delay(delayMs):
     time.sleep_ms(int(delayMs))
     
@@ -16,6 +16,10 @@ class SerialWombatChipUART(SerialWombat.SerialWombatChip):
         self.ser = port
         SerialWombat.SerialWombatChip.__init__(self)
 
+    def identityKey(self):
+        # repr() of a machine.UART names the UART and its pins
+        return "%s:%s:%s" % (type(self).__name__, repr(self.ser), self.address)
+
 
     def sendReceivePacketHardware (self,tx):
         if (isinstance(tx,list)):
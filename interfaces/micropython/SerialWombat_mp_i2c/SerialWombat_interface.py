@@ -17,6 +17,10 @@ class SerialWombatChip_mp_i2c(SerialWombat.SerialWombatChip):
         self.i2c = i2c_port
         self.address = address
 
+    def identityKey(self):
+        # repr() of a machine.I2C names the bus and its pins
+        return "%s:%s:%s" % (type(self).__name__, repr(self.i2c), self.address)
+
 
 
     def sendReceivePacketHardware (self,tx):
@@ -0,0 +1,60 @@
+"""
+Tests run against SerialWombatVirtualChip, so no hardware is needed:
+
+    python -m pytest -q
+"""
+
+import os
+import sys
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _path in (_root, os.path.join(_root, "interfaces", "cpython")):
+    if (_path not in sys.path):
+        sys.path.insert(0, _path)
+
+import pytest
+import SerialWombatVirtualChip
+
+
+class FaultInjector:
+    """Wraps a chip's transport.  The next `fail` packets get a lost packet error (48), the next `garble` get a wrong echo."""
+    def __init__(self, chip):
+        self.fail = 0
+        self.garble = 0
+        self.packets = 0
+        self.transactions = 0
+        self._sendReceive = chip.sendReceivePacketHardware
+        chip.sendReceivePacketHardware = self.sendReceivePacketHardware
+        chip.sendReceivePacketsHardware = self.sendReceivePacketsHardware
+
+    def _packet(self, tx):
+        self.packets += 1
+        if (self.fail > 0):
+            self.fail -= 1
+            return -48, bytes("E00048UU", 'utf-8')
+        result, rx = self._sendReceive(tx)
+        if (self.garble > 0):
+            self.garble -= 1
+            rx = bytearray(rx)
+            rx[0] ^= 0x40
+        return result, rx
+
+    def sendReceivePacketHardware(self, tx):
+        self.transactions += 1
+        return self._packet(tx)
+
+    def sendReceivePacketsHardware(self, txList):
+        self.transactions += 1
+        return [self._packet(tx) for tx in txList]
+
+
+@pytest.fixture
+def chip():
+    sw = SerialWombatVirtualChip.SerialWombatVirtualChip()
+    sw.readVersion()
+    return sw
+
+
+@pytest.fixture
+def faults(chip):
+    return FaultInjector(chip)
@@ -0,0 +1,114 @@
+import threading
+import time
+import pytest
+import SerialWombatVirtualChip
+from SerialWombatBus import SerialWombatBus, SerialWombatPriority, PRIORITY_CONTROL, PRIORITY_TELEMETRY, PRIORITY_BULK
+
+
+def waitFor(condition):
+    deadline = time.time() + 5
+    while (not condition()):
+        assert time.time() < deadline
+        time.sleep(0.001)
+
+
+def served(fairness):
+    """The order in which a telemetry chip's packet and, queued after it, a control chip's packet get the bus."""
+    bus = SerialWombatBus(fairness)
+    order = []
+    gate = threading.Event()
+    chips = {}
+    for name, priority in (("holder", PRIORITY_CONTROL), ("telemetry", PRIORITY_TELEMETRY), ("control", PRIORITY_CONTROL)):
+        chip = SerialWombatVirtualChip.SerialWombatVirtualChip()
+        original = chip.sendReceivePacketHardware
+        def hardware(tx, name = name, original = original):
+            if (name == "holder"):
+                gate.wait(5)
+            order.append(name)
+            return original(tx)
+        chip.sendReceivePacketHardware = hardware
+        chips[name] = bus.attach(chip, priority)
+
+    threads = []
+    for name, waiting in (("holder", 0), ("telemetry", 1), ("control", 2)):
+        thread = threading.Thread(target = chips[name].readPublicData, args = (1,))
+        thread.start()
+        threads.append(thread)
+        if (name == "holder"):
+            waitFor(lambda: bus._owner is not None)
+        else:
+            waitFor(lambda: len(bus._waiting) == waiting)
+    gate.set()
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def test_fifo_fairness():
+    assert served("fifo") == ["holder", "telemetry", "control"]
+
+
+def test_priority_fairness():
+    assert served("priority") == ["holder", "control", "telemetry"]
+
+
+def test_invalid_fairness():
+    with pytest.raises(ValueError):
+        SerialWombatBus("random")
+
+
+def test_transactions_do_not_overlap():
+    bus = SerialWombatBus("priority")
+    busy = [0]
+    overlaps = [0]
+    chips = []
+    for i in range(4):
+        chip = SerialWombatVirtualChip.SerialWombatVirtualChip(0x60 + i)
+        original = chip.sendReceivePacketsHardware
+        def hardware(txList, original = original):
+            busy[0] += 1
+            if (busy[0] > 1):
+                overlaps[0] += 1
+            time.sleep(0.0001)
+            responses = original(txList)
+            busy[0] -= 1
+            return responses
+        chip.sendReceivePacketsHardware = hardware
+        chips.append(bus.attach(chip, priority = i))
+
+    def work(chip):
+        for i in range(50):
+            chip.readPublicDataMany(range(6))
+    threads = [threading.Thread(target = work, args = (chip,)) for chip in chips]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlaps[0] == 0
+    for chip in chips:
+        assert bus.stats(chip).transactions == 50
+        assert bus.stats(chip).packets == 150
+
+
+def test_bulk_transfers_are_chunked():
+    bus = SerialWombatBus("priority")
+    chip = bus.attach(SerialWombatVirtualChip.SerialWombatVirtualChip())
+    with SerialWombatPriority(PRIORITY_BULK):
+        chip.readUserBuffer(0, 7 * 10)
+    assert bus.stats(chip).packets == 10
+    assert bus.stats(chip).transactions == 3
+    assert bus.classSnapshot()["bulk"]["transactions"] == 3
+
+    chip.readUserBuffer(0, 7 * 10)
+    assert bus.classSnapshot()["control"]["transactions"] == 1
+
+
+def test_priority_context_nests():
+    bus = SerialWombatBus("priority")
+    chip = bus.attach(SerialWombatVirtualChip.SerialWombatVirtualChip(), PRIORITY_TELEMETRY)
+    with SerialWombatPriority(PRIORITY_BULK):
+        with SerialWombatPriority(PRIORITY_CONTROL):
+            chip.readPublicData(1)
+        chip.readPublicData(1)
+    chip.readPublicData(1)
+    assert set(bus.classSnapshot()) == set(["control", "telemetry", "bulk"])
@@ -0,0 +1,61 @@
+import threading
+from SerialWombatPoller import SerialWombatPoller
+
+
+def test_samples_are_buffered(chip):
+    poller = SerialWombatPoller()
+    chip.publicData[2] = 1234
+    subscription = poller.subscribe(chip, 2, 1000, bufferSize = 4)
+    for i in range(6):
+        subscription.deadline = 0
+        assert poller.poll() == 1
+    assert subscription.samples == 6
+    assert subscription.available() == 4
+    assert subscription.read()[0] == 1234
+    assert subscription.available() == 3
+
+
+def test_failure_is_per_sample(chip, faults):
+    poller = SerialWombatPoller()
+    for pin in range(4):
+        chip.publicData[pin] = 100 + pin
+    subscriptions = [poller.subscribe(chip, pin, 1000) for pin in range(4)]
+    # Pins 0 and 1 share the first packet, 2 and 3 the second
+    faults.fail = 1
+    assert poller.poll() == 2
+    assert [s.errors for s in subscriptions] == [1, 1, 0, 0]
+    assert [s.value for s in subscriptions] == [0, 0, 102, 103]
+
+
+def test_errors_elsewhere_do_not_fail_samples(chip):
+    poller = SerialWombatPoller()
+    subscription = poller.subscribe(chip, 1, 1000)
+    chip.errorHandler = lambda errorCode, sw: None
+    original = chip.sendReceivePacketsHardware
+    def hardware(txList):
+        chip.sendPacket([0xFE])  # Another thread's failing packet, counted on the same chip
+        return original(txList)
+    chip.sendReceivePacketsHardware = hardware
+    assert poller.poll() == 1
+    assert subscription.errors == 0
+
+
+def test_buffer_read_from_another_thread(chip):
+    subscription = SerialWombatPoller().subscribe(chip, 1, 1000, bufferSize = 8)
+    received = []
+    done = threading.Event()
+    def reader():
+        while (not done.is_set() or subscription.available() > 0):
+            sample = subscription.read()
+            if (sample is not None):
+                received.append(sample[0])
+    thread = threading.Thread(target = reader)
+    thread.start()
+    for i in range(20000):
+        subscription._deliver(i & 0xFFFF, i)
+    done.set()
+    thread.join()
+    # Samples come out in order; some may have been overwritten before they were read
+    assert received == sorted(received)
+    assert len(received) == len(set(received))
+    assert received[-1] == 19999
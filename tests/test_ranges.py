@@ -0,0 +1,55 @@
+import pytest
+
+
+@pytest.mark.parametrize("count", [1, 4, 7, 8, 100, 1000])
+def test_readUserBuffer_round_trip(chip, count):
+    data = bytes((i * 37 + 11) & 0xFF for i in range(count))
+    chip.writeUserBuffer(0x123, data, count)
+    assert bytes(chip.userBuffer[0x123:0x123 + count]) == data
+    assert bytes(chip.readUserBuffer(0x123, count)) == data
+
+
+def test_readUserBufferInto_memoryview(chip):
+    chip.userBuffer[0:50] = bytes(range(50))
+    buffer = bytearray(60)
+    assert chip.readUserBufferInto(10, memoryview(buffer)[5:], 30) == 30
+    assert buffer[5:35] == bytes(range(10, 40))
+    assert buffer[:5] == bytes(5)
+    assert buffer[35:] == bytes(25)
+
+
+def test_readUserBuffer_batches(chip, faults):
+    chip.readUserBuffer(0, 7 * chip.rangePacketsPerBatch * 2)
+    assert faults.transactions == 2
+
+
+def test_readUserBuffer_stops_at_failure(chip, faults):
+    chip.userBuffer[0:70] = bytes(range(70))
+    original = faults._sendReceive
+    def failAtOffset35(tx):
+        if (tx[0] == 0x83 and tx[1] == 35):
+            return 8, bytearray(b"E00001UU")
+        return original(tx)
+    faults._sendReceive = failAtOffset35
+    data = chip.readUserBuffer(0, 70)
+    assert bytes(data) == bytes(range(35))
+
+
+def test_readFlashRange(chip):
+    for i in range(6):
+        chip.flash[0x2A000 + 2 * i] = 0x102030 + i
+    words = chip.readFlashRange(0x2A000, 6)
+    assert len(words) == 24
+    assert [words[4 * i] + (words[4 * i + 1] << 8) + (words[4 * i + 2] << 16) for i in range(6)] == [0x102030 + i for i in range(6)]
+
+
+def test_readFlashRange_into_and_failure(chip):
+    into = bytearray(40)
+    # Odd SW18 flash addresses are refused by the chip, so the read stops at the first word
+    assert len(chip.readFlashRange(0x2A001, 10, into)) == 0
+    assert len(chip.readFlashRange(0x2A000, 10, into)) == 40
+
+
+def test_readRamRange(chip):
+    chip.ram[0x1200:0x1210] = bytes(range(16))
+    assert bytes(chip.readRamRange(0x1200, 16)) == bytes(range(16))
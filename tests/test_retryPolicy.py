@@ -0,0 +1,90 @@
+import time
+import pytest
+from SerialWombatRetryPolicy import SerialWombatRetryPolicy
+
+
+@pytest.fixture
+def policy(chip):
+    chip.retryPolicy = SerialWombatRetryPolicy(baseDelay_uS = 10, breakerThreshold = 3, breakerCooldown_mS = 50)
+    return chip.retryPolicy
+
+
+def test_no_policy_fails_at_once(chip, faults):
+    faults.fail = 1
+    result, rx = chip.sendPacket([0x81, 3, 255, 255])
+    assert result == -48
+    assert chip.errorCount == 1
+    assert faults.packets == 1
+
+
+def test_idempotent_packet_is_retried(chip, faults, policy):
+    chip.publicData[3] = 77
+    faults.fail = 2
+    assert chip.readPublicData(3) == 77
+    assert chip.errorCount == 0
+    assert faults.packets == 3
+
+
+def test_retries_are_limited(chip, faults, policy):
+    faults.fail = 10
+    result, rx = chip.sendPacket([0x81, 3, 255, 255])
+    assert result == -48
+    assert faults.packets == policy.maxAttempts
+    assert chip.errorCount == 1
+
+
+def test_non_idempotent_packet_is_not_retried(chip, faults, policy):
+    faults.fail = 1
+    result, rx = chip.sendPacket([0x85, 1, 2, 3, 4, 5, 6, 7])
+    assert result == -48
+    assert faults.packets == 1
+
+
+def test_chip_error_is_not_retried(chip, faults, policy):
+    result, rx = chip.sendPacket([0xFE])
+    assert result < 0 and result != -48
+    assert faults.packets == 1
+
+
+def test_batched_packet_is_resent(chip, faults, policy):
+    chip.publicData[3] = 77
+    faults.fail = 1
+    assert list(chip.readPublicDataMany([3, 3, 3, 3])) == [77, 77, 77, 77]
+    assert chip.errorCount == 0
+
+
+def test_circuit_breaker(chip, faults, policy):
+    chip.publicData[3] = 77
+    faults.fail = 1000
+    for i in range(policy.breakerThreshold):
+        chip.readPublicData(3)
+    assert policy.isOpen(chip)
+
+    # While open, nothing reaches the transport
+    sent = faults.packets
+    result, rx = chip.sendPacket([0x81, 3, 255, 255])
+    assert result == -48
+    assert chip.sendPackets([[0x81, 3]])[0][0] == -48
+    assert faults.packets == sent
+
+    # After the cooldown one packet is let through, and its success closes the breaker
+    time.sleep(policy.breakerCooldown_mS / 1000 + 0.01)
+    faults.fail = 0
+    assert chip.readPublicData(3) == 77
+    assert not policy.isOpen(chip)
+
+
+def test_failed_trial_reopens_breaker(chip, faults, policy):
+    faults.fail = 1000
+    for i in range(policy.breakerThreshold):
+        chip.readPublicData(3)
+    time.sleep(policy.breakerCooldown_mS / 1000 + 0.01)
+    sent = faults.packets
+    chip.readPublicData(3)
+    assert faults.packets > sent
+    assert policy.isOpen(chip)
+
+
+def test_backoff_is_bounded(policy):
+    for attempt in range(1, 20):
+        assert 0 <= policy.backoff_uS(attempt) <= policy.maxDelay_uS
@@ -0,0 +1,93 @@
+import SerialWombatErrors
+from SerialWombat import SerialWombatCommands
+
+
+def readPacket(pin):
+    return [SerialWombatCommands.COMMAND_BINARY_READ_PIN_BUFFFER, pin, 255, 255]
+
+
+def test_batch_is_one_transaction(chip, faults):
+    for pin in range(6):
+        chip.publicData[pin] = 1000 + pin
+    results = chip.sendPackets([readPacket(pin) for pin in range(6)])
+    assert faults.transactions == 1
+    assert [result for result, rx in results] == [8] * 6
+    assert [rx[2] + 256 * rx[3] for result, rx in results] == [1000 + pin for pin in range(6)]
+
+
+def test_empty_batch(chip, faults):
+    assert chip.sendPackets([]) == []
+    assert faults.transactions == 0
+
+
+def test_short_packets_are_padded(chip):
+    result, rx = chip.sendPackets([[SerialWombatCommands.CMD_ECHO, 1, 2]])[0]
+    assert result == 8
+    assert bytes(rx) == bytes([SerialWombatCommands.CMD_ECHO, 1, 2, 0x55, 0x55, 0x55, 0x55, 0x55])
+
+
+def test_error_response_is_recorded(chip):
+    handled = []
+    chip.errorHandler = lambda errorCode, sw: handled.append(errorCode)
+    results = chip.sendPackets([readPacket(1), [0xFE], readPacket(2)])
+    assert [result for result, rx in results] == [8, -SerialWombatErrors.SW_ERROR_INVALID_COMMAND, 8]
+    assert chip.errorCount == 1
+    assert chip.lastErrorCode == SerialWombatErrors.SW_ERROR_INVALID_COMMAND
+    assert handled == [SerialWombatErrors.SW_ERROR_INVALID_COMMAND]
+
+
+def test_countErrors_false(chip):
+    result, rx = chip.sendPackets([[0xFE]], countErrors = False)[0]
+    assert result < 0
+    assert chip.errorCount == 0
+
+
+def test_echo_mismatch_is_returned(chip, faults):
+    faults.garble = 1
+    result, rx = chip.sendPackets([readPacket(1)])[0]
+    assert rx[0] != SerialWombatCommands.COMMAND_BINARY_READ_PIN_BUFFFER
+    assert faults.packets == 1
+
+
+def test_echo_mismatch_is_resent(chip, faults):
+    faults.garble = 1
+    chip.publicData[1] = 4321
+    results = chip.sendPackets([readPacket(1), readPacket(0)], retryIfEchoDoesntMatch = True)
+    result, rx = results[0]
+    assert result == 8
+    assert rx[0] == SerialWombatCommands.COMMAND_BINARY_READ_PIN_BUFFFER
+    assert rx[2] + 256 * rx[3] == 4321
+    assert faults.packets == 3
+
+
+def test_sendPacket_echo_retries(chip, faults):
+    faults.garble = 2
+    result, rx = chip.sendPacket(readPacket(1), True)
+    assert result == 8
+    assert faults.packets == 3
+    faults.garble = 1
+    faults.packets = 0
+    chip.sendPacket(readPacket(1))
+    assert faults.packets == 1
+
+
+def test_packet_batch_context_manager(chip, faults):
+    chip.publicData[3] = 33
+    with chip.batch() as b:
+        b.sendPacket(readPacket(3))
+        b.sendPacket(readPacket(3))
+    assert faults.transactions == 1
+    assert [rx[2] for result, rx in b.results] == [33, 33]
+
+
+def test_async_sendPackets_matches_sync(chip, faults):
+    import asyncio
+    from SerialWombatAsync import AsyncSerialWombatChip
+    chip.publicData[1] = 4321
+    asyncChip = AsyncSerialWombatChip(chip)
+    faults.garble = 1
+    results = asyncio.run(asyncChip.sendPackets([readPacket(1), [0xFE]], retryIfEchoDoesntMatch = True, countErrors = False))
+    assert results[0][0] == 8
+    assert results[0][1][2] + 256 * results[0][1][3] == 4321
+    assert results[1][0] == -SerialWombatErrors.SW_ERROR_INVALID_COMMAND
+    assert chip.errorCount == 0
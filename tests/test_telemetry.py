@@ -0,0 +1,25 @@
+from SerialWombatTelemetry import SerialWombatTelemetry
+
+
+def test_bucket_bounds_are_inclusive():
+    telemetry = SerialWombatTelemetry()
+    for elapsed_uS in (1, 2, 3, 4, 5):
+        telemetry.record(0x81, elapsed_uS, 0)
+    lines = telemetry.prometheus().splitlines()
+    buckets = dict([(line.split('le="')[1].split('"')[0], int(line.split()[-1])) for line in lines if "_bucket{" in line])
+    assert buckets["1e-06"] == 1
+    assert buckets["2e-06"] == 2
+    assert buckets["4e-06"] == 4
+    assert buckets["8e-06"] == 5
+    assert buckets["+Inf"] == 5
+
+
+def test_chip_records_packets(chip):
+    telemetry = chip.enableTelemetry()
+    chip.readPublicData(1)
+    chip.sendPackets([[0x81, 1, 2], [0xFE]])
+    snapshot = telemetry.snapshot()
+    assert snapshot["calls"] == 3
+    assert snapshot["errors"] == 1
+    assert snapshot["commands"][0x81]["calls"] == 2
+    assert snapshot["commands"][0xFE]["errors"] == 1
@@ -0,0 +1,75 @@
+import random
+from SerialWombatUserBufferMirror import UserBufferMirror
+
+
+def test_flush_matches_chip(chip):
+    mirror = UserBufferMirror(chip, 0x400, 960)
+    rng = random.Random(1)
+    for trial in range(200):
+        for k in range(rng.randint(1, 8)):
+            start = rng.randrange(960)
+            if (rng.random() < 0.3):
+                mirror[start] = rng.randrange(256)
+            else:
+                n = len(mirror[start:start + rng.randint(1, 40)])
+                mirror[start:start + n] = bytes(rng.randrange(256) for i in range(n))
+        assert mirror.flush() >= 0
+        assert chip.userBuffer[0x400:0x400 + 960] == mirror.buffer, trial
+        assert not mirror.isDirty()
+
+
+def test_dirty_ranges_merge(chip):
+    mirror = UserBufferMirror(chip, 0, 100)
+    mirror[10:20] = bytes(10)
+    mirror[30] = 1
+    mirror[15:31] = bytes(16)
+    mirror.write(50, b"ab")
+    mirror[-1] = 2
+    assert mirror.dirtyRanges() == [(10, 31), (50, 52), (99, 100)]
+
+
+def test_plan_is_small_for_sparse_changes(chip):
+    mirror = UserBufferMirror(chip, 0x400, 960)
+    mirror[0:3] = b"abc"
+    mirror[9:12] = b"xyz"
+    mirror[100:130] = bytes(range(30))
+    mirror[900] = 1
+    packets = mirror.plan()
+    assert len(packets) <= 8
+    assert mirror.flush() == len(packets)
+    assert chip.userBuffer[0x400:0x400 + 960] == mirror.buffer
+
+
+def test_plan_merges_close_ranges(chip):
+    mirror = UserBufferMirror(chip, 0, 100)
+    mirror[0] = 1
+    mirror[2] = 1
+    # One 4 byte write covers both ranges and the unchanged byte between them
+    assert len(mirror.plan()) == 1
+
+
+def test_flush_failure_keeps_ranges_dirty(chip, faults):
+    mirror = UserBufferMirror(chip, 0, 100)
+    mirror[5:40] = bytes(range(35))
+    faults.fail = 1
+    assert mirror.flush() < 0
+    assert mirror.dirtyRanges() == [(5, 40)]
+    assert mirror.flush() > 0
+    assert chip.userBuffer[5:40] == bytes(range(35))
+
+
+def test_load(chip):
+    chip.userBuffer[0x100:0x200] = bytes(range(256))
+    mirror = UserBufferMirror(chip, 0x100, 256)
+    mirror[3] = 9
+    assert mirror.load() == 256
+    assert mirror.buffer == bytes(range(256))
+    assert not mirror.isDirty()
+
+
+def test_packet_count_matches_plan(chip):
+    for length in (1, 5, 11, 23):
+        mirror = UserBufferMirror(chip, 0, length)
+        for start in range(length):
+            for end in range(start + 1, length + 1):
+                assert mirror._rangePacketCount(start, end) == len(mirror._planRange(start, end))